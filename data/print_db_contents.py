@@ -9,17 +9,17 @@ COLLECTION_NAME = "qas"  # Match what you used when ingesting
 
 # Initialize embedding function (must match the one used during ingestion)
 embedding_fn = OllamaEmbeddings(
-            model="BGE-M3",
-            base_url="127.0.0.1:11434",
-            num_gpu=0,
-            keep_alive=1,
-        )
+    model="BGE-M3",
+    base_url="127.0.0.1:11434",
+    num_gpu=0,
+    keep_alive=1,
+)
 
 # Load the existing Chroma DB
 db = Chroma(
     persist_directory=PERSIST_DIR,
     embedding_function=embedding_fn,
-    collection_name=COLLECTION_NAME
+    collection_name=COLLECTION_NAME,
 )
 
 # Access the underlying collection (Chroma client)
@@ -30,9 +30,9 @@ results = collection.get(include=["documents"], limit=1000)
 
 print(f"Total documents: {len(results['ids'])}\n")
 
-for i, (doc_id, content) in enumerate(zip(results['ids'], results['documents']), 1):
+for i, (doc_id, content) in enumerate(zip(results["ids"], results["documents"]), 1):
     print(f"--- Document {i} ---")
     print(f"ID: {doc_id}")
     print("Content:")
     print(content)
-    print()
\ No newline at end of file
+    print()
@@ -1,14 +1,11 @@
-import argparse
 import os
-import sys
 
 import streamlit as st
 from loguru import logger
 from PIL import Image
 
-from guards import validate_input
-from observability import setup_tracing
-from rag import OllamaRag, get_initial_chat_state
+from config.app_config import get_settings
+from server import APIError, QAClient
 
 if "logger_configured" not in st.session_state:
 
@@ -23,30 +20,33 @@ if "logger_configured" not in st.session_state:
 
     st.session_state.logger_configured = True
 
-setup_tracing()
-
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
-if "qas" not in st.session_state:
-    st.session_state.qas = get_initial_chat_state()
 
-def main() -> None:
-    parser = argparse.ArgumentParser(
-        description="Parse a db path from the command line."
-    )
-    parser.add_argument(
-        "--db_path",
-        type=str,
-        help="The path to the vector store db dir.",
-        default="/tmp/ch_db",
-    )
+@st.cache_resource
+def get_client(api_url: str) -> QAClient:
+    return QAClient(api_url)
 
-    args = parser.parse_args()
-    db_path = args.db_path
 
-    if not os.path.isdir(db_path):
-        print(f"Error: The db path '{db_path}' does not exist.")
+def main() -> None:
+    # The pipeline, the guards and the metrics run in the API server
+    # (python -m server); the app only renders the conversation.
+    client = get_client(get_settings().api_url)
+
+    # The server keeps the history; the session only holds its ID.
+    if "conversation_id" not in st.session_state:
+        try:
+            st.session_state.conversation_id = client.create_conversation()
+        except Exception as e:
+            logger.error(f"The QA API is unreachable: {e}")
+            st.error("The QA service is unavailable, please try again later.")
+            return
+
+    with st.sidebar:
+        if st.button("Reload knowledge base"):
+            client.reload()
+            st.success("Knowledge base reloaded.")
 
     st.title("Customer Support- Q&A")
     st.divider()
@@ -68,28 +68,20 @@ def main() -> None:
                 st.write(msg["assistant"])
 
     if user_input:
-        with st.spinner("Processing…"):
-            response = ""
+        with st.chat_message("user"):
+            st.write(user_input)
 
+        with st.chat_message("assistant", avatar=image):
+            tokens = client.chat_stream(st.session_state.conversation_id, user_input)
             try:
-                validate_input(user_input)
-            except ValueError as e:
-                response = str(e)
-
-            if response == "":
-                qas = st.session_state.qas
-                response, _ = OllamaRag().get_response(user_input, qas)
-
-            with st.chat_message("user"):
-                st.write(user_input)
-            with st.chat_message("assistant", avatar=image):
-                out = str(response)
-                st.write(out)
-
-            st.session_state.qas.append({"role": "user", "content": user_input})
-            st.session_state.qas.append({"role": "assistant", "content": response})
-            a = {"user": user_input, "assistant": str(response)}
-            st.session_state.messages.append(a)
+                response = str(st.write_stream(tokens)).strip()
+            except APIError as e:
+                # A rejected input carries the message to show.
+                response = e.message
+                st.write(response)
+
+        a = {"user": user_input, "assistant": str(response)}
+        st.session_state.messages.append(a)
 
 
 if __name__ == "__main__":
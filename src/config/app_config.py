@@ -1,15 +1,23 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from guards import GuardConfig
 from rag import ModelConfig
+from server.config import ServerConfig
 
 
 class Settings(BaseSettings):
     model: ModelConfig = ModelConfig()
+    guards: GuardConfig = GuardConfig()
+    server: ServerConfig = ServerConfig()
+    # Where the Streamlit app reaches the API server.
+    api_url: str = "http://localhost:8088"
 
     model_config = SettingsConfigDict(
         env_file=".env",
         env_prefix="QA_APP_",
+        env_nested_delimiter="__",
     )
 
+
 def get_settings() -> Settings:
     return Settings()
@@ -2,28 +2,51 @@ import argparse
 import os
 
 from rag import OllamaRag
+from rag.bulk_ingest import BulkIngestor
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Parse a file path from the command line."
     )
-    parser.add_argument("file_path", type=str, help="The path to the file to process")
+    parser.add_argument(
+        "file_path",
+        type=str,
+        help="The path to the file or directory to process. Re-running on the same "
+        "path only embeds new or changed chunks.",
+    )
     parser.add_argument(
         "db_path", type=str, help="The path to the vector store db dir."
     )
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Use batched, parallel and resumable ingestion for large catalogs.",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=64, help="Chunks per embedding request."
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Embedding requests in flight."
+    )
 
     args = parser.parse_args()
     file_path = args.file_path
     db_path = args.db_path
 
-    if not os.path.isfile(file_path):
-        print(f"Error: The file '{file_path}' does not exist.")
+    if not os.path.exists(file_path):
+        print(f"Error: The path '{file_path}' does not exist.")
 
     if not os.path.isdir(db_path):
         print(f"Warning: The dir '{db_path}' does not exist but it will be created.")
 
-    OllamaRag().ingest_docs(file_path, db_path)
+    rag = OllamaRag(db_path=db_path)
+    if args.bulk:
+        BulkIngestor(rag, batch_size=args.batch_size, workers=args.workers).run(
+            file_path
+        )
+    else:
+        rag.ingest_docs(file_path, db_path)
 
 
 if __name__ == "__main__":
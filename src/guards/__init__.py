@@ -1,4 +1,13 @@
+from .config import GuardConfig
+from .engine import GuardEngine, GuardRejected, get_engine
 from .guards import get_guards
 from .validate import validate_input
 
-__all__ = ["get_guards", "validate_input"]
+__all__ = [
+    "get_guards",
+    "validate_input",
+    "GuardConfig",
+    "GuardEngine",
+    "GuardRejected",
+    "get_engine",
+]
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+
+
+class GuardConfig(BaseModel):
+    # Minimum langdetect probability for English.
+    language_threshold: float = 0.85
+    # Detoxify model and the score above which a sentence is toxic.
+    toxicity_model: str = "unbiased-small"
+    toxicity_threshold: float = 0.5
+    jailbreak: bool = True
+    device: str = "cpu"
+    # Run the ML validators side by side in a thread pool.
+    parallel: bool = False
+    max_workers: int = 2
@@ -0,0 +1,276 @@
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, List, Optional, Tuple
+
+from langdetect import detect_langs
+from langdetect.lang_detect_exception import LangDetectException
+from loguru import logger
+
+from guards.config import GuardConfig
+from observability import metrics
+
+INVALID_INPUT_MSG = "Your input text is not appropriate"
+GUARDS_FAILED_MSG = "Your input is not appropriate pls try again."
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Detoxify labels that make an input toxic; the multilingual and unbiased models
+# also score identity mentions ("male", "muslim", ...), which are not toxic.
+TOXICITY_LABELS = (
+    "toxicity",
+    "severe_toxicity",
+    "obscene",
+    "threat",
+    "insult",
+    "identity_attack",
+    "sexual_explicit",
+)
+
+Check = Tuple[str, Callable[[str], bool]]
+
+
+def is_english(text: str, threshold: float = 0.85) -> bool:
+    """
+    Determines whether the given text is in English based on language detection confidence.
+
+    Uses `langdetect.detect_langs` to determine the most probable language and its confidence score.
+    Returns True only if English is the top prediction and its probability exceeds the threshold.
+
+    Args:
+        text (str): The input text to analyze.
+        threshold (float, optional): Minimum probability required to consider the text English.
+                                     Defaults to 0.85.
+
+    Returns:
+        bool: True if the text is confidently detected as English, False otherwise.
+    """
+    langs = detect_langs(text)
+    return langs[0].lang == "en" and langs[0].prob >= threshold
+
+
+def is_garbage(text: str) -> bool:
+    """
+    Determines whether the input text is considered garbage.
+
+    A text is classified as garbage if it meets any of the following:
+    - It consists entirely of non-alphanumeric characters (symbols, punctuation, etc.).
+    - It contains excessive character repetition (e.g., "aaaaaaaaaaaa").
+
+    Args:
+        text (str): The input text to evaluate.
+
+    Returns:
+        bool: True if the text is classified as garbage, False otherwise.
+    """
+    if re.fullmatch(r"[\W_]+", text):
+        return True
+    if re.search(r"(.)\1{10,}", text):
+        return True
+    return False
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence for sentence in SENTENCE_END.split(text.strip()) if sentence]
+
+
+class GuardRejected(ValueError):
+    """Raised when an input fails a guard; `reason` names the failed check."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class GuardEngine:
+    """
+    Validates user input with checks ordered from cheapest to most expensive.
+
+    The regex and language checks run first; the ML validators (toxicity, then
+    jailbreak detection) only run on inputs that pass them. The first failing
+    check rejects the input. The models are loaded once, on first use or in
+    `warm_up`, and reused for every message.
+
+    Toxicity is scored per sentence like guardrails' `ToxicLanguage`, but all
+    sentences go through the model in a single batch. With `parallel` the ML
+    validators run side by side on a thread pool.
+
+    Args:
+        config (Optional[GuardConfig]): Thresholds, models and parallelism.
+        toxicity_model (Any): A Detoxify-like model with `predict(List[str])`;
+            loaded from `config.toxicity_model` if omitted.
+        jailbreak_validator (Any): A guardrails validator; `DetectJailbreak` if
+            omitted.
+    """
+
+    def __init__(
+        self,
+        config: Optional[GuardConfig] = None,
+        toxicity_model: Any = None,
+        jailbreak_validator: Any = None,
+    ):
+        self.config = config or GuardConfig()
+        self._toxicity_model = toxicity_model
+        self._jailbreak_validator = jailbreak_validator
+        self._lock = threading.Lock()
+        self._warmed = False
+        self.executor = (
+            ThreadPoolExecutor(self.config.max_workers, thread_name_prefix="guards")
+            if self.config.parallel
+            else None
+        )
+        self.cheap_checks: List[Check] = [
+            ("garbage", is_garbage),
+            ("language", self.is_not_english),
+        ]
+        self.model_checks: List[Check] = [("toxicity", self.is_toxic)]
+        if self.config.jailbreak:
+            self.model_checks.append(("jailbreak", self.is_jailbreak))
+
+    def toxicity_model(self) -> Any:
+        if self._toxicity_model is None:
+            with self._lock:
+                if self._toxicity_model is None:
+                    from detoxify import Detoxify
+
+                    logger.info(f"Loading toxicity model {self.config.toxicity_model}")
+                    self._toxicity_model = Detoxify(
+                        self.config.toxicity_model, device=self.config.device
+                    )
+        return self._toxicity_model
+
+    def jailbreak_validator(self) -> Any:
+        if self._jailbreak_validator is None:
+            with self._lock:
+                if self._jailbreak_validator is None:
+                    from guardrails.hub import DetectJailbreak
+
+                    logger.info("Loading jailbreak detector")
+                    self._jailbreak_validator = DetectJailbreak()
+        return self._jailbreak_validator
+
+    def warm_up(self) -> None:
+        """
+        Loads the models and runs them once so the first message is not slower.
+
+        Subsequent calls are no-ops.
+        """
+        if self._warmed:
+            return
+        try:
+            self.toxicity_model()
+            if self.config.jailbreak:
+                self.jailbreak_validator()
+            self.check("How do I charge the device?")
+            self._warmed = True
+            logger.info("Warmed up the input guards")
+        except Exception as e:
+            logger.warning(f"Guard warm up failed: {e}")
+
+    def is_not_english(self, text: str) -> bool:
+        try:
+            return not is_english(text, self.config.language_threshold)
+        except LangDetectException:
+            # No detectable language features, e.g. only digits.
+            return True
+
+    def is_toxic(self, text: str) -> bool:
+        sentences = split_sentences(text)
+        if not sentences:
+            return False
+        scores = self.toxicity_model().predict(sentences)
+        threshold = self.config.toxicity_threshold
+        return any(
+            score >= threshold
+            for label in TOXICITY_LABELS
+            for score in scores.get(label, ())
+        )
+
+    def is_jailbreak(self, text: str) -> bool:
+        result = self.jailbreak_validator().validate(text, {})
+        return getattr(result, "outcome", "pass") == "fail"
+
+    def _failed(self, name: str, check: Callable[[str], bool], text: str) -> bool:
+        try:
+            return check(text)
+        except Exception as e:
+            # Fail closed: an input the validator cannot judge is rejected.
+            logger.warning(f"Guard check '{name}' failed to run: {e}")
+            return True
+
+    def _run_models(self, text: str) -> Optional[str]:
+        if self.executor is None or len(self.model_checks) < 2:
+            for name, check in self.model_checks:
+                if self._failed(name, check, text):
+                    return name
+            return None
+
+        futures = {
+            self.executor.submit(self._failed, name, check, text): name
+            for name, check in self.model_checks
+        }
+        for future in as_completed(futures):
+            if future.result():
+                for other in futures:
+                    other.cancel()
+                return futures[future]
+        return None
+
+    def check(self, text: str) -> Optional[str]:
+        """
+        Runs the checks on `text`.
+
+        Args:
+            text (str): The user input.
+
+        Returns:
+            Optional[str]: The name of the first failed check, or None if all pass.
+        """
+        for name, check in self.cheap_checks:
+            if self._failed(name, check, text):
+                return name
+        return self._run_models(text)
+
+    def validate(self, text: str) -> None:
+        """
+        Raises `GuardRejected` if `text` fails a check.
+
+        Args:
+            text (str): The user input.
+
+        Raises:
+            GuardRejected: With the failed check as `reason`.
+        """
+        reason = self.check(text)
+        if reason is None:
+            return
+
+        metrics.GUARD_REJECTIONS.labels(reason).inc()
+        logger.info(f"Input rejected by the '{reason}' guard")
+        cheap = any(reason == name for name, _ in self.cheap_checks)
+        raise GuardRejected(reason, INVALID_INPUT_MSG if cheap else GUARDS_FAILED_MSG)
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_engine: Optional[GuardEngine] = None
+_lock = threading.Lock()
+
+
+def get_engine(config: Optional[GuardConfig] = None) -> GuardEngine:
+    """
+    Returns the process-wide guard engine, building it on first use.
+
+    `config` only applies when the engine is built; later calls return the
+    existing instance.
+    """
+    global _engine
+    if _engine is not None:
+        return _engine
+
+    with _lock:
+        if _engine is None:
+            _engine = GuardEngine(config)
+        return _engine
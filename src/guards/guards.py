@@ -1,8 +1,7 @@
-from guardrails import Guard
-from guardrails.hub import DetectJailbreak, ToxicLanguage
+from typing import Any
 
 
-def get_guards() -> Guard:
+def get_guards() -> Any:
     """
     Initializes and returns a Guard object with multiple safety filters enabled.
 
@@ -15,7 +14,12 @@ def get_guards() -> Guard:
                 - Action on failure: Raises an exception
 
     This setup is intended for securing LLM applications against prompt injections and harmful outputs.
+    `validate_input` uses the faster `GuardEngine` instead; guardrails is only imported here
+    when this Guard is built.
     """
+    from guardrails import Guard
+    from guardrails.hub import DetectJailbreak, ToxicLanguage
+
     return Guard().use_many(
         DetectJailbreak,
         ToxicLanguage(
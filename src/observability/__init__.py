@@ -1,3 +1,25 @@
+from .exporter import (
+    SpanExporter,
+    activate_trace,
+    finish_trace,
+    request_trace,
+    start_trace,
+)
+from .metrics import setup_metrics
+from .stages import StageTimer, add_stage_hook, remove_stage_hook, stage
 from .utils import setup_tracing, trace
 
-__all__ = ["trace", "setup_tracing"]
+__all__ = [
+    "trace",
+    "setup_tracing",
+    "setup_metrics",
+    "stage",
+    "add_stage_hook",
+    "remove_stage_hook",
+    "StageTimer",
+    "SpanExporter",
+    "request_trace",
+    "start_trace",
+    "activate_trace",
+    "finish_trace",
+]
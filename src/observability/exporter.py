@@ -0,0 +1,274 @@
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from loguru import logger
+
+env_sample_rate = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+env_queue_size = int(os.getenv("TRACING_QUEUE_SIZE", "1000"))
+env_batch_size = int(os.getenv("TRACING_BATCH_SIZE", "50"))
+env_flush_interval = float(os.getenv("TRACING_FLUSH_INTERVAL", "1.0"))
+
+
+@dataclass
+class Span:
+    """A timed piece of a request; times are Unix timestamps in seconds."""
+
+    name: str
+    start: float
+    end: float
+    type: str = "general"
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    usage: Optional[Dict[str, int]] = None
+
+
+@dataclass
+class RequestTrace:
+    """The spans of one sampled request, exported as a single trace."""
+
+    name: str
+    input: Dict[str, Any]
+    start: float = field(default_factory=time.time)
+    end: Optional[float] = None
+    output: Optional[Dict[str, Any]] = None
+    tags: List[str] = field(default_factory=list)
+    spans: List[Span] = field(default_factory=list)
+
+    def add_span(self, span: Span) -> None:
+        # list.append is atomic, so stages on other tasks may record concurrently.
+        self.spans.append(span)
+
+
+Sink = Callable[[List[RequestTrace]], None]
+
+_current: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+class SpanExporter:
+    """
+    Exports finished request traces on a background thread.
+
+    Traces go into a bounded queue and are handed to the sink in batches of up to
+    `batch_size`, or whatever arrived within `flush_interval` seconds. When the
+    queue is full (the sink is slow or down) new traces are dropped and counted
+    instead of blocking the request.
+
+    Args:
+        sink (Sink): Called on the exporter thread with each batch of traces.
+        sample_rate (float): Share of requests that are traced, from 0 to 1.
+        queue_size (int): Maximum number of traces waiting to be exported.
+        batch_size (int): Maximum number of traces per sink call.
+        flush_interval (float): Longest time in seconds a trace waits for a batch.
+    """
+
+    def __init__(
+        self,
+        sink: Sink,
+        sample_rate: float = env_sample_rate,
+        queue_size: int = env_queue_size,
+        batch_size: int = env_batch_size,
+        flush_interval: float = env_flush_interval,
+    ):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"sample_rate must be between 0 and 1, got {sample_rate}")
+        self.sink = sink
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: "queue.Queue[Optional[RequestTrace]]" = queue.Queue(queue_size)
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SpanExporter":
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="span-exporter", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def sampled(self) -> bool:
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def submit(self, trace: RequestTrace) -> bool:
+        """Queues a finished trace; returns False if it was dropped."""
+        try:
+            self.queue.put_nowait(trace)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _next_batch(self) -> Optional[List[RequestTrace]]:
+        """Blocks for the first trace, then collects more until the batch is due."""
+        first = self.queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the stop marker back so the loop exits after this batch.
+                self.queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self.sink(batch)
+                self.exported += len(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                logger.warning(f"[Tracing] Exporting {len(batch)} traces failed: {e}")
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Exports the queued traces and stops the thread."""
+        if self._thread is None:
+            return
+        self.queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self.queue.qsize(),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+_exporter: Optional[SpanExporter] = None
+
+
+def set_exporter(exporter: Optional[SpanExporter]) -> None:
+    """Installs the exporter used by `request_trace`; None turns tracing off."""
+    global _exporter
+    _exporter = exporter
+
+
+def get_exporter() -> Optional[SpanExporter]:
+    return _exporter
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current.get()
+
+
+def start_trace(name: str, **inputs: Any) -> Optional[RequestTrace]:
+    """
+    Starts a trace for a request if an exporter is installed and it is sampled.
+
+    The sampling decision is made once per request, so unsampled requests only
+    pay for a random draw.
+    """
+    if _exporter is None or not _exporter.sampled():
+        return None
+    return RequestTrace(name=name, input=inputs)
+
+
+@contextmanager
+def activate_trace(trace: Optional[RequestTrace]) -> Iterator[None]:
+    """Makes `trace` the one stages and LLM calls record into."""
+    token = _current.set(trace)
+    try:
+        yield
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            # A streaming generator closed from another context, e.g. by the GC.
+            _current.set(None)
+
+
+def finish_trace(
+    trace: Optional[RequestTrace], output: Optional[Dict[str, Any]] = None
+) -> None:
+    """Ends the trace and hands it to the exporter without blocking."""
+    if trace is None or _exporter is None:
+        return
+    trace.end = time.time()
+    if output is not None:
+        trace.output = output
+    _exporter.submit(trace)
+
+
+@contextmanager
+def request_trace(name: str, **inputs: Any) -> Iterator[Optional[RequestTrace]]:
+    """
+    Traces the enclosed request; yields None when it is not sampled.
+
+        with request_trace("get_response", question=text) as trace:
+            ...
+    """
+    trace = start_trace(name, **inputs)
+    with activate_trace(trace):
+        try:
+            yield trace
+        finally:
+            finish_trace(trace)
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Stage hook that adds a span to the current trace, if any."""
+    trace = _current.get()
+    if trace is not None:
+        end = time.time()
+        trace.add_span(Span(name=name, start=end - seconds, end=end))
+
+
+def _timestamp(seconds: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(seconds, timezone.utc) if seconds else None
+
+
+class OpikSink:
+    """Writes batches of traces with the Opik client."""
+
+    def __init__(self, client: Any = None):
+        if client is None:
+            import opik
+
+            client = opik.Opik()
+        self.client = client
+
+    def __call__(self, batch: List[RequestTrace]) -> None:
+        for request in batch:
+            trace = self.client.trace(
+                name=request.name,
+                start_time=_timestamp(request.start),
+                end_time=_timestamp(request.end),
+                input=request.input,
+                output=request.output,
+                tags=request.tags or None,
+            )
+            for span in request.spans:
+                trace.span(
+                    name=span.name,
+                    type=span.type,
+                    start_time=_timestamp(span.start),
+                    end_time=_timestamp(span.end),
+                    metadata=span.metadata or None,
+                    usage=span.usage,
+                )
+        self.client.flush()
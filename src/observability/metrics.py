@@ -0,0 +1,164 @@
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from loguru import logger
+from prometheus_client import Counter, Histogram, start_http_server
+
+from .stages import add_stage_hook
+
+env_enabled = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+DEFAULT_PORT = int(os.getenv("METRICS_PORT", "9101"))
+
+# Sub-millisecond index lookups up to multi-second generations.
+STAGE_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+LLM_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+STAGE_SECONDS = Histogram(
+    "qa_bot_stage_duration_seconds",
+    "Duration of each stage of the RAG pipeline.",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+ANSWER_CACHE = Counter(
+    "qa_bot_answer_cache_lookups_total",
+    "Semantic answer cache lookups by result (hit or miss).",
+    ["result"],
+)
+REWRITES = Counter(
+    "qa_bot_rewrites_total",
+    "Query rewrites by result (rewritten, cached, timeout, late or error).",
+    ["result"],
+)
+GUARD_REJECTIONS = Counter(
+    "qa_bot_guard_rejections_total",
+    "User inputs rejected by the guards, by reason.",
+    ["reason"],
+)
+EMPTY_COLLECTION = Counter(
+    "qa_bot_empty_collection_fallbacks_total",
+    "Questions answered without context because the collection was empty.",
+)
+LLM_EVAL_SECONDS = Histogram(
+    "qa_bot_llm_eval_duration_seconds",
+    "Time the model server spent generating the answer tokens.",
+    ["model", "call"],
+    buckets=LLM_BUCKETS,
+)
+LLM_PROMPT_EVAL_SECONDS = Histogram(
+    "qa_bot_llm_prompt_eval_duration_seconds",
+    "Time the model server spent evaluating the prompt.",
+    ["model", "call"],
+    buckets=LLM_BUCKETS,
+)
+LLM_LOAD_SECONDS = Histogram(
+    "qa_bot_llm_load_duration_seconds",
+    "Time the model server spent loading the model.",
+    ["model", "call"],
+    buckets=LLM_BUCKETS,
+)
+LLM_PROMPT_TOKENS = Histogram(
+    "qa_bot_llm_prompt_tokens",
+    "Prompt tokens evaluated by the model server (prompt_eval_count).",
+    ["model", "call"],
+    buckets=TOKEN_BUCKETS,
+)
+LLM_COMPLETION_TOKENS = Histogram(
+    "qa_bot_llm_completion_tokens",
+    "Tokens generated by the model server (eval_count).",
+    ["model", "call"],
+    buckets=TOKEN_BUCKETS,
+)
+
+_server_lock = threading.Lock()
+_server_started = False
+_stage_metrics = False
+
+
+def observe_stage(name: str, seconds: float) -> None:
+    """Stage hook that records the stage duration histogram."""
+    STAGE_SECONDS.labels(name).observe(seconds)
+
+
+def observe_llm_response(response: Dict[str, Any], call: str = "answer") -> None:
+    """
+    Records the usage and timings of a final chat response or stream frame.
+
+    Durations are reported by Ollama in nanoseconds; fields a backend does not
+    report are skipped.
+
+    Args:
+        response (Dict[str, Any]): The response in Ollama's format.
+        call (str): What the call was for, e.g. "answer", "rewrite" or "summary".
+    """
+    labels = (response.get("model") or "unknown", call)
+    for key, histogram in (
+        ("eval_duration", LLM_EVAL_SECONDS),
+        ("prompt_eval_duration", LLM_PROMPT_EVAL_SECONDS),
+        ("load_duration", LLM_LOAD_SECONDS),
+    ):
+        if response.get(key) is not None:
+            histogram.labels(*labels).observe(response[key] / 1e9)
+    if response.get("prompt_eval_count") is not None:
+        LLM_PROMPT_TOKENS.labels(*labels).observe(response["prompt_eval_count"])
+    if response.get("eval_count") is not None:
+        LLM_COMPLETION_TOKENS.labels(*labels).observe(response["eval_count"])
+
+
+def enable_stage_metrics() -> None:
+    """Records the stage histograms; for apps that serve /metrics themselves."""
+    global _stage_metrics
+    if not env_enabled:
+        return
+    with _server_lock:
+        if not _stage_metrics:
+            add_stage_hook(observe_stage)
+            _stage_metrics = True
+
+
+def setup_metrics(port: Optional[int] = None, addr: str = "0.0.0.0") -> bool:
+    """
+    Starts the Prometheus endpoint and the stage histograms, once per process.
+
+    Disabled with METRICS_ENABLED=false; the port defaults to METRICS_PORT or 9101.
+
+    Returns:
+        bool: Whether the endpoint is running.
+    """
+    global _server_started
+    if not env_enabled:
+        logger.info("[Metrics] Metrics disabled via METRICS_ENABLED")
+        return False
+
+    with _server_lock:
+        if _server_started:
+            return True
+        try:
+            start_http_server(port or DEFAULT_PORT, addr=addr)
+        except OSError as e:
+            logger.warning(f"[Metrics] Failed to start the metrics endpoint: {e}")
+            return False
+        _server_started = True
+        logger.info(
+            f"[Metrics] Serving Prometheus metrics on {addr}:{port or DEFAULT_PORT}"
+        )
+    enable_stage_metrics()
+    return True
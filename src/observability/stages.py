@@ -0,0 +1,89 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List
+
+import numpy as np
+
+StageHook = Callable[[str, float], None]
+
+_hooks: List[StageHook] = []
+_lock = threading.Lock()
+
+
+def add_stage_hook(hook: StageHook) -> None:
+    """Registers `hook(stage_name, seconds)`, called after every pipeline stage."""
+    with _lock:
+        _hooks.append(hook)
+
+
+def remove_stage_hook(hook: StageHook) -> None:
+    with _lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Times a pipeline stage and reports it to the registered hooks.
+
+    Costs a list check when no hook is registered. The time is reported even if
+    the stage raises.
+
+    Args:
+        name (str): Stage name, e.g. "vector_search".
+    """
+    if not _hooks:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        for hook in list(_hooks):
+            hook(name, elapsed)
+
+
+class StageTimer:
+    """
+    Collects stage durations while active.
+
+        with StageTimer() as timer:
+            rag.get_response(question, msgs)
+        print(timer.summary())
+    """
+
+    def __init__(self) -> None:
+        self.durations: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.durations.setdefault(name, []).append(seconds)
+
+    def __enter__(self) -> "StageTimer":
+        add_stage_hook(self)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        remove_stage_hook(self)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, total and mean/p50/p99 in milliseconds per stage."""
+        with self._lock:
+            durations = {name: list(values) for name, values in self.durations.items()}
+
+        summary = {}
+        for name, values in durations.items():
+            ms = np.asarray(values) * 1e3
+            summary[name] = {
+                "count": len(values),
+                "total_ms": float(ms.sum()),
+                "mean_ms": float(ms.mean()),
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p99_ms": float(np.percentile(ms, 99)),
+            }
+        return summary
@@ -1,17 +1,55 @@
 import functools
+import inspect
 import os
+import time
 from types import SimpleNamespace
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 
 from loguru import logger
 from opik import opik_context
 from opik import track as opik_track
 
+from .exporter import (
+    OpikSink,
+    Span,
+    SpanExporter,
+    current_trace,
+    get_exporter,
+    record_stage,
+    set_exporter,
+)
+from .stages import add_stage_hook
+
 TRACING_BACKENDS = {
     "opik": opik_track,
 }
 
 env_enabled = os.getenv("TRACING_ENABLED", "false").lower() in ("1", "true", "yes")
+# "inline" records spans with opik.track on the request path; "async" samples
+# requests and exports their spans from a background thread.
+env_mode = os.getenv("TRACING_MODE", "inline").lower()
+
+
+def response_fields(result: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """Span metadata and token usage of an Ollama-format response."""
+    metadata = {
+        "model": result.get("model"),
+        "eval_duration": result.get("eval_duration"),
+        "load_duration": result.get("load_duration"),
+        "prompt_eval_duration": result.get("prompt_eval_duration"),
+        "prompt_eval_count": result.get("prompt_eval_count"),
+        "done": result.get("done"),
+        "done_reason": result.get("done_reason"),
+    }
+    completion_tokens = result.get("eval_count") or 0
+    prompt_tokens = result.get("prompt_eval_count") or 0
+    usage = {
+        "completion_tokens": completion_tokens,
+        "prompt_tokens": prompt_tokens,
+        "total_tokens": completion_tokens + prompt_tokens,
+    }
+    return metadata, usage
+
 
 def postprocess_opik(result: Dict[str, Any]) -> None:
     if not isinstance(result, dict):
@@ -32,65 +70,176 @@ def postprocess_opik(result: Dict[str, Any]) -> None:
         if key not in result:
             logger.warning(f"[Tracing] Key '{key}' missing in response")
 
-    opik_context.update_current_span(
-        metadata={
-            "model": result.get("model"),
-            "eval_duration": result.get("eval_duration"),
-            "load_duration": result.get("load_duration"),
-            "prompt_eval_duration": result.get("prompt_eval_duration"),
-            "prompt_eval_count": result.get("prompt_eval_count"),
-            "done": result.get("done"),
-            "done_reason": result.get("done_reason"),
-        },
-        usage={
-            "completion_tokens": result.get("eval_count", 0),
-            "prompt_tokens": result.get("prompt_eval_count", 0),
-            "total_tokens": result.get("eval_count", 0)
-                          + result.get("prompt_eval_count", 0),
-        },
-    )
+    metadata, usage = response_fields(result)
+    opik_context.update_current_span(metadata=metadata, usage=usage)
+
 
 POSTPROCESSORS: Dict[str, Callable[[Dict[str, Any]], None]] = {
     "opik": postprocess_opik,
 }
 
-def trace(tracer: Optional[str] = None, enabled: bool = True, **trace_kwargs: Any) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+
+def record_llm_span(name: str, start: float, result: Any) -> None:
+    """Adds an LLM span to the current sampled request, if any."""
+    request = current_trace()
+    if request is None or not isinstance(result, dict):
+        return
+    metadata, usage = response_fields(result)
+    request.add_span(
+        Span(
+            name=name,
+            start=start,
+            end=time.time(),
+            type="llm",
+            metadata=metadata,
+            usage=usage,
+        )
+    )
+
+
+def sampled_trace(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Records `func` as an LLM span of the current request for the async exporter.
+
+    Nothing is sent from the request path; unsampled requests skip the span.
+    """
+    name = func.__name__
+
+    if inspect.isasyncgenfunction(func):
+
+        @functools.wraps(func)
+        async def async_gen_wrapper(*args: Any, **kwargs: Any) -> Any:
+            start, last = time.time(), None
+            async for frame in func(*args, **kwargs):
+                last = frame
+                yield frame
+            record_llm_span(name, start, last)
+
+        return async_gen_wrapper
+
+    if inspect.isgeneratorfunction(func):
+
+        @functools.wraps(func)
+        def gen_wrapper(*args: Any, **kwargs: Any) -> Any:
+            start, last = time.time(), None
+            for frame in func(*args, **kwargs):
+                last = frame
+                yield frame
+            record_llm_span(name, start, last)
+
+        return gen_wrapper
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.time()
+            result = await func(*args, **kwargs)
+            record_llm_span(name, start, result)
+            return result
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.time()
+        result = func(*args, **kwargs)
+        record_llm_span(name, start, result)
+        return result
+
+    return wrapper
+
+
+def trace(
+    tracer: Optional[str] = None, enabled: bool = True, **trace_kwargs: Any
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
     """
     Generic decorator for dynamic tracing with optional post-processing hooks.
     """
 
     def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
         if not enabled or not env_enabled:
+
             @functools.wraps(func)
             def wrapper(*args: Any, **kwargs: Any) -> Any:
                 return func(*args, **kwargs)
+
             return wrapper
 
+        if env_mode == "async":
+            return sampled_trace(func)
+
         backend_decorator = TRACING_BACKENDS.get(tracer or "")
         postprocessor = POSTPROCESSORS.get(tracer or "")
 
-        if backend_decorator:
+        def run_postprocessor(result: Any) -> Any:
+            if postprocessor:
+                try:
+                    postprocessor(result)
+                except Exception as e:
+                    logger.warning(f"[Tracing] Postprocessing failed: {e}")
+            return result
+
+        if backend_decorator and (
+            inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func)
+        ):
+            # Streaming spans are not kept in the tracing context, so the final
+            # frame (which carries usage metadata) is recorded in its own span.
+            tracked_finalize = backend_decorator(
+                **{"name": func.__name__, **trace_kwargs}
+            )(run_postprocessor)
+
+            if inspect.isasyncgenfunction(func):
+
+                @functools.wraps(func)
+                async def async_gen_wrapper(*args: Any, **kwargs: Any) -> Any:
+                    last = None
+                    async for frame in func(*args, **kwargs):
+                        last = frame
+                        yield frame
+                    if last is not None:
+                        tracked_finalize(last)
+
+                return async_gen_wrapper
+
+            @functools.wraps(func)
+            def gen_wrapper(*args: Any, **kwargs: Any) -> Any:
+                last = None
+                for frame in func(*args, **kwargs):
+                    last = frame
+                    yield frame
+                if last is not None:
+                    tracked_finalize(last)
+
+            return gen_wrapper
+        elif backend_decorator and inspect.iscoroutinefunction(func):
+            decorated_coro = backend_decorator(**trace_kwargs)(func)
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                return run_postprocessor(await decorated_coro(*args, **kwargs))
+
+            return async_wrapper
+        elif backend_decorator:
             decorated_func = backend_decorator(**trace_kwargs)(func)
 
             @functools.wraps(func)
             def wrapper(*args: Any, **kwargs: Any) -> Any:
-                result = decorated_func(*args, **kwargs)
-                if postprocessor:
-                    try:
-                        postprocessor(result)
-                    except Exception as e:
-                        logger.warning(f"[Tracing] Postprocessing failed: {e}")
-                return result
+                return run_postprocessor(decorated_func(*args, **kwargs))
+
             return wrapper
         else:
             logger.debug(f"[Tracing] No valid tracer found for '{tracer}'")
+
             @functools.wraps(func)
             def wrapper(*args: Any, **kwargs: Any) -> Any:
                 return func(*args, **kwargs)
+
             return wrapper
 
     return decorator
 
+
 def setup_tracing() -> Any:
     """
     Dynamically enables or disables tracing based on the TRACING_ENABLED environment variable.
@@ -111,7 +260,16 @@ def setup_tracing() -> Any:
 
     try:
         import opik
+
         opik.configure(use_local=True, automatic_approvals=True)
+        if env_mode == "async" and get_exporter() is None:
+            exporter = SpanExporter(OpikSink()).start()
+            set_exporter(exporter)
+            add_stage_hook(record_stage)
+            logger.info(
+                f"[Tracing] Exporting sampled traces in the background "
+                f"(sample rate {exporter.sample_rate})"
+            )
         logger.info("[Tracing] Opik tracing enabled and configured")
         return opik
     except Exception as e:
@@ -1,5 +1,24 @@
+from .async_ollama_rag import AsyncOllamaRag
+from .backends import ChatBackend, OllamaBackend, OpenAIBackend, create_backend
 from .config import ModelConfig
 from .ollama_rag import OllamaRag
 from .prompts import format_prompt, get_initial_chat_state
+from .registry import get_pipeline, reload_pipeline, warm_pipeline
+from .speculative import Prepared, Speculator
 
-__all__ = ["get_initial_chat_state", "format_prompt", "OllamaRag", "ModelConfig"]
+__all__ = [
+    "get_initial_chat_state",
+    "format_prompt",
+    "OllamaRag",
+    "AsyncOllamaRag",
+    "ModelConfig",
+    "ChatBackend",
+    "OllamaBackend",
+    "OpenAIBackend",
+    "create_backend",
+    "get_pipeline",
+    "warm_pipeline",
+    "reload_pipeline",
+    "Speculator",
+    "Prepared",
+]
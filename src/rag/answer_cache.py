@@ -0,0 +1,146 @@
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Answer cache keyed by question embeddings.
+
+    A lookup returns the stored answer of the most similar previous question if
+    its cosine similarity reaches `threshold`. Entries expire after `ttl`
+    seconds. Once `max_entries` is reached, expired entries are evicted first and
+    then the least recently used ones. Entries are tagged with the collection
+    version they were answered from, and a new version clears the cache.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        ttl: float = 3600.0,
+        max_entries: int = 1024,
+    ):
+        """
+        Args:
+            threshold (float): Minimum cosine similarity for a hit.
+            ttl (float): Seconds an answer stays valid.
+            max_entries (int): Maximum number of cached answers.
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._created = np.zeros(max_entries)
+        self._used = np.zeros(max_entries)
+        self._entries: List[Optional[Tuple[str, str, List[str]]]] = [None] * max_entries
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self) -> None:
+        """Drops all entries."""
+        with self._lock:
+            self._clear()
+
+    def _clear(self) -> None:
+        self._vectors = None
+        self._entries = [None] * self.max_entries
+        self._size = 0
+
+    def _check_version(self, version: int) -> None:
+        if version != self._version:
+            self._clear()
+            self._version = version
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(
+        self, embedding: Sequence[float], version: int
+    ) -> Optional[Tuple[str, List[str]]]:
+        """
+        Finds the answer to the most similar cached question.
+
+        Args:
+            embedding (Sequence[float]): Embedding of the question.
+            version (int): Current version of the collection.
+
+        Returns:
+            Optional[Tuple[str, List[str]]]: The cached answer and its chunks.
+        """
+        query = self._normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            if self._vectors is None or self._size == 0:
+                self.misses += 1
+                return None
+
+            scores = self._vectors[: self._size] @ query
+            scores[now - self._created[: self._size] > self.ttl] = -np.inf
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            self._used[best] = now
+            self.hits += 1
+            entry = self._entries[best]
+            assert entry is not None
+            _, answer, chunks = entry
+            return answer, list(chunks)
+
+    def store(
+        self,
+        embedding: Sequence[float],
+        question: str,
+        answer: str,
+        chunks: List[str],
+        version: int,
+    ) -> None:
+        """
+        Caches an answer.
+
+        Args:
+            embedding (Sequence[float]): Embedding of the question.
+            question (str): The question, kept for debugging.
+            answer (str): The generated answer.
+            chunks (List[str]): The chunks the answer was generated from.
+            version (int): Version of the collection the answer was based on.
+        """
+        vector = self._normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            if self._vectors is None:
+                self._vectors = np.zeros(
+                    (self.max_entries, len(vector)), dtype=np.float32
+                )
+
+            if self._size < self.max_entries:
+                slot = self._size
+                self._size += 1
+            else:
+                expired = now - self._created > self.ttl
+                slot = (
+                    int(np.argmax(expired))
+                    if expired.any()
+                    else int(np.argmin(self._used))
+                )
+
+            self._vectors[slot] = vector
+            self._created[slot] = now
+            self._used[slot] = now
+            self._entries[slot] = (question, answer, list(chunks))
@@ -0,0 +1,251 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from loguru import logger
+
+from observability import (
+    activate_trace,
+    finish_trace,
+    metrics,
+    request_trace,
+    stage,
+    start_trace,
+    trace,
+)
+from rag.ollama_rag import OllamaRag
+
+
+class AsyncOllamaRag(OllamaRag):
+    """
+    Asyncio-native variant of `OllamaRag`.
+
+    Uses the async chat backend client and async embeddings so a single process can keep
+    many conversations in flight. Independent stages run concurrently:
+
+    - the query rewrite overlaps with the collection emptiness check, and
+    - vector search and BM25 search run side by side on the rewritten query.
+
+    Retrieval and fusion semantics are the same as in `OllamaRag`. Cancelling the
+    calling task cancels all in-flight stages.
+    """
+
+    async def aclose(self) -> None:
+        """Async version of `OllamaRag.close`; also closes the async backend client."""
+        await self.backend.aclose()
+        self.close()
+
+    async def aget_response(
+        self, text: str, msgs: List[Dict[str, str]]
+    ) -> Tuple[str, List[str]]:
+        """
+        Async version of `OllamaRag.get_response`.
+
+        Args:
+            text (str): The user's question or prompt.
+            msgs (List[Dict[str, str]]): Message history (OpenAI-style chat format).
+
+        Returns:
+            Tuple[str, List[str]]: The model's response and the retrieved chunks.
+        """
+        with request_trace("aget_response", question=text) as request:
+            with stage("answer_cache"):
+                embedding, cached = await self.acached_answer(text)
+            if cached is not None:
+                if request is not None:
+                    request.output = {"answer": cached[0], "cached": True}
+                return cached
+
+            conversation, chunks = await self.abuild_conversation(text, msgs)
+            with stage("generation"):
+                output = await self.aollama_llm_call(conversation)
+            answer = output["message"]["content"].strip()
+            if request is not None:
+                request.output = {"answer": answer}
+            self.cache_answer(embedding, text, answer, chunks)
+            return (answer, chunks)
+
+    async def aget_response_stream(
+        self, text: str, msgs: List[Dict[str, str]]
+    ) -> Tuple[AsyncIterator[str], List[str]]:
+        """
+        Async version of `OllamaRag.get_response_stream`.
+
+        Args:
+            text (str): The user's question or prompt.
+            msgs (List[Dict[str, str]]): Message history (OpenAI-style chat format).
+
+        Returns:
+            Tuple[AsyncIterator[str], List[str]]: An async iterator over generated
+                text pieces and the retrieved chunks.
+        """
+        request = start_trace("aget_response_stream", question=text)
+        try:
+            with activate_trace(request):
+                with stage("answer_cache"):
+                    embedding, cached = await self.acached_answer(text)
+                if cached is None:
+                    conversation, chunks = await self.abuild_conversation(text, msgs)
+        except Exception:
+            finish_trace(request)
+            raise
+        if cached is not None:
+            answer, cached_chunks = cached
+            finish_trace(request, {"answer": answer, "cached": True})
+
+            async def cached_tokens() -> AsyncIterator[str]:
+                yield answer
+
+            return cached_tokens(), cached_chunks
+
+        async def tokens() -> AsyncIterator[str]:
+            started = False
+            answer = []
+            try:
+                with activate_trace(request), stage("generation"):
+                    async for frame in self.aollama_llm_stream(conversation):
+                        content = frame["message"]["content"]
+                        if not started:
+                            content = content.lstrip()
+                            started = bool(content)
+                        if content:
+                            answer.append(content)
+                            yield content
+            finally:
+                finish_trace(request, {"answer": "".join(answer).strip()})
+            self.cache_answer(embedding, text, "".join(answer).strip(), chunks)
+
+        return tokens(), chunks
+
+    async def acached_answer(
+        self, text: str
+    ) -> Tuple[Optional[List[float]], Optional[Tuple[str, List[str]]]]:
+        """Async version of `OllamaRag.cached_answer`."""
+        if self.answer_cache is None or not self.is_cacheable(text):
+            return None, None
+
+        embedding = await self.embeddings.aembed_query(text)
+        return embedding, self.lookup_answer(embedding, text)
+
+    async def abuild_conversation(
+        self, text: str, msgs: List[Dict[str, str]]
+    ) -> Tuple[List[Dict[str, str]], List[str]]:
+        """
+        Async version of `OllamaRag.build_conversation`.
+
+        Args:
+            text (str): The user's question or prompt.
+            msgs (List[Dict[str, str]]): Message history (OpenAI-style chat format).
+
+        Returns:
+            Tuple[List[Dict[str, str]], List[str]]: The messages to send to the LLM
+                and the retrieved chunks.
+        """
+
+        async def collection_check() -> bool:
+            with stage("collection_check"):
+                return await asyncio.to_thread(self.is_collection_empty)
+
+        rewrite_task: Optional[asyncio.Task[str]] = None
+        async with asyncio.TaskGroup() as tg:
+            empty_task = tg.create_task(collection_check())
+            if self.needs_rewrite(text):
+                rewrite_task = tg.create_task(
+                    self.arewrite_ambiguous_prompt(msgs, text)
+                )
+
+        new_text = rewrite_task.result() if rewrite_task is not None else text
+
+        if empty_task.result():
+            logger.warning("Collection is empty!")
+            metrics.EMPTY_COLLECTION.inc()
+            return self.assemble_conversation(new_text, msgs, [], [])
+
+        results, fused_results = await self.aretrieve(new_text)
+        with stage("prompt"):
+            return self.assemble_conversation(new_text, msgs, results, fused_results)
+
+    async def aretrieve(
+        self, query: str
+    ) -> Tuple[List[Tuple[Document, float]], List[Tuple[Document, float]]]:
+        """
+        Runs vector and BM25 search concurrently and fuses the results.
+
+        Args:
+            query (str): The (possibly rewritten) user question.
+
+        Returns:
+            Tuple: The vector search results and the fused hybrid results.
+        """
+
+        async def vector_search() -> List[Tuple[Document, float]]:
+            with stage("embed_query"):
+                embedding = await self.embeddings.aembed_query(query)
+            with stage("vector_search"):
+                return await asyncio.to_thread(
+                    self.vector_search_by_embedding, embedding, self.retrieval_k
+                )
+
+        async def bm25_search() -> List[Tuple[Document, float]]:
+            with stage("bm25"):
+                return await asyncio.to_thread(
+                    self.bm25_search, query, self.retrieval_k
+                )
+
+        bm25_task: Optional[asyncio.Task[List[Tuple[Document, float]]]] = None
+        async with asyncio.TaskGroup() as tg:
+            vector_task = tg.create_task(vector_search())
+            if self.bm25 is not None:
+                bm25_task = tg.create_task(bm25_search())
+
+        results = vector_task.result()
+        if bm25_task is None:
+            return results, results[: self.context_k]
+
+        with stage("fusion"):
+            fused_results = self.fuse(results, bm25_task.result())
+        return results, fused_results
+
+    async def arewrite_ambiguous_prompt(
+        self, messages: List[Dict[str, str]], new_user_input: str
+    ) -> str:
+        """Async version of `OllamaRag.rewrite_ambiguous_prompt`."""
+        with stage("rewrite"):
+            return await self.rewriter.arewrite(messages, new_user_input)
+
+    @trace(tracer="opik", tags=["qa"])
+    async def aollama_llm_call(self, msgs: List[Dict[str, str]]) -> Dict[str, Any]:
+        """
+        Async version of `OllamaRag.ollama_llm_call`.
+
+        Args:
+            msgs (List[Dict[str, str]]): List of messages to send to the LLM.
+
+        Returns:
+            Dict[str, Any]: The complete response from the Ollama LLM.
+        """
+        response = await self.backend.achat(
+            self.model_name, msgs, options=self.generation_options()
+        )
+        metrics.observe_llm_response(response)
+        return response
+
+    @trace(tracer="opik", tags=["qa"])
+    async def aollama_llm_stream(
+        self, msgs: List[Dict[str, str]]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async version of `OllamaRag.ollama_llm_stream`.
+
+        Args:
+            msgs (List[Dict[str, str]]): List of messages to send to the LLM.
+
+        Yields:
+            Dict[str, Any]: Response frames; the last one carries usage metadata.
+        """
+        async for frame in self.backend.astream(
+            self.model_name, msgs, options=self.generation_options()
+        ):
+            if frame.get("done"):
+                metrics.observe_llm_response(frame)
+            yield frame
@@ -0,0 +1,450 @@
+import json
+import time
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Type
+
+import httpx
+
+from rag.config import ModelConfig
+
+Messages = List[Dict[str, str]]
+
+
+def normalize_base_url(host: str) -> str:
+    """Adds the scheme to a bare "host:port", as accepted by OLLAMA_HOST."""
+    host = host.strip().rstrip("/")
+    if "://" not in host:
+        host = f"http://{host}"
+    return host
+
+
+class ChatBackend(ABC):
+    """
+    A chat completion server behind a pooled HTTP client.
+
+    Connections are kept alive and reused across requests, up to
+    `max_connections` in flight. All backends return Ollama's chat response
+    format, so callers and the tracing postprocessor do not depend on the
+    server: `message.content` holds the text and the final response or stream
+    frame carries `prompt_eval_count`, `eval_count` and `total_duration`.
+
+    Options use Ollama's names (`temperature`, `seed`, `top_k`, `num_predict`,
+    `num_ctx`); each backend maps the ones its server supports.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 120.0,
+        max_connections: int = 16,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        """
+        Args:
+            base_url (str): Server URL, with or without the scheme.
+            timeout (float): Default request timeout in seconds.
+            max_connections (int): Max concurrent connections per client.
+            headers (Optional[Dict[str, str]]): Headers sent with every request.
+        """
+        self.base_url = normalize_base_url(base_url)
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.headers = headers or {}
+        self.client = httpx.Client(**self._client_options())
+        self._async_client: Optional[httpx.AsyncClient] = None
+
+    def _client_options(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "timeout": self.timeout,
+            "headers": self.headers,
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+        }
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(**self._client_options())
+        return self._async_client
+
+    def _timeout(self, timeout: Optional[float]) -> float:
+        return self.timeout if timeout is None else timeout
+
+    @abstractmethod
+    def chat(
+        self,
+        model: str,
+        messages: Messages,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Generates a complete chat response.
+
+        Args:
+            model (str): Model served by the backend.
+            messages (Messages): Messages in OpenAI-style chat format.
+            options (Optional[Dict[str, Any]]): Generation options, Ollama names.
+            timeout (Optional[float]): Overrides the default timeout.
+
+        Returns:
+            Dict[str, Any]: The response in Ollama's format.
+
+        Raises:
+            httpx.TimeoutException: If the server does not answer in time.
+            httpx.HTTPStatusError: If the server rejects the request.
+        """
+
+    @abstractmethod
+    def stream(
+        self,
+        model: str,
+        messages: Messages,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Streams a chat response; see `chat`. The last frame has `done` set."""
+
+    @abstractmethod
+    async def achat(
+        self,
+        model: str,
+        messages: Messages,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Async version of `chat`."""
+
+    @abstractmethod
+    def astream(
+        self,
+        model: str,
+        messages: Messages,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Async version of `stream`."""
+
+    def close(self) -> None:
+        """Closes the sync client; the async one is closed by `aclose`."""
+        self.client.close()
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+
+class OllamaBackend(ChatBackend):
+    """Ollama's native `/api/chat` endpoint."""
+
+    def __init__(self, base_url: str, keep_alive: int = -1, **kwargs: Any):
+        """
+        Args:
+            base_url (str): Ollama server URL, e.g. the OLLAMA_HOST value.
+            keep_alive (int): Ollama session timeout in seconds (-1 for infinite).
+            **kwargs: See `ChatBackend`.
+        """
+        super().__init__(base_url, **kwargs)
+        self.keep_alive = keep_alive
+
+    def _payload(
+        self,
+        model: str,
+        messages: Messages,
+        options: Optional[Dict[str, Any]],
+        stream: bool,
+    ) -> Dict[str, Any]:
+        return {
+            "model": model,
+            "messages": messages,
+            "options": options or {},
+            "keep_alive": self.keep_alive,
+            "stream": stream,
+        }
+
+    def chat(
+        self,
+        model: str,
+        messages: Messages,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        response = self.client.post(
+            "/api/chat",
+            json=self._payload(model, messages, options, stream=False),
+            timeout=self._timeout(timeout),
+        )
+        response.raise_for_status()
+        result: Dict[str, Any] = response.json()
+        return result
+
+    def stream(
+        self,
+        model: str,
+        messages: Messages,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        with self.client.stream(
+            "POST",
+            "/api/chat",
+            json=self._payload(model, messages, options, stream=True),
+            timeout=self._timeout(timeout),
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    async def achat(
+        self,
+        model: str,
+        messages: Messages,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        response = await self.async_client.post(
+            "/api/chat",
+            json=self._payload(model, messages, options, stream=False),
+            timeout=self._timeout(timeout),
+        )
+        response.raise_for_status()
+        result: Dict[str, Any] = response.json()
+        return result
+
+    async def astream(
+        self,
+        model: str,
+        messages: Messages,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        async with self.async_client.stream(
+            "POST",
+            "/api/chat",
+            json=self._payload(model, messages, options, stream=True),
+            timeout=self._timeout(timeout),
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    yield json.loads(line)
+
+
+class OpenAIBackend(ChatBackend):
+    """
+    OpenAI-compatible `/v1/chat/completions` endpoint, as served by vLLM and the
+    llama.cpp server.
+
+    `num_predict` maps to `max_tokens`; `top_k` and `seed` are sent as they are,
+    which both servers accept. `num_ctx` is ignored, the context size is a server
+    setting.
+    """
+
+    OPTIONS = {
+        "temperature": "temperature",
+        "seed": "seed",
+        "top_k": "top_k",
+        "top_p": "top_p",
+        "num_predict": "max_tokens",
+        "stop": "stop",
+    }
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None, **kwargs: Any):
+        """
+        Args:
+            base_url (str): Server URL without the "/v1" suffix.
+            api_key (Optional[str]): Sent as a bearer token if set.
+            **kwargs: See `ChatBackend`.
+        """
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        super().__init__(base_url, headers=headers, **kwargs)
+
+    def _payload(
+        self,
+        model: str,
+        messages: Messages,
+        options: Optional[Dict[str, Any]],
+        stream: bool,
+    ) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
+            "model": model,
+            "messages": messages,
+            "stream": stream,
+        }
+        for name, value in (options or {}).items():
+            if name in self.OPTIONS:
+                payload[self.OPTIONS[name]] = value
+        if stream:
+            payload["stream_options"] = {"include_usage": True}
+        return payload
+
+    @staticmethod
+    def _final(
+        model: str,
+        content: str,
+        finish: Optional[str],
+        usage: Dict[str, Any],
+        start: float,
+    ) -> Dict[str, Any]:
+        return {
+            "model": model,
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+            "done_reason": finish,
+            "prompt_eval_count": usage.get("prompt_tokens", 0),
+            "eval_count": usage.get("completion_tokens", 0),
+            "total_duration": int((time.perf_counter() - start) * 1e9),
+        }
+
+    def _response(
+        self, model: str, data: Dict[str, Any], start: float
+    ) -> Dict[str, Any]:
+        choice = (data.get("choices") or [{}])[0]
+        content = (choice.get("message") or {}).get("content") or ""
+        return self._final(
+            model, content, choice.get("finish_reason"), data.get("usage") or {}, start
+        )
+
+    @staticmethod
+    def _event(line: str) -> Optional[Dict[str, Any]]:
+        """Parses a server-sent event line; None for other lines and the end marker."""
+        if not line.startswith("data:"):
+            return None
+        data = line[len("data:") :].strip()
+        if not data or data == "[DONE]":
+            return None
+        event: Dict[str, Any] = json.loads(data)
+        return event
+
+    def _frames(
+        self, model: str, event: Dict[str, Any], state: Dict[str, Any]
+    ) -> Iterator[Dict[str, Any]]:
+        """Converts a stream chunk to frames; keeps the finish reason and usage."""
+        if event.get("usage"):
+            state["usage"] = event["usage"]
+        for choice in event.get("choices") or []:
+            if choice.get("finish_reason"):
+                state["finish"] = choice["finish_reason"]
+            content = (choice.get("delta") or {}).get("content")
+            if content:
+                yield {
+                    "model": model,
+                    "message": {"role": "assistant", "content": content},
+                    "done": False,
+                }
+
+    def chat(
+        self,
+        model: str,
+        messages: Messages,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        start = time.perf_counter()
+        response = self.client.post(
+            "/v1/chat/completions",
+            json=self._payload(model, messages, options, stream=False),
+            timeout=self._timeout(timeout),
+        )
+        response.raise_for_status()
+        return self._response(model, response.json(), start)
+
+    def stream(
+        self,
+        model: str,
+        messages: Messages,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        start = time.perf_counter()
+        state: Dict[str, Any] = {"usage": {}, "finish": None}
+        with self.client.stream(
+            "POST",
+            "/v1/chat/completions",
+            json=self._payload(model, messages, options, stream=True),
+            timeout=self._timeout(timeout),
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                event = self._event(line)
+                if event is not None:
+                    yield from self._frames(model, event, state)
+        yield self._final(model, "", state["finish"], state["usage"], start)
+
+    async def achat(
+        self,
+        model: str,
+        messages: Messages,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        start = time.perf_counter()
+        response = await self.async_client.post(
+            "/v1/chat/completions",
+            json=self._payload(model, messages, options, stream=False),
+            timeout=self._timeout(timeout),
+        )
+        response.raise_for_status()
+        return self._response(model, response.json(), start)
+
+    async def astream(
+        self,
+        model: str,
+        messages: Messages,
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        start = time.perf_counter()
+        state: Dict[str, Any] = {"usage": {}, "finish": None}
+        async with self.async_client.stream(
+            "POST",
+            "/v1/chat/completions",
+            json=self._payload(model, messages, options, stream=True),
+            timeout=self._timeout(timeout),
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                event = self._event(line)
+                if event is not None:
+                    for frame in self._frames(model, event, state):
+                        yield frame
+        yield self._final(model, "", state["finish"], state["usage"], start)
+
+
+BACKENDS: Dict[str, Type[ChatBackend]] = {
+    "ollama": OllamaBackend,
+    "openai": OpenAIBackend,
+}
+
+
+def create_backend(
+    config: ModelConfig, default_url: str = "127.0.0.1:11434", keep_alive: int = -1
+) -> ChatBackend:
+    """
+    Builds the chat backend selected by a model config.
+
+    Args:
+        config (ModelConfig): Backend kind, URL, credentials and pool settings.
+        default_url (str): Server URL when the config does not set one.
+        keep_alive (int): Ollama session timeout in seconds (-1 for infinite).
+
+    Returns:
+        ChatBackend: The backend, with its own connection pool.
+    """
+    if config.backend not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend: {config.backend}")
+
+    options: Dict[str, Any] = {
+        "timeout": config.timeout,
+        "max_connections": config.max_connections,
+    }
+    if config.backend == "ollama":
+        options["keep_alive"] = keep_alive
+    else:
+        options["api_key"] = config.api_key
+    return BACKENDS[config.backend](config.base_url or default_url, **options)
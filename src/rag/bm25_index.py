@@ -0,0 +1,563 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+from loguru import logger
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+INDEX_FILES = ("indptr", "postings", "tfs", "doc_lens", "ids")
+VOCAB_FILES = ("term_hashes", "term_rows")
+CURRENT_FILE = "CURRENT"
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercases and splits text into word tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def fingerprint(ids: Iterable[str]) -> str:
+    """
+    Order-independent fingerprint of a set of document IDs.
+
+    Used to detect whether a persisted index still matches its collection.
+    """
+    digest = hashlib.sha256()
+    for doc_id in sorted(ids):
+        digest.update(doc_id.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+@contextmanager
+def build_lock(path: str) -> Iterator[None]:
+    """
+    Holds an exclusive lock on the index at `path` across processes.
+
+    Worker processes that start on a stale index take turns: the first one
+    rebuilds it, the others wait and then load the saved result.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.lock", "w") as lock_file:
+        try:
+            import fcntl
+        except ImportError:
+            # No advisory locks on this platform; concurrent builds are still
+            # consistent, just wasted work.
+            yield
+            return
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def term_hash(term: str) -> int:
+    """64-bit hash of a term; collisions are negligible below billions of terms."""
+    digest = hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class Vocabulary:
+    """
+    Maps terms to their posting list rows by 64-bit term hash.
+
+    The terms of the CSR arrays are two arrays sorted by hash and looked up with
+    a binary search, so they are memory-mapped from disk like the postings
+    instead of being loaded into a dict by every process. Terms added since the
+    last compaction go to a small in-memory dict.
+    """
+
+    def __init__(self, hashes: np.ndarray, rows: np.ndarray):
+        """
+        Args:
+            hashes (np.ndarray): Sorted uint64 term hashes.
+            rows (np.ndarray): Posting list row of each hash.
+        """
+        self.hashes = hashes
+        self.rows = rows
+        self.extra: Dict[int, int] = {}
+
+    @classmethod
+    def from_arrays(cls, hashes: np.ndarray, rows: np.ndarray) -> "Vocabulary":
+        order = np.argsort(hashes, kind="stable")
+        return cls(
+            np.asarray(hashes, dtype=np.uint64)[order],
+            np.asarray(rows, dtype=np.int32)[order],
+        )
+
+    @classmethod
+    def from_terms(cls, terms: Dict[str, int]) -> "Vocabulary":
+        return cls.from_arrays(
+            np.fromiter((term_hash(term) for term in terms), np.uint64, len(terms)),
+            np.fromiter(terms.values(), np.int32, len(terms)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.hashes) + len(self.extra)
+
+    def _get(self, key: int) -> Optional[int]:
+        row = self.extra.get(key)
+        if row is not None:
+            return row
+        i = int(np.searchsorted(self.hashes, np.uint64(key)))
+        if i < len(self.hashes) and int(self.hashes[i]) == key:
+            return int(self.rows[i])
+        return None
+
+    def get(self, term: str) -> Optional[int]:
+        """The row of `term`, or None if it is not in the vocabulary."""
+        return self._get(term_hash(term))
+
+    def setdefault(self, term: str, row: int) -> int:
+        """The row of `term`, adding it with `row` if it is new."""
+        key = term_hash(term)
+        existing = self._get(key)
+        if existing is not None:
+            return existing
+        self.extra[key] = row
+        return row
+
+    def remap(self, used: np.ndarray, row_remap: np.ndarray) -> "Vocabulary":
+        """A vocabulary of the `used` rows only, renumbered with `row_remap`."""
+        hashes = np.concatenate(
+            [np.asarray(self.hashes), np.fromiter(self.extra, np.uint64)]
+        )
+        rows = np.concatenate(
+            [np.asarray(self.rows), np.fromiter(self.extra.values(), np.int32)]
+        )
+        keep = used[rows]
+        return Vocabulary.from_arrays(hashes[keep], row_remap[rows[keep]])
+
+
+def _csr_from_triples(
+    terms: np.ndarray, docs: np.ndarray, tfs: np.ndarray, n_terms: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    order = np.lexsort((docs, terms))
+    indptr = np.zeros(n_terms + 1, dtype=np.int64)
+    np.cumsum(np.bincount(terms, minlength=n_terms), out=indptr[1:])
+    return indptr, docs[order].astype(np.int32), tfs[order].astype(np.int32)
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a compressed sparse (CSR) inverted index.
+
+    Postings are stored term-major: the documents containing term `t` are
+    `postings[indptr[t]:indptr[t + 1]]` with matching term frequencies in `tfs`.
+    A query only touches the posting lists of its terms, so its cost scales with
+    the number of postings read, not with the size of the corpus.
+
+    The arrays are saved as `.npy` files and memory-mapped on load, so opening an
+    index neither re-tokenizes the corpus nor copies it into each process.
+
+    The CSR arrays are never modified in place. Added documents go to an in-memory
+    delta segment and deleted ones are tombstoned; `compact` folds both into new
+    CSR arrays without re-tokenizing anything. Corpus statistics follow every
+    update: the live document count and average length are maintained as documents
+    come and go, and document frequencies are counted over live postings at query
+    time.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        vocab: Union[Vocabulary, Dict[str, int]],
+        indptr: np.ndarray,
+        postings: np.ndarray,
+        tfs: np.ndarray,
+        doc_lens: np.ndarray,
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        """
+        Args:
+            ids (np.ndarray): Document IDs, indexed by internal document number.
+            vocab (Union[Vocabulary, Dict[str, int]]): Maps each term to its row
+                in `indptr`.
+            indptr (np.ndarray): Posting list offsets, one more than the vocab size.
+            postings (np.ndarray): Internal document numbers of all postings.
+            tfs (np.ndarray): Term frequency of each posting.
+            doc_lens (np.ndarray): Token count of each document.
+            k1 (float): BM25 term frequency saturation.
+            b (float): BM25 length normalization.
+        """
+        if not isinstance(vocab, Vocabulary):
+            vocab = Vocabulary.from_terms(vocab)
+        self.vocab = vocab
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._set_base(ids, indptr, postings, tfs, doc_lens)
+
+    def _set_base(
+        self,
+        ids: np.ndarray,
+        indptr: np.ndarray,
+        postings: np.ndarray,
+        tfs: np.ndarray,
+        doc_lens: np.ndarray,
+    ) -> None:
+        self.ids = ids
+        self.indptr = indptr
+        self.postings = postings
+        self.tfs = tfs
+        self.doc_lens = doc_lens
+
+        self._new_ids: List[str] = []
+        self._new_lens: List[int] = []
+        self._new_lens_array = np.zeros(0, dtype=np.int32)
+        self._new_postings: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        self._deleted: Set[int] = set()
+        self._doc_nums: Optional[Dict[str, int]] = None
+
+        self._live = len(ids)
+        self._total_len = int(np.sum(doc_lens, dtype=np.int64))
+
+    def __len__(self) -> int:
+        return self._live
+
+    @property
+    def avgdl(self) -> float:
+        """Average length of the live documents."""
+        return self._total_len / self._live if self._live else 0.0
+
+    @property
+    def dirty(self) -> bool:
+        """True if there are updates not yet folded into the CSR arrays."""
+        return bool(self._new_ids or self._deleted)
+
+    @classmethod
+    def build(
+        cls,
+        ids: Sequence[str],
+        texts: Sequence[str],
+        k1: float = 1.5,
+        b: float = 0.75,
+    ) -> "BM25Index":
+        """
+        Tokenizes the corpus and builds the inverted index.
+
+        Args:
+            ids (Sequence[str]): Document IDs.
+            texts (Sequence[str]): Document texts, aligned with `ids`.
+            k1 (float): BM25 term frequency saturation.
+            b (float): BM25 length normalization.
+
+        Returns:
+            BM25Index: The built index.
+        """
+        vocab: Dict[str, int] = {}
+        term_col: List[int] = []
+        doc_col: List[int] = []
+        tf_col: List[int] = []
+        doc_lens = np.zeros(len(texts), dtype=np.int32)
+
+        for doc_num, text in enumerate(texts):
+            tokens = tokenize(text or "")
+            doc_lens[doc_num] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                term_col.append(vocab.setdefault(term, len(vocab)))
+                doc_col.append(doc_num)
+                tf_col.append(tf)
+
+        indptr, postings, tfs = _csr_from_triples(
+            np.asarray(term_col, dtype=np.int32),
+            np.asarray(doc_col, dtype=np.int32),
+            np.asarray(tf_col, dtype=np.int32),
+            len(vocab),
+        )
+        return cls(
+            ids=np.asarray(ids, dtype=str),
+            vocab=vocab,
+            indptr=indptr,
+            postings=postings,
+            tfs=tfs,
+            doc_lens=doc_lens,
+            k1=k1,
+            b=b,
+        )
+
+    def _lookup(self) -> Dict[str, int]:
+        if self._doc_nums is None:
+            self._doc_nums = {str(doc_id): num for num, doc_id in enumerate(self.ids)}
+            for num, doc_id in enumerate(self._new_ids, start=len(self.ids)):
+                self._doc_nums[doc_id] = num
+            for num in self._deleted:
+                self._doc_nums.pop(self._doc_id(num), None)
+        return self._doc_nums
+
+    def _doc_id(self, num: int) -> str:
+        n_base = len(self.ids)
+        return str(self.ids[num]) if num < n_base else self._new_ids[num - n_base]
+
+    def _doc_len(self, num: int) -> int:
+        n_base = len(self.ids)
+        return int(self.doc_lens[num]) if num < n_base else self._new_lens[num - n_base]
+
+    def add(self, ids: Sequence[str], texts: Sequence[str]) -> None:
+        """
+        Adds documents to the index; existing IDs are replaced.
+
+        Args:
+            ids (Sequence[str]): Document IDs.
+            texts (Sequence[str]): Document texts, aligned with `ids`.
+        """
+        with self._lock:
+            self.delete(ids)
+            lookup = self._lookup()
+            for doc_id, text in zip(ids, texts):
+                num = len(self.ids) + len(self._new_ids)
+                tokens = tokenize(text or "")
+                for term, tf in Counter(tokens).items():
+                    self._new_postings[
+                        self.vocab.setdefault(term, len(self.vocab))
+                    ].append((num, tf))
+                self._new_ids.append(doc_id)
+                self._new_lens.append(len(tokens))
+                lookup[doc_id] = num
+                self._live += 1
+                self._total_len += len(tokens)
+            self._new_lens_array = np.asarray(self._new_lens, dtype=np.int32)
+
+    def delete(self, ids: Iterable[str]) -> None:
+        """
+        Removes documents from the index; unknown IDs are ignored.
+
+        Args:
+            ids (Iterable[str]): Document IDs.
+        """
+        with self._lock:
+            lookup = self._lookup()
+            for doc_id in ids:
+                num = lookup.pop(doc_id, None)
+                if num is None:
+                    continue
+                self._deleted.add(num)
+                self._live -= 1
+                self._total_len -= self._doc_len(num)
+
+    def _term_postings(self, term: int) -> Tuple[np.ndarray, np.ndarray]:
+        docs_parts, tfs_parts = [], []
+        if term < len(self.indptr) - 1:
+            start, end = self.indptr[term], self.indptr[term + 1]
+            docs_parts.append(np.asarray(self.postings[start:end]))
+            tfs_parts.append(np.asarray(self.tfs[start:end]))
+        if term in self._new_postings:
+            delta = np.asarray(self._new_postings[term], dtype=np.int32)
+            docs_parts.append(delta[:, 0])
+            tfs_parts.append(delta[:, 1])
+        if not docs_parts:
+            empty = np.zeros(0, dtype=np.int32)
+            return empty, empty
+
+        docs = np.concatenate(docs_parts)
+        tfs = np.concatenate(tfs_parts)
+        if self._deleted:
+            live = ~np.isin(docs, np.fromiter(self._deleted, dtype=np.int64))
+            docs, tfs = docs[live], tfs[live]
+        return docs, tfs
+
+    def _lengths(self, docs: np.ndarray) -> np.ndarray:
+        n_base = len(self.ids)
+        if not self._new_ids:
+            return np.asarray(self.doc_lens[docs])
+        lens = np.empty(len(docs), dtype=np.float64)
+        base = docs < n_base
+        lens[base] = self.doc_lens[docs[base]]
+        lens[~base] = self._new_lens_array[docs[~base] - n_base]
+        return lens
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Scores the documents matching any query term and returns the top `k`.
+
+        Args:
+            query (str): The search query.
+            k (int): Number of results to return.
+
+        Returns:
+            List[Tuple[str, float]]: (document ID, BM25 score), best first.
+        """
+        with self._lock:
+            rows = [self.vocab.get(token) for token in tokenize(query)]
+            query_terms = Counter(row for row in rows if row is not None)
+            if not query_terms or k <= 0 or not self._live:
+                return []
+
+            docs_parts, tfs_parts, weight_parts = [], [], []
+            for term, count in query_terms.items():
+                term_docs, term_tfs = self._term_postings(term)
+                df = len(term_docs)
+                if df == 0:
+                    continue
+                idf = np.log(1.0 + (self._live - df + 0.5) / (df + 0.5))
+                docs_parts.append(term_docs)
+                tfs_parts.append(term_tfs)
+                weight_parts.append(np.full(df, idf * count))
+
+            if not docs_parts:
+                return []
+
+            docs = np.concatenate(docs_parts)
+            tfs = np.concatenate(tfs_parts).astype(np.float64)
+            norm = self.k1 * (1.0 - self.b + self.b * self._lengths(docs) / self.avgdl)
+            contrib = (
+                np.concatenate(weight_parts) * tfs * (self.k1 + 1.0) / (tfs + norm)
+            )
+
+            matched, inverse = np.unique(docs, return_inverse=True)
+            scores = np.bincount(inverse, weights=contrib)
+
+            if len(scores) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+            else:
+                top = np.arange(len(scores))
+            top = top[np.argsort(-scores[top], kind="stable")]
+
+            return [(self._doc_id(int(matched[i])), float(scores[i])) for i in top]
+
+    def compact(self) -> None:
+        """Folds added and deleted documents into new CSR arrays."""
+        with self._lock:
+            if not self.dirty:
+                return
+
+            n_base_terms = len(self.indptr) - 1
+            base_terms = np.repeat(
+                np.arange(n_base_terms, dtype=np.int32), np.diff(self.indptr)
+            )
+            delta = [
+                (term, num, tf)
+                for term, postings in self._new_postings.items()
+                for num, tf in postings
+            ]
+            delta_arr = np.asarray(delta, dtype=np.int32).reshape(-1, 3)
+
+            terms = np.concatenate([base_terms, delta_arr[:, 0]])
+            docs = np.concatenate([np.asarray(self.postings), delta_arr[:, 1]])
+            tfs = np.concatenate([np.asarray(self.tfs), delta_arr[:, 2]])
+            ids = np.concatenate(
+                [np.asarray(self.ids, dtype=str), np.asarray(self._new_ids, dtype=str)]
+            )
+            doc_lens = np.concatenate(
+                [np.asarray(self.doc_lens), self._new_lens_array]
+            ).astype(np.int32)
+
+            keep = np.ones(len(ids), dtype=bool)
+            keep[list(self._deleted)] = False
+            doc_remap = np.cumsum(keep) - 1
+            live_postings = keep[docs]
+            terms, docs, tfs = (
+                terms[live_postings],
+                docs[live_postings],
+                tfs[live_postings],
+            )
+
+            # Drop terms whose postings were all deleted.
+            used = np.bincount(terms, minlength=len(self.vocab)) > 0
+            term_remap = np.cumsum(used) - 1
+            self.vocab = self.vocab.remap(used, term_remap)
+
+            indptr, postings, tfs = _csr_from_triples(
+                term_remap[terms], doc_remap[docs], tfs, len(self.vocab)
+            )
+            self._set_base(ids[keep], indptr, postings, tfs, doc_lens[keep])
+
+    def save(self, path: str) -> None:
+        """
+        Persists the index, vocabulary included, as `.npy` arrays.
+
+        Pending updates are compacted first. Like `IVFIndex.save`, every save is
+        written to a fresh subdirectory and published by atomically replacing the
+        `CURRENT` pointer, so a process loading the index never pairs arrays of
+        two saves. Processes that memory-mapped a previous save keep their view.
+
+        The save is stamped with the fingerprint of the indexed IDs, not of the
+        collection, so an index that misses documents another process added to
+        the collection fails the check in `load`.
+
+        Args:
+            path (str): Directory to write the index to.
+        """
+        directory = Path(path)
+        build = f"build-{uuid.uuid4().hex}"
+        (directory / build).mkdir(parents=True)
+
+        with self._lock:
+            self.compact()
+
+            arrays = [(name, getattr(self, name)) for name in INDEX_FILES]
+            arrays += zip(VOCAB_FILES, (self.vocab.hashes, self.vocab.rows))
+            for name, array in arrays:
+                np.save(directory / build / f"{name}.npy", np.asarray(array))
+
+            current = {
+                "build": build,
+                "k1": self.k1,
+                "b": self.b,
+                "fingerprint": fingerprint(str(doc_id) for doc_id in self.ids),
+            }
+            tmp = directory / f"{CURRENT_FILE}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(current, f)
+            os.replace(tmp, directory / CURRENT_FILE)
+
+        for old in directory.glob("build-*"):
+            if old.name != build:
+                shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(
+        cls, path: str, collection_fingerprint: Optional[str] = None
+    ) -> Optional["BM25Index"]:
+        """
+        Memory-maps the current save of a persisted index.
+
+        Args:
+            path (str): Directory the index was saved to.
+            collection_fingerprint (Optional[str]): If given, the index is only
+                returned when it was saved with the same fingerprint.
+
+        Returns:
+            Optional[BM25Index]: The index, or None if it is missing, stale or in
+                another format, in which case it is rebuilt.
+        """
+        directory = Path(path)
+        try:
+            with open(directory / CURRENT_FILE, "r", encoding="utf-8") as f:
+                current = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if "build" not in current:
+            logger.info(f"BM25 index at {path} has an unknown format, ignoring it.")
+            return None
+
+        if (
+            collection_fingerprint
+            and current.get("fingerprint") != collection_fingerprint
+        ):
+            logger.info(f"BM25 index at {path} is stale, ignoring it.")
+            return None
+
+        directory = directory / current["build"]
+        try:
+            arrays = {
+                name: np.load(directory / f"{name}.npy", mmap_mode="r")
+                for name in INDEX_FILES + VOCAB_FILES
+            }
+        except FileNotFoundError:
+            # Replaced by a concurrent save.
+            return None
+        vocab = Vocabulary(*(arrays.pop(name) for name in VOCAB_FILES))
+        return cls(vocab=vocab, k1=current["k1"], b=current["b"], **arrays)
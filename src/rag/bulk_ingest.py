@@ -0,0 +1,288 @@
+import hashlib
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, Set, Tuple
+
+import numpy as np
+from loguru import logger
+
+from rag.bm25_index import BM25Index
+from rag.ingest import CHUNK_SEPARATOR, IngestManifest, chunk_id, find_txt_files
+from rag.ollama_rag import OllamaRag
+
+
+def iter_chunks(path: Path) -> Iterator[str]:
+    """
+    Streams the "---"-separated chunks of a text file without reading it whole.
+
+    Yields the same chunks as `rag.ingest.split_chunks` on the full content.
+    """
+    buffer: List[str] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split(CHUNK_SEPARATOR)
+            for part in parts[:-1]:
+                buffer.append(part)
+                chunk = "".join(buffer).strip()
+                if chunk:
+                    yield chunk
+                buffer = []
+            buffer.append(parts[-1])
+    chunk = "".join(buffer).strip()
+    if chunk:
+        yield chunk
+
+
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    """Hashes a file in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class IngestStats:
+    """Counters reported by a bulk ingestion run."""
+
+    files: int = 0
+    skipped_files: int = 0
+    chunks: int = 0
+    embedded: int = 0
+    deleted: int = 0
+    seconds: float = 0.0
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.embedded / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class _Batch:
+    ids: List[str]
+    texts: List[str]
+    sources: List[str]
+    last_file_seq: int
+    embeddings: "Future[List[List[float]]]"
+
+
+@dataclass
+class _PendingFile:
+    source: str
+    sha256: str
+    chunk_ids: List[str]
+
+
+class BulkIngestor:
+    """
+    High-throughput, resumable ingestion for large catalogs.
+
+    Files and chunks are streamed. Chunks that are not yet in the collection are
+    grouped into embedding batches of up to `batch_size`, and up to `workers`
+    batches are embedded concurrently. Results are written to Chroma and the BM25
+    index in submission order, on the calling thread.
+
+    Progress is checkpointed to the ingestion manifest every
+    `checkpoint_interval` seconds and when the run is interrupted. A file is
+    recorded only after all of its chunks have been written. Chunk IDs are
+    content hashes, so a resumed run skips finished files and does not re-embed
+    chunks that were written before the interruption. Stale chunks are deleted
+    at the end of the run; until then checkpoints keep their IDs, so a resumed
+    run deletes the chunks of files it skips as finished.
+    """
+
+    def __init__(
+        self,
+        rag: OllamaRag,
+        batch_size: int = 64,
+        workers: int = 4,
+        checkpoint_interval: float = 30.0,
+    ):
+        """
+        Args:
+            rag (OllamaRag): The pipeline whose collection and indexes are updated.
+            batch_size (int): Maximum number of chunks per embedding request.
+            workers (int): Number of embedding batches in flight.
+            checkpoint_interval (float): Seconds between manifest checkpoints.
+        """
+        self.rag = rag
+        self.batch_size = batch_size
+        self.workers = workers
+        self.checkpoint_interval = checkpoint_interval
+
+    def run(self, file_path: str) -> IngestStats:
+        """
+        Ingests a `.txt` file or a directory of them.
+
+        Args:
+            file_path (str): Path to ingest.
+
+        Returns:
+            IngestStats: Counters and throughput of the run.
+        """
+        stats = IngestStats()
+        files = find_txt_files(file_path)
+        if files is None:
+            logger.warning(f"No valid .txt files found at {file_path}")
+            return stats
+
+        manifest = IngestManifest.load(self.rag.manifest_path)
+        legacy = self.rag._legacy_ids_by_content() if not manifest.sources else {}
+        stale: Set[str] = set(manifest.stale)
+        start = time.perf_counter()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                self._ingest_files(files, manifest, legacy, stale, pool, stats)
+
+            if Path(file_path).is_dir():
+                current = {str(txt_file.resolve()) for txt_file in files}
+                for source in manifest.sources_under(Path(file_path)):
+                    if source not in current:
+                        stale.update(manifest.remove(source))
+
+            stale -= manifest.referenced_ids()
+            if stale:
+                logger.info(f"Deleting {len(stale)} stale chunks.")
+                self.rag.delete_documents(sorted(stale), persist=False)
+                stats.deleted = len(stale)
+            stale.clear()
+
+            if self.rag.use_vector_index:
+                self.rag.refresh_vector_index()
+        finally:
+            self._checkpoint(manifest, stale)
+            stats.seconds = time.perf_counter() - start
+            logger.info(
+                f"Ingested {stats.files} files ({stats.skipped_files} unchanged), "
+                f"{stats.embedded}/{stats.chunks} chunks embedded, "
+                f"{stats.deleted} deleted in {stats.seconds:.1f}s "
+                f"({stats.chunks_per_sec:.1f} chunks/sec)."
+            )
+
+        return stats
+
+    def _ingest_files(
+        self,
+        files: List[Path],
+        manifest: IngestManifest,
+        legacy: Dict[str, List[str]],
+        stale: Set[str],
+        pool: ThreadPoolExecutor,
+        stats: IngestStats,
+    ) -> None:
+        in_flight: Deque[_Batch] = deque()
+        pending_files: Deque[Tuple[int, _PendingFile]] = deque()
+        seen: Set[str] = set()
+        ids: List[str] = []
+        texts: List[str] = []
+        sources: List[str] = []
+        file_seq = 0
+        start = last_checkpoint = time.perf_counter()
+
+        def complete_files(upto_seq: int) -> None:
+            """Records files whose chunks have all been written."""
+            while pending_files and pending_files[0][0] <= upto_seq:
+                _, done = pending_files.popleft()
+                manifest.update(done.source, done.sha256, done.chunk_ids)
+
+        def flush() -> None:
+            """Queues the buffered chunks that are not stored yet for embedding."""
+            nonlocal ids, texts, sources
+            if ids:
+                existing = set(
+                    self.rag.vector_store._collection.get(ids=ids, include=[])["ids"]
+                )
+                keep = [i for i, doc_id in enumerate(ids) if doc_id not in existing]
+                if keep:
+                    batch_texts = [texts[i] for i in keep]
+                    in_flight.append(
+                        _Batch(
+                            ids=[ids[i] for i in keep],
+                            texts=batch_texts,
+                            sources=[sources[i] for i in keep],
+                            last_file_seq=file_seq,
+                            embeddings=pool.submit(
+                                self.rag.embeddings.embed_documents, batch_texts
+                            ),
+                        )
+                    )
+                ids, texts, sources = [], [], []
+            if not in_flight:
+                complete_files(file_seq)
+
+        def drain(max_in_flight: int) -> None:
+            """Writes finished batches until at most `max_in_flight` remain."""
+            nonlocal last_checkpoint
+            while len(in_flight) > max_in_flight:
+                batch = in_flight.popleft()
+                self._write(batch, batch.embeddings.result())
+                stats.embedded += len(batch.ids)
+                complete_files(batch.last_file_seq)
+
+                now = time.perf_counter()
+                if now - last_checkpoint >= self.checkpoint_interval:
+                    self._checkpoint(manifest, stale)
+                    last_checkpoint = now
+                    logger.info(
+                        f"{stats.embedded} chunks embedded "
+                        f"({stats.embedded / (now - start):.1f} chunks/sec)."
+                    )
+
+        for txt_file in files:
+            source = str(txt_file.resolve())
+            sha256 = file_sha256(txt_file)
+            stats.files += 1
+            if manifest.is_unchanged(source, sha256):
+                stats.skipped_files += 1
+                continue
+
+            file_ids: List[str] = []
+            for chunk in iter_chunks(txt_file):
+                doc_id = chunk_id(chunk)
+                stats.chunks += 1
+                file_ids.append(doc_id)
+                stale.update(legacy.get(chunk, []))
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                ids.append(doc_id)
+                texts.append(chunk)
+                sources.append(source)
+                if len(ids) >= self.batch_size:
+                    flush()
+                    drain(self.workers)
+
+            stale.update(set(manifest.chunk_ids(source)) - set(file_ids))
+            file_seq += 1
+            pending_files.append(
+                (file_seq, _PendingFile(source, sha256, list(dict.fromkeys(file_ids))))
+            )
+
+        flush()
+        drain(0)
+        complete_files(file_seq)
+
+    def _write(self, batch: _Batch, embeddings: List[List[float]]) -> None:
+        """Stores embedded chunks in Chroma and the BM25 index."""
+        if not batch.ids:
+            return
+        self.rag.vector_store._collection.upsert(
+            ids=batch.ids,
+            embeddings=np.asarray(embeddings, dtype=np.float32),
+            documents=batch.texts,
+            metadatas=[{"source": source} for source in batch.sources],
+        )
+        self.rag.collection_version += 1
+        if self.rag.bm25 is None:
+            self.rag.bm25 = BM25Index.build([], [])
+        self.rag.bm25.add(batch.ids, batch.texts)
+
+    def _checkpoint(self, manifest: IngestManifest, stale: Set[str]) -> None:
+        manifest.stale = sorted(stale)
+        manifest.save()
+        self.rag.save_bm25_index()
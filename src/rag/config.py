@@ -1,7 +1,20 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 
 class ModelConfig(BaseModel):
-    name: str = "mistral"
+    name: str = "llama3:8b-instruct-q4_0"
     quantization: str = "bnb"
     max_tokens: int = 2048
+    # Chat backend: "ollama" or "openai" (vLLM, llama.cpp server).
+    backend: str = "ollama"
+    # Server URL; OLLAMA_HOST or the local Ollama server if unset.
+    base_url: Optional[str] = None
+    api_key: Optional[str] = None
+    # Request timeout in seconds and connections kept open per client.
+    timeout: float = 300.0
+    max_connections: int = 16
+    # Hugging Face tokenizer (name or local path) of the model, used to count
+    # prompt tokens exactly; estimated from the words when unset.
+    tokenizer: Optional[str] = None
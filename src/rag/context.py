@@ -0,0 +1,183 @@
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional, Sequence, Set, Tuple
+
+from langchain_core.documents import Document
+
+from rag.config import ModelConfig
+from rag.embedding_cache import normalize_text
+from rag.prompts import format_qa_chunk
+
+# Numbers are split into groups of up to three digits by Llama 3 style BPE
+# tokenizers; words and punctuation are counted separately.
+PIECE_PATTERN = re.compile(r"\d{1,3}|[^\W\d_]+|[^\w\s]")
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class TokenCounter:
+    """
+    Counts tokens for the target model.
+
+    An exact `tokenizer` (text -> token count) is used when given. Otherwise
+    tokens are estimated from words, digit groups and punctuation, times
+    `tokens_per_piece`. The ratio can be calibrated against token counts reported
+    by the model server, e.g. Ollama's `prompt_eval_count` for a cold prompt.
+    """
+
+    def __init__(
+        self,
+        tokenizer: Optional[Callable[[str], int]] = None,
+        tokens_per_piece: float = 1.15,
+    ):
+        """
+        Args:
+            tokenizer (Optional[Callable[[str], int]]): Exact token counter.
+            tokens_per_piece (float): Estimated tokens per word, digit group or
+                punctuation mark; slightly above 1 for English text with Llama 3.
+        """
+        self.tokenizer = tokenizer
+        self.tokens_per_piece = tokens_per_piece
+
+    @classmethod
+    def from_config(cls, config: ModelConfig) -> "TokenCounter":
+        """A counter using the model's tokenizer, if `config.tokenizer` is set."""
+        if config.tokenizer is None:
+            return cls()
+        return cls(load_tokenizer(config.tokenizer))
+
+    def count(self, text: str) -> int:
+        """Number of tokens in `text`."""
+        if self.tokenizer is not None:
+            return self.tokenizer(text)
+        return math.ceil(len(PIECE_PATTERN.findall(text)) * self.tokens_per_piece)
+
+    def calibrate(self, samples: Iterable[Tuple[str, int]]) -> None:
+        """
+        Fits `tokens_per_piece` to texts with known token counts.
+
+        Args:
+            samples (Iterable[Tuple[str, int]]): Texts and their actual token counts.
+        """
+        pieces = tokens = 0
+        for text, count in samples:
+            pieces += len(PIECE_PATTERN.findall(text))
+            tokens += count
+        if pieces:
+            self.tokens_per_piece = tokens / pieces
+
+
+def load_tokenizer(name: str) -> Callable[[str], int]:
+    """
+    Loads a Hugging Face tokenizer and returns a function counting its tokens.
+
+    Args:
+        name (str): Tokenizer name on the Hugging Face Hub or a local path.
+
+    Returns:
+        Callable[[str], int]: Number of tokens of a text, without special tokens.
+    """
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(name)
+
+    def count(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+    return count
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """Jaccard similarity of two word sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class PackedContext:
+    """Chunks selected for the prompt and how the budget was spent."""
+
+    text: str = ""
+    documents: List[Document] = field(default_factory=list)
+    tokens: int = 0
+    duplicates: int = 0
+    over_budget: int = 0
+
+
+class ContextPacker:
+    """
+    Builds the prompt context from scored chunks within a token budget.
+
+    Chunks are taken by descending score. A chunk is skipped if it is a near
+    duplicate of one already taken (Jaccard similarity of their word sets at or
+    above `dedup_threshold`), or if it no longer fits the remaining budget; a
+    smaller chunk further down may still fit. Chunks are formatted once as
+    "Q: ...\\nA: ..." entries and measured in that form.
+    """
+
+    def __init__(
+        self,
+        counter: Optional[TokenCounter] = None,
+        max_tokens: int = 1024,
+        dedup_threshold: float = 0.85,
+    ):
+        """
+        Args:
+            counter (Optional[TokenCounter]): Token counter of the target model.
+            max_tokens (int): Token budget of the context.
+            dedup_threshold (float): Word-set Jaccard similarity at which two
+                chunks count as duplicates; 1.0 only drops identical chunks.
+        """
+        self.counter = counter or TokenCounter()
+        self.max_tokens = max_tokens
+        self.dedup_threshold = dedup_threshold
+
+    def pack(
+        self,
+        results: Sequence[Tuple[Document, float]],
+        max_tokens: Optional[int] = None,
+    ) -> PackedContext:
+        """
+        Selects and formats chunks for the prompt.
+
+        Args:
+            results (Sequence[Tuple[Document, float]]): Scored chunks, e.g. the
+                fused vector and BM25 results.
+            max_tokens (Optional[int]): Overrides the packer's budget.
+
+        Returns:
+            PackedContext: The context text, the chunks it holds and token usage.
+        """
+        budget = self.max_tokens if max_tokens is None else max_tokens
+        separator = self.counter.count("\n")
+        packed = PackedContext()
+        entries: List[str] = []
+        seen: List[Set[str]] = []
+        exact: Set[str] = set()
+
+        for doc, _ in sorted(results, key=lambda result: result[1], reverse=True):
+            normalized = normalize_text(doc.page_content).lower()
+            words = set(WORD_PATTERN.findall(normalized))
+            if normalized in exact or any(
+                jaccard(words, other) >= self.dedup_threshold for other in seen
+            ):
+                packed.duplicates += 1
+                continue
+
+            entry = format_qa_chunk(doc.page_content)
+            if not entry:
+                continue
+            cost = self.counter.count(entry) + (separator if entries else 0)
+            if packed.tokens + cost > budget:
+                packed.over_budget += 1
+                continue
+
+            exact.add(normalized)
+            seen.append(words)
+            entries.append(entry)
+            packed.documents.append(doc)
+            packed.tokens += cost
+
+        packed.text = "\n".join(entries)
+        return packed
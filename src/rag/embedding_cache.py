@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes Unicode and whitespace so trivially different inputs share a key."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-addressed cache in front of an embedding model.
+
+    Entries are keyed by (embedding model, hash of the normalized text). Lookups go
+    to a bounded in-memory LRU first, then to an optional on-disk SQLite store
+    that is shared by ingestion and query processes. Only misses reach the wrapped
+    model, batched into a single call. Vectors are kept as float32 arrays and only
+    converted to lists when returned. The async methods run the lookups and
+    stores, which may wait on SQLite, in a thread instead of on the event loop.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model: str,
+        path: Optional[str] = None,
+        memory_size: int = 4096,
+        disk_size: int = 200_000,
+    ):
+        """
+        Args:
+            embeddings (Embeddings): The embedding model to cache.
+            model (str): Model identifier, part of every cache key.
+            path (Optional[str]): SQLite file for the on-disk store; memory only if None.
+            memory_size (int): Maximum number of vectors kept in memory.
+            disk_size (int): Maximum number of vectors kept on disk.
+        """
+        self.embeddings = embeddings
+        self.model = model
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_count = 0
+
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+            )
+            self._disk_count = self._db.execute(
+                "SELECT COUNT(*) FROM embeddings"
+            ).fetchone()[0]
+
+    def key(self, text: str) -> str:
+        """Cache key of `text` for this model."""
+        payload = f"{self.model}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current sizes."""
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+            "disk_entries": self._disk_count,
+        }
+
+    def _lookup(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors of `keys`; the caller holds `self._lock`."""
+        found: Dict[str, np.ndarray] = {}
+        for key in keys:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                found[key] = vector
+
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if self._db is None:
+            return found
+        # Stay below SQLite's limit on bound parameters.
+        for i in range(0, len(missing), 500):
+            part = missing[i : i + 500]
+            rows = self._db.execute(
+                "SELECT key, vector FROM embeddings WHERE key IN "
+                f"({','.join('?' * len(part))})",
+                part,
+            ).fetchall()
+            for key, blob in rows:
+                vector = np.frombuffer(blob, dtype=np.float32)
+                found[key] = vector
+                self._remember(key, vector)
+            self.disk_hits += len(rows)
+        return found
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _store(self, entries: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            for key, vector in entries.items():
+                self._remember(key, vector)
+
+            if self._db is None or not entries:
+                return
+            try:
+                with self._db:
+                    cursor = self._db.executemany(
+                        "INSERT OR IGNORE INTO embeddings (key, vector) VALUES (?, ?)",
+                        [(key, vector.tobytes()) for key, vector in entries.items()],
+                    )
+                    self._disk_count += max(cursor.rowcount, 0)
+                    overflow = self._disk_count - self.disk_size
+                    if overflow > 0:
+                        # Oldest entries first; rowids grow with insertion order.
+                        self._db.execute(
+                            "DELETE FROM embeddings WHERE rowid IN "
+                            "(SELECT rowid FROM embeddings ORDER BY rowid LIMIT ?)",
+                            (overflow,),
+                        )
+                        self._disk_count = self.disk_size
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding cache write failed: {e}")
+
+    def _split(
+        self, texts: List[str]
+    ) -> Tuple[List[str], Dict[str, np.ndarray], Dict[str, str]]:
+        """Looks up `texts` and returns their keys, the cached vectors and the misses."""
+        keys = [self.key(text) for text in texts]
+        misses: Dict[str, str] = {}
+        with self._lock:
+            found = self._lookup(keys)
+            for key, text in zip(keys, texts):
+                if key not in found:
+                    misses.setdefault(key, text)
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += len(misses)
+        return keys, found, misses
+
+    @staticmethod
+    def _computed(
+        keys: Sequence[str], vectors: Sequence[Sequence[float]]
+    ) -> Dict[str, np.ndarray]:
+        return {
+            key: np.asarray(vector, dtype=np.float32)
+            for key, vector in zip(keys, vectors)
+        }
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, misses = self._split(texts)
+        if misses:
+            vectors = self.embeddings.embed_documents(list(misses.values()))
+            computed = self._computed(list(misses), vectors)
+            self._store(computed)
+            found.update(computed)
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, found, misses = self._split([text])
+        if misses:
+            found = self._computed(keys, [self.embeddings.embed_query(text)])
+            self._store(found)
+        return found[keys[0]].tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, misses = await asyncio.to_thread(self._split, texts)
+        if misses:
+            vectors = await self.embeddings.aembed_documents(list(misses.values()))
+            computed = self._computed(list(misses), vectors)
+            await asyncio.to_thread(self._store, computed)
+            found.update(computed)
+        return [found[key].tolist() for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, found, misses = await asyncio.to_thread(self._split, [text])
+        if misses:
+            found = self._computed(keys, [await self.embeddings.aembed_query(text)])
+            await asyncio.to_thread(self._store, found)
+        return found[keys[0]].tolist()
@@ -0,0 +1,210 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from langchain_core.documents import Document
+
+RRF_K = 60
+
+
+def get_doc_id(doc: Document) -> str:
+    return doc.id or doc.metadata.get("id") or f"hash:{hash(doc.page_content[:100])}"
+
+
+def score_matrix(
+    id_lists: Sequence[Sequence[str]], score_lists: Sequence[Sequence[float]]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Aligns several ranked lists on the union of their candidate IDs.
+
+    Candidates are ordered by first appearance across the lists. A candidate that
+    appears more than once in a list keeps its best score; a candidate missing from
+    a list, or given a NaN score, is NaN in that row.
+
+    Args:
+        id_lists (Sequence[Sequence[str]]): Candidate IDs of each list.
+        score_lists (Sequence[Sequence[float]]): Scores, aligned with `id_lists`.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The candidate IDs and a
+            (lists x candidates) score matrix.
+    """
+    sizes = [len(ids) for ids in id_lists]
+    all_ids = np.asarray([doc_id for ids in id_lists for doc_id in ids], dtype=object)
+    if all_ids.size == 0:
+        return all_ids, np.empty((len(id_lists), 0))
+
+    unique, first, inverse = np.unique(
+        all_ids.astype(str), return_index=True, return_inverse=True
+    )
+    # Renumber the candidates by first appearance instead of lexical order.
+    order = np.argsort(first, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(order.size)
+    columns = rank[inverse]
+
+    rows = np.repeat(np.arange(len(id_lists)), sizes)
+    scores = np.concatenate(
+        [np.asarray(s, dtype=np.float64).reshape(-1) for s in score_lists]
+    )
+    matrix = np.full((len(id_lists), unique.size), -np.inf)
+    np.fmax.at(matrix, (rows, columns), scores)
+    matrix[np.isneginf(matrix)] = np.nan
+    return all_ids[first[order]], matrix
+
+
+def normalize_scores(matrix: np.ndarray, method: str = "minmax") -> np.ndarray:
+    """
+    Normalizes each row of a score matrix, ignoring missing (NaN) scores.
+
+    Args:
+        matrix (np.ndarray): (lists x candidates) score matrix.
+        method (str): "minmax" maps each row to [0, 1], "max" divides by the row
+            maximum and "none" leaves the scores as they are. A row without any
+            spread normalizes to 1.
+
+    Returns:
+        np.ndarray: The normalized matrix.
+    """
+    if method == "none" or matrix.size == 0:
+        return matrix
+
+    present = ~np.isnan(matrix)
+    safe = np.where(present, matrix, 0.0)
+    high = np.max(np.where(present, matrix, -np.inf), axis=1, keepdims=True)
+    if method == "max":
+        scale = np.where(high > 0, high, 1.0)
+        return np.where(present, safe / scale, np.nan)
+    if method == "minmax":
+        low = np.min(np.where(present, matrix, np.inf), axis=1, keepdims=True)
+        spread = high - low
+        scaled = np.where(
+            spread > 0, (safe - low) / np.where(spread > 0, spread, 1.0), 1.0
+        )
+        return np.where(present, scaled, np.nan)
+    raise ValueError(f"Unknown normalization: {method}")
+
+
+def linear(matrix: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Weighted sum of the scores; a missing score counts as 0."""
+    return np.nan_to_num(matrix, nan=0.0).T @ weights
+
+
+def reciprocal_rank(
+    matrix: np.ndarray, weights: np.ndarray, k: int = RRF_K
+) -> np.ndarray:
+    """Reciprocal Rank Fusion: sum of weight / (k + rank) over the lists."""
+    filled = np.where(np.isnan(matrix), -np.inf, matrix)
+    order = np.argsort(-filled, axis=1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, matrix.shape[1] + 1), axis=1)
+    contributions = np.where(np.isnan(matrix), 0.0, 1.0 / (k + ranks))
+    return contributions.T @ weights
+
+
+def comb_mnz(matrix: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """CombMNZ: weighted sum of the scores times the number of lists with a score."""
+    hits = (~np.isnan(matrix)).sum(axis=0)
+    return linear(matrix, weights) * hits
+
+
+FUSION_STRATEGIES: Dict[str, Callable[..., np.ndarray]] = {
+    "linear": linear,
+    "rrf": reciprocal_rank,
+    "combmnz": comb_mnz,
+}
+
+
+def top_k_indices(scores: np.ndarray, k: Optional[int]) -> np.ndarray:
+    """Indices of the `k` highest scores in descending order; ties keep their order."""
+    if k is None or k >= scores.size:
+        return np.argsort(-scores, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    candidates = np.sort(np.argpartition(-scores, k - 1)[:k])
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def fuse(
+    id_lists: Sequence[Sequence[str]],
+    score_lists: Sequence[Sequence[float]],
+    strategy: str = "linear",
+    weights: Optional[Sequence[float]] = None,
+    normalization: Union[str, Sequence[str]] = "minmax",
+    top_k: Optional[int] = None,
+    intersection_only: bool = False,
+    **options: Any,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fuses several ranked candidate lists into one.
+
+    Args:
+        id_lists (Sequence[Sequence[str]]): Candidate IDs of each list.
+        score_lists (Sequence[Sequence[float]]): Scores, aligned with `id_lists`.
+        strategy (str): One of `FUSION_STRATEGIES`.
+        weights (Optional[Sequence[float]]): Weight of each list, 1 by default.
+        normalization (Union[str, Sequence[str]]): Normalization applied to every
+            list, or one per list; see `normalize_scores`.
+        top_k (Optional[int]): Number of results to return; all if None.
+        intersection_only (bool): Only keep candidates found by every list.
+        **options: Extra arguments for the strategy, e.g. `k` for "rrf".
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The fused IDs and scores, best first.
+    """
+    if strategy not in FUSION_STRATEGIES:
+        raise ValueError(f"Unknown fusion strategy: {strategy}")
+
+    ids, matrix = score_matrix(id_lists, score_lists)
+    if ids.size == 0:
+        return ids, np.empty(0)
+
+    methods = (
+        [normalization] * len(id_lists)
+        if isinstance(normalization, str)
+        else list(normalization)
+    )
+    if len(methods) != len(id_lists):
+        raise ValueError("Expected one normalization per list.")
+    matrix = np.vstack(
+        [
+            normalize_scores(matrix[i : i + 1], method)
+            for i, method in enumerate(methods)
+        ]
+    )
+
+    weight_array = (
+        np.ones(len(id_lists))
+        if weights is None
+        else np.asarray(weights, dtype=np.float64)
+    )
+    fused = FUSION_STRATEGIES[strategy](matrix, weight_array, **options)
+
+    if intersection_only:
+        keep = np.flatnonzero(~np.isnan(matrix).any(axis=0))
+        ids, fused = ids[keep], fused[keep]
+
+    best = top_k_indices(fused, top_k)
+    return ids[best], fused[best]
+
+
+def fuse_documents(
+    result_lists: Sequence[Sequence[Tuple[Document, float]]],
+    **kwargs: Any,
+) -> List[Tuple[Document, float]]:
+    """
+    Fuses several (Document, score) result lists; see `fuse` for the arguments.
+
+    Returns:
+        List[Tuple[Document, float]]: The fused documents and scores, best first.
+    """
+    docs: Dict[str, Document] = {}
+    id_lists: List[List[str]] = []
+    for results in result_lists:
+        ids = [get_doc_id(doc) for doc, _ in results]
+        for doc_id, (doc, _) in zip(ids, results):
+            docs.setdefault(doc_id, doc)
+        id_lists.append(ids)
+
+    score_lists = [[score for _, score in results] for results in result_lists]
+    fused_ids, scores = fuse(id_lists, score_lists, **kwargs)
+    return [(docs[doc_id], float(score)) for doc_id, score in zip(fused_ids, scores)]
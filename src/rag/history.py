@@ -0,0 +1,183 @@
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from rag.context import TokenCounter
+
+# Per-message overhead of chat templates (role header and end-of-turn markers).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+Summarizer = Callable[[str, List[Dict[str, str]]], str]
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _summary_pool() -> ThreadPoolExecutor:
+    """Process-wide pool that runs history summaries for all conversations."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="history")
+        return _pool
+
+
+class ConversationHistory:
+    """
+    Chat history with a bounded prompt size.
+
+    The messages sent to the model are the system prompt, a running summary of
+    older turns and the most recent turns that fit in `max_tokens`; the latest
+    turn is always kept. Turns that fall out of the window are folded into the
+    summary by `summarize(previous_summary, turns)` on a background thread, so
+    the request that evicts them does not wait. Until the summary catches up,
+    the previous one is used.
+
+    Without a summarizer, evicted turns are dropped. With `on_evict` they are
+    handed to the caller instead, which then owns the summary, e.g. to keep it
+    in shared storage.
+    """
+
+    def __init__(
+        self,
+        system_prompt: str,
+        summarize: Optional[Summarizer] = None,
+        counter: Optional[TokenCounter] = None,
+        max_tokens: int = 1024,
+        evict_to: float = 1.0,
+        executor: Optional[Executor] = None,
+        on_evict: Optional[Callable[[List[Dict[str, str]]], None]] = None,
+    ):
+        """
+        Args:
+            system_prompt (str): The system prompt, always sent first.
+            summarize (Optional[Summarizer]): Folds evicted turns into the summary.
+            counter (Optional[TokenCounter]): Token counter of the target model.
+            max_tokens (int): Token budget of the recent turns.
+            evict_to (float): Once over budget, evict down to this fraction of
+                `max_tokens`. Values below 1 evict in larger steps, so the
+                message prefix stays unchanged for several turns, which lets the
+                model server reuse its prompt cache.
+            executor (Optional[Executor]): Runs the summaries; a shared pool by
+                default.
+            on_evict (Optional[Callable[[List[Dict[str, str]]], None]]): Called
+                with the evicted turns instead of summarizing them.
+        """
+        self.system_prompt = system_prompt
+        self.summarize = summarize
+        self.counter = counter or TokenCounter()
+        self.max_tokens = max_tokens
+        self.evict_to = evict_to
+        self.executor = executor
+        self.on_evict = on_evict
+
+        self.summary = ""
+        self.turns: List[Dict[str, str]] = []
+        self._turn_tokens: List[int] = []
+        self._pending: List[Dict[str, str]] = []
+        self._summarizing = False
+        self._idle = threading.Event()
+        self._idle.set()
+        self._lock = threading.Lock()
+
+    def messages(self) -> List[Dict[str, str]]:
+        """The messages to send to the model before the new user input."""
+        with self._lock:
+            messages = [{"role": "system", "content": self.system_prompt}]
+            if self.summary:
+                content = f"Summary of the earlier conversation:\n{self.summary}"
+                messages.append({"role": "system", "content": content})
+            return messages + list(self.turns)
+
+    def state(self) -> Tuple[str, List[Dict[str, str]]]:
+        """The summary and the recent turns, e.g. to save the conversation."""
+        with self._lock:
+            return self.summary, [dict(turn) for turn in self.turns]
+
+    def restore(self, summary: str, turns: List[Dict[str, str]]) -> None:
+        """Loads a saved summary and recent turns."""
+        with self._lock:
+            self.summary = summary
+            self.turns = [dict(turn) for turn in turns]
+            self._turn_tokens = [
+                self.counter.count(turn["content"]) + MESSAGE_OVERHEAD_TOKENS
+                for turn in self.turns
+            ]
+
+    def tokens(self) -> int:
+        """Tokens of the recent turns currently in the window."""
+        with self._lock:
+            return sum(self._turn_tokens)
+
+    def add_turn(self, user: str, assistant: str) -> None:
+        """Appends a question and its answer, evicting older turns if needed."""
+        self.append("user", user)
+        self.append("assistant", assistant)
+
+    def append(self, role: str, content: str) -> None:
+        """Appends a message, evicting older turns if needed."""
+        with self._lock:
+            self.turns.append({"role": role, "content": content})
+            self._turn_tokens.append(
+                self.counter.count(content) + MESSAGE_OVERHEAD_TOKENS
+            )
+            evicted = self._evict()
+            if not evicted:
+                return
+            if self.on_evict is None:
+                if self.summarize is None:
+                    return
+                self._pending.extend(evicted)
+                if self._summarizing:
+                    return
+                self._summarizing = True
+                self._idle.clear()
+
+        if self.on_evict is not None:
+            self.on_evict(evicted)
+            return
+        executor = self.executor or _summary_pool()
+        executor.submit(self._summarize_pending)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Waits for pending summaries; returns False on timeout."""
+        return self._idle.wait(timeout)
+
+    def _evict(self) -> List[Dict[str, str]]:
+        """Removes the oldest turns beyond the budget, keeping the latest turn."""
+        evicted: List[Dict[str, str]] = []
+        if sum(self._turn_tokens) <= self.max_tokens:
+            return evicted
+
+        target = self.max_tokens * self.evict_to
+        while len(self.turns) > 2 and sum(self._turn_tokens) > target:
+            # Evict whole turns so the window never starts with an answer.
+            count = 2 if self.turns[0]["role"] == "user" else 1
+            evicted.extend(self.turns[:count])
+            del self.turns[:count]
+            del self._turn_tokens[:count]
+        return evicted
+
+    def _summarize_pending(self) -> None:
+        assert self.summarize is not None
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._summarizing = False
+                    self._idle.set()
+                    return
+                batch, self._pending = self._pending, []
+                summary = self.summary
+
+            try:
+                summary = self.summarize(summary, batch)
+            except Exception as e:
+                logger.warning(
+                    f"History summary failed, dropping {len(batch)} messages: {e}"
+                )
+                continue
+
+            with self._lock:
+                self.summary = summary.strip()
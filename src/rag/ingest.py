@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from loguru import logger
+
+CHUNK_SEPARATOR = "---"
+
+
+def split_chunks(content: str) -> List[str]:
+    """Splits a Q&A text file into its "---"-separated chunks."""
+    return [chunk.strip() for chunk in content.split(CHUNK_SEPARATOR) if chunk.strip()]
+
+
+def content_hash(data: bytes) -> str:
+    """Returns the SHA-256 hex digest of `data`."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def chunk_id(text: str) -> str:
+    """
+    Content-addressed ID of a chunk.
+
+    Identical chunks always map to the same ID, so re-ingesting them is a no-op.
+    """
+    return content_hash(text.encode("utf-8"))
+
+
+def find_txt_files(file_path: str) -> Optional[List[Path]]:
+    """
+    Resolves the `.txt` files to ingest from a file or directory path.
+
+    Returns:
+        Optional[List[Path]]: The files, or None if the path is not valid.
+    """
+    path = Path(file_path)
+    if path.is_file() and path.suffix == ".txt":
+        return [path]
+    if path.is_dir():
+        return sorted(path.glob("*.txt"))
+    return None
+
+
+class IngestManifest:
+    """
+    Records, per ingested source file, its content hash and the IDs of its chunks.
+
+    The manifest lets ingestion skip unchanged files and find the chunks that
+    disappeared from a file, or whose file was removed, without touching the rest
+    of the collection. Chunk IDs that are due for deletion are kept in `stale`
+    until they are deleted, so an interrupted run deletes them when resumed.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        sources: Optional[Dict[str, Dict]] = None,
+        stale: Optional[List[str]] = None,
+    ):
+        """
+        Args:
+            path (str): Where the manifest is stored.
+            sources (Optional[Dict[str, Dict]]): Maps each source path to
+                {"sha256": ..., "chunk_ids": [...]}.
+            stale (Optional[List[str]]): IDs of chunks still to be deleted.
+        """
+        self.path = path
+        self.sources: Dict[str, Dict] = sources or {}
+        self.stale: List[str] = stale or []
+
+    @classmethod
+    def load(cls, path: str) -> "IngestManifest":
+        """Loads the manifest at `path`, or returns an empty one."""
+        if not os.path.exists(path):
+            return cls(path)
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(path, data.get("sources", {}), data.get("stale", []))
+
+    def save(self) -> None:
+        """Atomically writes the manifest to disk."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"sources": self.sources, "stale": self.stale}, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def is_unchanged(self, source: str, sha256: str) -> bool:
+        """True if `source` was ingested with exactly this content."""
+        entry = self.sources.get(source)
+        return entry is not None and entry.get("sha256") == sha256
+
+    def chunk_ids(self, source: str) -> List[str]:
+        """IDs of the chunks last ingested from `source`."""
+        return list(self.sources.get(source, {}).get("chunk_ids", []))
+
+    def update(self, source: str, sha256: str, chunk_ids: List[str]) -> None:
+        """Records the current content of `source`."""
+        self.sources[source] = {"sha256": sha256, "chunk_ids": chunk_ids}
+
+    def remove(self, source: str) -> List[str]:
+        """Forgets `source` and returns the IDs of its chunks."""
+        entry = self.sources.pop(source, None)
+        if entry is None:
+            return []
+        logger.info(f"Source {source} was removed.")
+        return list(entry.get("chunk_ids", []))
+
+    def sources_under(self, directory: Path) -> List[str]:
+        """Sources recorded directly inside `directory`."""
+        resolved = directory.resolve()
+        return [src for src in self.sources if Path(src).parent == resolved]
+
+    def referenced_ids(self) -> Set[str]:
+        """IDs referenced by any source; identical chunks may be shared."""
+        return {
+            doc_id
+            for entry in self.sources.values()
+            for doc_id in entry.get("chunk_ids", [])
+        }
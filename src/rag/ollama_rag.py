@@ -1,27 +1,57 @@
 import os
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
-from uuid import uuid4
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
 
 import chromadb
-import ollama
+from chromadb.api.client import Client as ChromaClient
 from chromadb.config import Settings
 from langchain_chroma import Chroma
-from langchain_core import documents
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_ollama import OllamaEmbeddings
 from loguru import logger
 
-from observability import trace
-from rag.prompts import format_prompt
-from rag.utils import build_langchain_bm25_retriever, fuse_with_bm25
+from observability import (
+    activate_trace,
+    finish_trace,
+    metrics,
+    request_trace,
+    stage,
+    start_trace,
+    trace,
+)
+from rag.answer_cache import SemanticAnswerCache
+from rag.backends import ChatBackend, create_backend
+from rag.bm25_index import BM25Index, build_lock, fingerprint
+from rag.config import ModelConfig
+from rag.context import ContextPacker, TokenCounter
+from rag.embedding_cache import CachedEmbeddings
+from rag.history import ConversationHistory
+from rag.ingest import (
+    IngestManifest,
+    chunk_id,
+    content_hash,
+    find_txt_files,
+    split_chunks,
+)
+from rag.prompts import (
+    SYSTEM_PROMPT,
+    format_prompt,
+    format_summary_prompt,
+    with_instructions,
+)
+from rag.rewrite import QueryRewriter
+from rag.speculative import Prepared, Speculator
+from rag.utils import fuse_with_bm25
+from rag.vector_index import IVFIndex
 
 
 class OllamaRag:
     """
     A configurable Retrieval-Augmented Generation (RAG) pipeline using:
 
-    - Ollama for LLM-based chat completion and embeddings.
+    - Ollama for embeddings and, by default, LLM-based chat completion; any
+      backend in `rag.backends` can serve the chat model.
     - Chroma as the persistent vector store.
 
     This class supports document ingestion, retrieval with relevance scoring,
@@ -42,6 +72,34 @@ class OllamaRag:
         top_k: int = 1,
         num_predict: int = 1000,
         score_threshold: float = 0.4,
+        embedding_cache_size: int = 4096,
+        embedding_cache_path: Optional[str] = None,
+        answer_cache_size: int = 1024,
+        answer_cache_threshold: float = 0.95,
+        answer_cache_ttl: float = 3600.0,
+        rewrite_model: Optional[str] = None,
+        rewrite_num_predict: int = 64,
+        rewrite_timeout: float = 2.0,
+        rewrite_cache_size: int = 512,
+        speculative: bool = False,
+        rewrite_deadline: Optional[float] = None,
+        speculative_concurrency: int = 4,
+        retrieval_k: int = 5,
+        context_k: int = 5,
+        fusion_strategy: str = "linear",
+        fusion_alpha: float = 0.4,
+        vector_index: bool = False,
+        vector_index_nprobe: int = 8,
+        vector_index_quantization: str = "none",
+        vector_index_rescore: int = 4,
+        context_tokens: int = 1024,
+        history_tokens: int = 1024,
+        summary_tokens: int = 256,
+        prompt_layout: str = "prefix_cache",
+        num_ctx: Optional[int] = None,
+        backend_config: Optional[ModelConfig] = None,
+        backend: Optional[ChatBackend] = None,
+        embeddings: Optional[Embeddings] = None,
     ):
         """
         Initializes the RAG system with configurable parameters.
@@ -59,23 +117,106 @@ class OllamaRag:
             top_k (int): Top-k token sampling for decoding.
             num_predict (int): Max number of tokens to generate.
             score_threshold (float): Minimum similarity score to include a document.
+            embedding_cache_size (int): Embeddings kept in memory; 0 disables caching.
+            embedding_cache_path (Optional[str]): On-disk embedding cache, shared by
+                ingestion and queries. Defaults to a file next to the vector DB.
+            answer_cache_size (int): Answers kept for near-duplicate questions;
+                0 disables the answer cache.
+            answer_cache_threshold (float): Minimum cosine similarity between
+                questions to serve a cached answer.
+            answer_cache_ttl (float): Seconds a cached answer stays valid.
+            rewrite_model (Optional[str]): Smaller, faster model for rewriting
+                ambiguous follow-ups. Defaults to `model_name`.
+            rewrite_num_predict (int): Max number of tokens of a rewrite.
+            rewrite_timeout (float): Latency budget in seconds for a rewrite; the
+                original input is used when it is exceeded.
+            rewrite_cache_size (int): Rewrites kept in memory; 0 disables caching.
+            speculative (bool): Run input validation, retrieval on the raw input
+                and the query rewrite at the same time; see `Speculator`.
+            rewrite_deadline (Optional[float]): Seconds the speculative mode waits
+                for the rewritten query's results. Defaults to `rewrite_timeout`.
+            speculative_concurrency (int): Requests the speculative mode serves
+                at once before branches queue for a thread.
+            retrieval_k (int): Candidates fetched from each retriever.
+            context_k (int): Fused results that make up the context.
+            fusion_strategy (str): How vector and BM25 results are fused: "linear",
+                "rrf" or "combmnz".
+            fusion_alpha (float): Weight of the BM25 results in the fusion.
+            vector_index (bool): Serve vector search from an in-process,
+                memory-mapped IVF index instead of querying Chroma.
+            vector_index_nprobe (int): Number of IVF clusters scanned per query.
+            vector_index_quantization (str): Storage of the scanned vectors:
+                "none" (float32), "float16" or "int8".
+            vector_index_rescore (int): Quantized searches re-rank this many times
+                `k` candidates with full-precision vectors; 0 disables it.
+            context_tokens (int): Token budget of the retrieved context in the prompt.
+            history_tokens (int): Token budget of the recent turns kept verbatim
+                by `new_history`; older turns are summarized.
+            summary_tokens (int): Max number of tokens of the history summary.
+            prompt_layout (str): "prefix_cache" keeps the instructions in the
+                system prompt and the retrieved context only in the last message,
+                so consecutive requests share the longest possible prefix, and
+                evicts history in larger steps. "inline" repeats the instructions
+                in every user message.
+            num_ctx (Optional[int]): Context window requested from Ollama. By
+                default it is sized from the token budgets, so prompts are never
+                truncated and the window, hence the loaded model, stays fixed.
+            backend_config (Optional[ModelConfig]): Selects the chat backend for
+                answers, rewrites and summaries, e.g. an OpenAI-compatible vLLM
+                or llama.cpp server. Ollama at `ollama_host` by default. Its
+                `tokenizer` counts the tokens of the context and history budgets.
+            backend (Optional[ChatBackend]): A ready chat backend; overrides
+                `backend_config`.
+            embeddings (Optional[Embeddings]): Embedding function to use instead
+                of Ollama's `embedding_model`, e.g. a local or deterministic one.
         """
         self.collection_name = collection_name
         self.db_path = db_path
-        self.model_base_url = ollama_host or os.getenv("OLLAMA_HOST", "127.0.0.1:11434")
+        self.model_base_url: str = (
+            ollama_host or os.getenv("OLLAMA_HOST") or "127.0.0.1:11434"
+        )
         self.model_name = model_name
         self.temperature = temperature
         self.seed = seed
         self.top_k = top_k
         self.num_predict = num_predict
+        self.keep_alive = keep_alive
         self.score_threshold = score_threshold
+        self.retrieval_k = retrieval_k
+        self.context_k = context_k
+        self.fusion_strategy = fusion_strategy
+        self.fusion_alpha = fusion_alpha
+        self.context_packer = ContextPacker(
+            TokenCounter.from_config(backend_config or ModelConfig()),
+            max_tokens=context_tokens,
+        )
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        if prompt_layout not in ("prefix_cache", "inline"):
+            raise ValueError(f"Unknown prompt layout: {prompt_layout}")
+        self.prompt_layout = prompt_layout
+        self.num_ctx = num_ctx or self.default_num_ctx()
+        self.backend = backend or create_backend(
+            backend_config or ModelConfig(),
+            default_url=self.model_base_url,
+            keep_alive=keep_alive,
+        )
 
-        self.embeddings = OllamaEmbeddings(
+        self.base_embeddings = embeddings or OllamaEmbeddings(
             model=embedding_model,
             base_url=self.model_base_url,
             num_gpu=num_gpu,
             keep_alive=keep_alive,
         )
+        self.embeddings: Embeddings = self.base_embeddings
+        if embedding_cache_size > 0:
+            self.embeddings = CachedEmbeddings(
+                self.base_embeddings,
+                model=embedding_model,
+                path=embedding_cache_path
+                or os.path.join(self.db_path, "embedding_cache.sqlite3"),
+                memory_size=embedding_cache_size,
+            )
 
         self.vector_store = Chroma(
             collection_name=self.collection_name,
@@ -84,13 +225,89 @@ class OllamaRag:
         )
 
         # TODO: move to Milvus, elastic etc this is only for local
-        self.bm25 = build_langchain_bm25_retriever(
-            self.get_all_documents_from_collection(self.collection_name, self.db_path),
-            5,
+        self.bm25_path = os.path.join(self.db_path, "bm25", self.collection_name)
+        self.bm25 = self.load_bm25_index()
+
+        # Bumped on every change to the collection; invalidates cached answers.
+        self.collection_version = 0
+
+        self.vector_index_path = os.path.join(
+            self.db_path, "vector_index", self.collection_name
         )
+        self.use_vector_index = vector_index
+        self.vector_index_nprobe = vector_index_nprobe
+        self.vector_index_quantization = vector_index_quantization
+        self.vector_index_rescore = vector_index_rescore
+        self.ann_index: Optional[IVFIndex] = None
+        # Collection version the vector index reflects.
+        self.ann_index_version = -1
+        if vector_index:
+            self.refresh_vector_index()
+        self.answer_cache: Optional[SemanticAnswerCache] = None
+        if answer_cache_size > 0:
+            self.answer_cache = SemanticAnswerCache(
+                threshold=answer_cache_threshold,
+                ttl=answer_cache_ttl,
+                max_entries=answer_cache_size,
+            )
+
+        self.manifest_path = os.path.join(
+            self.db_path, "manifests", f"{self.collection_name}.json"
+        )
+
+        self.rewriter = QueryRewriter(
+            model_name=rewrite_model or model_name,
+            backend=self.backend,
+            num_predict=rewrite_num_predict,
+            timeout=rewrite_timeout,
+            cache_size=rewrite_cache_size,
+        )
+        self.speculator: Optional[Speculator] = None
+        if speculative:
+            self.speculator = Speculator(
+                self,
+                deadline=(
+                    rewrite_timeout if rewrite_deadline is None else rewrite_deadline
+                ),
+                max_workers=3 * speculative_concurrency,
+            )
+
+    def warm_up(self) -> None:
+        """
+        Loads the embedding model and touches the retrievers ahead of the first query.
+
+        Failures are logged and swallowed so that an unavailable model server does not
+        prevent the application from starting.
+        """
+        try:
+            # Bypass the embedding cache so the model is actually loaded.
+            self.base_embeddings.embed_query("warm up")
+            self.bm25_search("warm up")
+            logger.info(f"Warmed up RAG pipeline for collection {self.collection_name}")
+        except Exception as e:
+            logger.warning(f"Warm up failed: {e}")
+
+    def close(self) -> None:
+        """
+        Releases the speculation threads, the backend's HTTP connections and the
+        Chroma client.
+
+        The pipeline must not be used afterwards. Callers that replace a pipeline
+        close the old one once its in-flight requests are done.
+        """
+        if self.speculator is not None:
+            self.speculator.close()
+        self.backend.close()
+        # Chroma stops the shared system when its last client is closed.
+        client = self.vector_store._client
+        if isinstance(client, ChromaClient):
+            client.close()
 
     def get_response(
-        self, text: str, msgs: List[Dict[str, str]]
+        self,
+        text: str,
+        msgs: List[Dict[str, str]],
+        validate: Optional[Callable[[str], Any]] = None,
     ) -> Tuple[str, List[str]]:
         """
         Generates a LLM response based on user input and retrieved document context.
@@ -98,41 +315,285 @@ class OllamaRag:
         Args:
             text (str): The user's question or prompt.
             msgs (List[Dict[str, str]]): Message history (OpenAI-style chat format).
+            validate (Optional[Callable[[str], Any]]): Input check that raises to
+                reject the input, e.g. `guards.validate_input`.
 
         Returns:
             str: The content of the model's generated response.
         """
-        chunks = []
+        with request_trace("get_response", question=text) as request:
+            prepared = self.prepare(text, msgs, validate)
+            if prepared.cached is not None:
+                if request is not None:
+                    request.output = {"answer": prepared.cached[0], "cached": True}
+                return prepared.cached
+
+            with stage("generation"):
+                output = self.ollama_llm_call(prepared.conversation)
+            answer = output["message"]["content"].strip()
+            if request is not None:
+                request.output = {"answer": answer}
+            self.cache_answer(prepared.embedding, text, answer, prepared.chunks)
+            return (answer, prepared.chunks)
+
+    def get_response_stream(
+        self,
+        text: str,
+        msgs: List[Dict[str, str]],
+        validate: Optional[Callable[[str], Any]] = None,
+    ) -> Tuple[Iterator[str], List[str]]:
+        """
+        Streaming variant of `get_response`.
+
+        Validation and retrieval run eagerly, so a rejected input raises here and
+        the chunks are available before the first token; generation only starts
+        once the returned iterator is consumed.
+
+        Args:
+            text (str): The user's question or prompt.
+            msgs (List[Dict[str, str]]): Message history (OpenAI-style chat format).
+            validate (Optional[Callable[[str], Any]]): Input check that raises to
+                reject the input, e.g. `guards.validate_input`.
+
+        Returns:
+            Tuple[Iterator[str], List[str]]: An iterator over generated text pieces
+                and the retrieved chunks.
+        """
+        # The trace stays open until the returned iterator is exhausted.
+        request = start_trace("get_response_stream", question=text)
+        try:
+            with activate_trace(request):
+                prepared = self.prepare(text, msgs, validate)
+        except Exception:
+            finish_trace(request)
+            raise
+        if prepared.cached is not None:
+            answer, chunks = prepared.cached
+            finish_trace(request, {"answer": answer, "cached": True})
+            return iter([answer]), chunks
+
+        def tokens() -> Iterator[str]:
+            started = False
+            answer = []
+            try:
+                # Includes the time the caller takes to consume each piece.
+                with activate_trace(request), stage("generation"):
+                    for frame in self.ollama_llm_stream(prepared.conversation):
+                        content = frame["message"]["content"]
+                        if not started:
+                            content = content.lstrip()
+                            started = bool(content)
+                        if content:
+                            answer.append(content)
+                            yield content
+            finally:
+                finish_trace(request, {"answer": "".join(answer).strip()})
+            self.cache_answer(
+                prepared.embedding, text, "".join(answer).strip(), prepared.chunks
+            )
+
+        return tokens(), prepared.chunks
+
+    def prepare(
+        self,
+        text: str,
+        msgs: List[Dict[str, str]],
+        validate: Optional[Callable[[str], Any]] = None,
+    ) -> Prepared:
+        """
+        Everything before generation: validation, the answer cache and the prompt.
+
+        Sequential by default; with `speculative` the stages overlap.
+
+        Args:
+            text (str): The user's question or prompt.
+            msgs (List[Dict[str, str]]): Message history (OpenAI-style chat format).
+            validate (Optional[Callable[[str], Any]]): Input check that raises to
+                reject the input.
+
+        Returns:
+            Prepared: A cached answer, or the messages to send to the LLM.
+        """
+        if self.speculator is not None:
+            return self.speculator.prepare(text, msgs, validate)
+
+        if validate is not None:
+            with stage("validation"):
+                validate(text)
+        with stage("answer_cache"):
+            embedding, cached = self.cached_answer(text)
+        if cached is not None:
+            return Prepared(embedding, cached)
+        conversation, chunks = self.build_conversation(text, msgs)
+        return Prepared(embedding, None, conversation, chunks)
+
+    def is_cacheable(self, text: str) -> bool:
+        """
+        Whether a turn's answer may be cached.
+
+        Only self-contained questions qualify; follow-ups that need a rewrite
+        depend on the conversation and are never served from or put in the cache.
+        """
+        return self.answer_cache is not None and not self.needs_rewrite(text)
+
+    def cached_answer(
+        self, text: str
+    ) -> Tuple[Optional[List[float]], Optional[Tuple[str, List[str]]]]:
+        """
+        Looks up a cached answer for a near-duplicate question.
+
+        Args:
+            text (str): The user's question.
+
+        Returns:
+            Tuple: The question embedding (None if the turn is not cacheable) and
+                the cached (answer, chunks), if any.
+        """
+        if self.answer_cache is None or not self.is_cacheable(text):
+            return None, None
+
+        embedding = self.embeddings.embed_query(text)
+        return embedding, self.lookup_answer(embedding, text)
+
+    def lookup_answer(
+        self, embedding: List[float], text: str
+    ) -> Optional[Tuple[str, List[str]]]:
+        """Looks up the answer cache for a question embedding and counts the result."""
+        assert self.answer_cache is not None
+        cached = self.answer_cache.lookup(embedding, self.collection_version)
+        metrics.ANSWER_CACHE.labels("miss" if cached is None else "hit").inc()
+        if cached is not None:
+            logger.debug(f"Answer cache hit for: {text}")
+        return cached
+
+    def cache_answer(
+        self,
+        embedding: Optional[List[float]],
+        text: str,
+        answer: str,
+        chunks: List[str],
+    ) -> None:
+        """Stores an answer for a cacheable turn; a no-op if `embedding` is None."""
+        if self.answer_cache is not None and embedding is not None and answer:
+            self.answer_cache.store(
+                embedding, text, answer, chunks, self.collection_version
+            )
+
+    def build_conversation(
+        self, text: str, msgs: List[Dict[str, str]]
+    ) -> Tuple[List[Dict[str, str]], List[str]]:
+        """
+        Rewrites the input if needed, retrieves context and builds the LLM messages.
+
+        Args:
+            text (str): The user's question or prompt.
+            msgs (List[Dict[str, str]]): Message history (OpenAI-style chat format).
+
+        Returns:
+            Tuple[List[Dict[str, str]], List[str]]: The messages to send to the LLM
+                and the retrieved chunks.
+        """
         new_text = text
         if self.needs_rewrite(text):
-            new_text = self.rewrite_ambiguous_prompt(msgs, text)
+            with stage("rewrite"):
+                new_text = self.rewrite_ambiguous_prompt(msgs, text)
 
-        if self.is_collection_empty():
+        with stage("collection_check"):
+            empty = self.is_collection_empty()
+        if empty:
             logger.warning("Collection is empty!")
-            retrieved_context = ""
-        else:
-            print(text)
-            results = self.vector_store.similarity_search_with_relevance_scores(
-                new_text, k=5, score_threshold=self.score_threshold
-            )
+            metrics.EMPTY_COLLECTION.inc()
+            return self.assemble_conversation(new_text, msgs, [], [])
 
-            retrieved_context = ""
-            for doc, score in results:
-                logger.debug(f"Chunk Score: {score}")
-                logger.debug(f"Chunk: {doc.page_content}\n-------\n")
-                chunks.append(doc.page_content)
-            
-            fused_results: List[Tuple[Document, float]] = []
-            if self.bm25 is not None:
-                fused_results = fuse_with_bm25(results, self.bm25, new_text, alpha=0.4)
-            else:
-                fused_results = results
-
-            retrieved_context = "".join(
-                doc.page_content + "\n" for doc, _ in fused_results
-            )
+        results, fused_results = self.retrieve(new_text)
+        with stage("prompt"):
+            return self.assemble_conversation(new_text, msgs, results, fused_results)
+
+    def retrieve(
+        self, query: str
+    ) -> Tuple[List[Tuple[Document, float]], List[Tuple[Document, float]]]:
+        """
+        Runs vector search and BM25 search and fuses the results.
 
-        prompt = format_prompt(question=new_text, context=retrieved_context)
+        Args:
+            query (str): The (possibly rewritten) user question.
+
+        Returns:
+            Tuple: The vector search results and the fused hybrid results.
+        """
+        with stage("embed_query"):
+            embedding = self.embeddings.embed_query(query)
+        with stage("vector_search"):
+            results = self.vector_search_by_embedding(embedding, k=self.retrieval_k)
+
+        fused_results = results[: self.context_k]
+        if self.bm25 is not None:
+            with stage("bm25"):
+                bm25_results = self.bm25_search(query, k=self.retrieval_k)
+            with stage("fusion"):
+                fused_results = self.fuse(results, bm25_results)
+        return results, fused_results
+
+    def fuse(
+        self,
+        results: List[Tuple[Document, float]],
+        bm25_results: List[Tuple[Document, float]],
+    ) -> List[Tuple[Document, float]]:
+        """Fuses vector and BM25 results with the configured strategy."""
+        return fuse_with_bm25(
+            results,
+            bm25_results,
+            alpha=self.fusion_alpha,
+            top_k=self.context_k,
+            strategy=self.fusion_strategy,
+        )
+
+    def assemble_conversation(
+        self,
+        question: str,
+        msgs: List[Dict[str, str]],
+        results: List[Tuple[Document, float]],
+        fused_results: List[Tuple[Document, float]],
+    ) -> Tuple[List[Dict[str, str]], List[str]]:
+        """
+        Builds the LLM messages from the retrieval results.
+
+        Args:
+            question (str): The (possibly rewritten) user question.
+            msgs (List[Dict[str, str]]): Message history (OpenAI-style chat format).
+            results (List[Tuple[Document, float]]): Vector search results.
+            fused_results (List[Tuple[Document, float]]): Hybrid search results,
+                packed into the context within the token budget.
+
+        Returns:
+            Tuple[List[Dict[str, str]], List[str]]: The messages to send to the LLM
+                and the retrieved chunks.
+        """
+        chunks = []
+        for doc, score in results:
+            logger.debug(f"Chunk Score: {score}")
+            logger.debug(f"Chunk: {doc.page_content}\n-------\n")
+            chunks.append(doc.page_content)
+
+        packed = self.context_packer.pack(fused_results)
+        logger.debug(
+            f"Packed {len(packed.documents)} chunks in {packed.tokens} tokens, "
+            f"dropped {packed.duplicates} duplicates and "
+            f"{packed.over_budget} over budget."
+        )
+
+        prefix_cache = self.prompt_layout == "prefix_cache"
+        prompt = format_prompt(
+            question=question,
+            context=packed.text,
+            preformatted=True,
+            instructions=not prefix_cache,
+        )
+
+        if prefix_cache and msgs and msgs[0]["role"] == "system":
+            # Byte-identical across turns and sessions, so it stays cached.
+            system = with_instructions(msgs[0]["content"])
+            msgs = [{"role": "system", "content": system}] + msgs[1:]
 
         conversation = msgs + [{"role": "user", "content": prompt}]
 
@@ -140,8 +601,7 @@ class OllamaRag:
         for msg in conversation:
             logger.debug(msg)
 
-        output = self.ollama_llm_call(conversation)
-        return (output["message"]["content"].strip(), chunks)
+        return conversation, chunks
 
     def is_collection_empty(self) -> bool:
         """
@@ -150,46 +610,151 @@ class OllamaRag:
         Returns:
             bool: True if the collection is empty, False otherwise.
         """
-        ids = self.vector_store.get().get("ids", [])
-        return len(ids) == 0
+        return self.vector_store._collection.count() == 0
 
     def ingest_docs(self, file_path: str, db_path: str) -> None:
         """
-        Ingests a structured plain text file into the vector store.
+        Incrementally ingests structured plain text files into the vector store.
 
-        The file is split on "---" as chunk separators, and each chunk is stored
-        as a separate document in the Chroma collection.
+        Each file is split on "---" as chunk separators and every chunk is stored
+        under a content-hash ID. A per-source manifest next to the DB records what
+        was ingested, so re-running on the same path only embeds new or changed
+        chunks, and deletes chunks that disappeared from their file or whose file
+        was removed from the ingested directory.
 
         Args:
-            file_path (str): Path to the input `.txt` file to ingest.
+            file_path (str): Path to a `.txt` file or a directory of them.
             db_path(str): Path to the Chroma vector database.
         """
-        if self.is_collection_empty():
-            path = Path(file_path)
-            files = []
-
-            if path.is_file() and path.suffix == ".txt":
-                files = [path]
-            elif path.is_dir():
-                files = list(path.glob("*.txt"))
-            else:
-                logger.warning(f"No valid .txt files found at {file_path}")
-                return
-
-            for txt_file in files:
-                logger.info(f"Ingesting documents from {txt_file}")
-                with open(txt_file, "r", encoding="utf-8") as f:
-                    content = f.read()
-
-                chunks = [
-                    chunk.strip() for chunk in content.split("---") if chunk.strip()
+        files = find_txt_files(file_path)
+        if files is None:
+            logger.warning(f"No valid .txt files found at {file_path}")
+            return
+
+        manifest = IngestManifest.load(self.manifest_path)
+        legacy = self._legacy_ids_by_content() if not manifest.sources else {}
+
+        # Left over by an interrupted bulk ingestion.
+        stale: Set[str] = set(manifest.stale)
+        for txt_file in files:
+            source = str(txt_file.resolve())
+            raw = txt_file.read_bytes()
+            sha256 = content_hash(raw)
+            if manifest.is_unchanged(source, sha256):
+                logger.debug(f"Skipping unchanged {txt_file}")
+                continue
+
+            logger.info(f"Ingesting documents from {txt_file}")
+            chunks = {
+                chunk_id(chunk): chunk for chunk in split_chunks(raw.decode("utf-8"))
+            }
+            ids = list(chunks)
+            existing = set(
+                self.vector_store._collection.get(ids=ids, include=[])["ids"]
+            )
+            new_ids = [doc_id for doc_id in ids if doc_id not in existing]
+
+            if new_ids:
+                docs = [
+                    Document(page_content=chunks[doc_id], metadata={"source": source})
+                    for doc_id in new_ids
                 ]
-                docs = [documents.Document(page_content=chunk) for chunk in chunks]
-                ids = [str(uuid4()) for _ in docs]
+                self.add_documents(docs, new_ids, persist=False)
+            logger.info(
+                f"{len(new_ids)} new, {len(ids) - len(new_ids)} unchanged chunks."
+            )
 
-                self.vector_store.add_documents(documents=docs, ids=ids)
-        else:
-            logger.info("Skipping ingestion — collection already populated.")
+            stale.update(set(manifest.chunk_ids(source)) - set(chunks))
+            for chunk in chunks.values():
+                stale.update(legacy.get(chunk, []))
+            manifest.update(source, sha256, ids)
+
+        if Path(file_path).is_dir():
+            current = {str(txt_file.resolve()) for txt_file in files}
+            for source in manifest.sources_under(Path(file_path)):
+                if source not in current:
+                    stale.update(manifest.remove(source))
+
+        stale -= manifest.referenced_ids()
+        if stale:
+            logger.info(f"Deleting {len(stale)} stale chunks.")
+            self.delete_documents(sorted(stale), persist=False)
+
+        manifest.stale = []
+        manifest.save()
+        self.persist_indexes()
+
+    def _legacy_ids_by_content(self) -> Dict[str, List[str]]:
+        """
+        Maps chunk text to IDs that are not content hashes, e.g. random UUIDs from
+        collections ingested before the manifest existed, so they can be replaced.
+        """
+        legacy: Dict[str, List[str]] = {}
+        for doc in self.get_all_documents_from_collection():
+            text = doc["document"] or ""
+            if doc["id"] != chunk_id(text):
+                legacy.setdefault(text.strip(), []).append(doc["id"])
+        if legacy:
+            logger.info(f"Found {sum(map(len, legacy.values()))} legacy chunk IDs.")
+        return legacy
+
+    def add_documents(
+        self, docs: List[Document], ids: List[str], persist: bool = True
+    ) -> None:
+        """
+        Adds documents to the vector store and the BM25 index together.
+
+        Keeping both writes in one place keeps keyword and vector results
+        consistent without rebuilding the lexical index.
+
+        Args:
+            docs (List[Document]): Documents to add.
+            ids (List[str]): Their IDs; existing IDs are replaced.
+            persist (bool): Whether to save the indexes right away.
+        """
+        self.vector_store.add_documents(documents=docs, ids=ids)
+        self.collection_version += 1
+
+        if self.bm25 is None:
+            self.bm25 = BM25Index.build([], [])
+        self.bm25.add(ids, [doc.page_content for doc in docs])
+
+        if persist:
+            self.persist_indexes()
+
+    def delete_documents(self, ids: List[str], persist: bool = True) -> None:
+        """
+        Deletes documents from the vector store and the BM25 index together.
+
+        Args:
+            ids (List[str]): IDs of the documents to delete.
+            persist (bool): Whether to save the indexes right away.
+        """
+        if not ids:
+            return
+
+        self.vector_store.delete(ids=ids)
+        self.collection_version += 1
+
+        if self.bm25 is not None:
+            self.bm25.delete(ids)
+
+        if persist:
+            self.persist_indexes()
+
+    def persist_indexes(self) -> None:
+        """Saves the BM25 index and brings the vector index up to date, if enabled."""
+        self.save_bm25_index()
+        if self.use_vector_index:
+            self.refresh_vector_index()
+
+    def save_bm25_index(self) -> None:
+        """Compacts pending BM25 updates and persists the index next to the DB."""
+        if self.bm25 is None:
+            return
+
+        with build_lock(self.bm25_path):
+            self.bm25.save(self.bm25_path)
 
     def needs_rewrite(self, user_input: str) -> bool:
         input_lower = user_input.lower().strip()
@@ -207,27 +772,33 @@ class OllamaRag:
         return False
 
     def get_all_documents_from_collection(
-        self, collection_name: str, persist_directory: str
+        self,
+        collection_name: Optional[str] = None,
+        persist_directory: Optional[str] = None,
     ) -> List[dict]:
         """
-        Load all documents from a persisted Chroma collection using native chromadb client.
+        Load all documents from a persisted Chroma collection.
+
+        The pipeline's own collection is read through the already open vector store;
+        a separate native chromadb client is only opened for a different collection.
 
         Args:
-            collection_name (str): Name of the collection.
-            persist_directory (str): Path to persisted Chroma database.
+            collection_name (Optional[str]): Name of the collection, defaults to ours.
+            persist_directory (Optional[str]): Path to persisted Chroma database.
 
         Returns:
             List[dict]: List of {'id': ..., 'document': ..., 'metadata': ...}
         """
-        client = chromadb.PersistentClient(path=persist_directory)
+        collection_name = collection_name or self.collection_name
+        persist_directory = persist_directory or self.db_path
 
-        collection = client.get_collection(name=collection_name)
-
-        print(f"Collection found: {collection.name}")
-        print(f"Total documents: {collection.count()}")
+        if (collection_name, persist_directory) == (self.collection_name, self.db_path):
+            collection = self.vector_store._collection
+        else:
+            client = chromadb.PersistentClient(path=persist_directory)
+            collection = client.get_collection(name=collection_name)
 
-        # Now retrieve all documents (no filters, no includes needed for IDs)
-        results = collection.get()
+        results = collection.get(include=["documents", "metadatas"])
 
         docs = []
         for doc_id, doc_text, metadata in zip(
@@ -237,24 +808,263 @@ class OllamaRag:
         ):
             docs.append({"id": doc_id, "document": doc_text, "metadata": metadata})
 
-        print(f"Retrieved {len(docs)} documents.")
+        logger.info(
+            f"Retrieved {len(docs)} documents from collection {collection_name}."
+        )
         return docs
 
+    def default_num_ctx(self, margin: int = 256) -> int:
+        """
+        Context window that fits the system prompt, summary, history, retrieved
+        context, question and answer budgets, rounded up to a multiple of 1024.
+        """
+        tokens = (
+            self.context_packer.counter.count(with_instructions(SYSTEM_PROMPT))
+            + self.summary_tokens
+            + self.history_tokens
+            + self.context_packer.max_tokens
+            + self.num_predict
+            + margin
+        )
+        return -(-tokens // 1024) * 1024
+
+    def new_history(
+        self, on_evict: Optional[Callable[[List[Dict[str, str]]], None]] = None
+    ) -> ConversationHistory:
+        """
+        Starts a conversation whose prompt size stays bounded as it grows.
+
+        Args:
+            on_evict (Optional[Callable[[List[Dict[str, str]]], None]]): Takes
+                the turns that leave the window, instead of the history
+                summarizing them in the background.
+        """
+        prefix_cache = self.prompt_layout == "prefix_cache"
+        system_prompt = (
+            with_instructions(SYSTEM_PROMPT) if prefix_cache else SYSTEM_PROMPT
+        )
+        return ConversationHistory(
+            system_prompt=system_prompt,
+            summarize=self.summarize_history,
+            counter=self.context_packer.counter,
+            max_tokens=self.history_tokens,
+            evict_to=0.5 if prefix_cache else 1.0,
+            on_evict=on_evict,
+        )
+
+    def summarize_history(self, summary: str, messages: List[Dict[str, str]]) -> str:
+        """
+        Folds older chat turns into the running conversation summary.
+
+        Uses the rewrite model with a capped output, since it runs off the
+        critical path but still competes for the model server.
+
+        Args:
+            summary (str): The summary so far, possibly empty.
+            messages (List[Dict[str, str]]): The turns that left the history window.
+
+        Returns:
+            str: The updated summary.
+        """
+        prompt = format_summary_prompt(summary, messages)
+        response = self.backend.chat(
+            self.rewriter.model_name,
+            [{"role": "user", "content": prompt}],
+            options={"temperature": 0.0, "num_predict": self.summary_tokens},
+        )
+        metrics.observe_llm_response(response, call="summary")
+        return response["message"]["content"].strip()
+
     def rewrite_ambiguous_prompt(self, messages: list, new_user_input: str) -> str:
         """Rewrite user input using chat history to resolve ambiguity."""
-        prompt = "You are a helpful assistant that rewrites ambiguous user questions based on chat history.\n"
-        prompt += "Do not answer the question. Just rewrite it to be self-contained. Be consice.\n\n"
-        prompt += "Chat history:\n"
-        for m in messages[-4:]:  # last few turns for context
-            if m["role"] in ("user", "assistant"):
-                prompt += f"{m['role'].capitalize()}: {m['content']}\n"
-        prompt += f"\nAmbiguous user input: {new_user_input}\n"
-        prompt += "Rewritten version:"
-
-        response = ollama.chat(
-            model=self.model_name, messages=[{"role": "user", "content": prompt}]
+        return self.rewriter.rewrite(messages, new_user_input)
+
+    def load_bm25_index(self) -> Optional[BM25Index]:
+        """
+        Memory-maps the persisted BM25 index, rebuilding it if missing or stale.
+
+        The index lives next to the Chroma DB and is tagged with a fingerprint of
+        the IDs it indexes. It is rebuilt when they differ from the collection's,
+        e.g. when another process added documents this index does not have.
+
+        Returns:
+            Optional[BM25Index]: The index, or None if the collection is empty.
+        """
+        ids = self.vector_store._collection.get(include=[])["ids"]
+        if not ids:
+            return None
+
+        collection_fingerprint = fingerprint(ids)
+        index = BM25Index.load(self.bm25_path, collection_fingerprint)
+        if index is not None:
+            logger.info(f"Loaded BM25 index with {len(index)} documents.")
+            return index
+
+        with build_lock(self.bm25_path):
+            # Another worker may have built it while this one waited.
+            index = BM25Index.load(self.bm25_path, collection_fingerprint)
+            if index is not None:
+                return index
+            docs = self.get_all_documents_from_collection()
+            index = BM25Index.build(
+                [doc["id"] for doc in docs], [doc["document"] or "" for doc in docs]
+            )
+            index.save(self.bm25_path)
+        logger.info(f"Built BM25 index with {len(index)} documents.")
+        return index
+
+    def collection_space(self) -> str:
+        """Distance space of the Chroma collection."""
+        metadata = self.vector_store._collection.metadata or {}
+        return metadata.get("hnsw:space", "l2")
+
+    def refresh_vector_index(self, batch_size: int = 5000) -> None:
+        """
+        Memory-maps the persisted vector index, rebuilding it if missing or stale.
+
+        Like the BM25 index, it is tagged with a fingerprint of the collection's
+        IDs and only rebuilt from the stored embeddings when the collection changed.
+
+        Args:
+            batch_size (int): Number of records read from Chroma at a time.
+        """
+        version = self.collection_version
+        ids = self.vector_store._collection.get(include=[])["ids"]
+        if not ids:
+            self.ann_index = None
+            self.ann_index_version = version
+            return
+
+        collection_fingerprint = fingerprint(ids)
+        index = IVFIndex.load(
+            self.vector_index_path,
+            collection_fingerprint,
+            quantization=self.vector_index_quantization,
         )
-        return response["message"]["content"].strip()
+        if index is None:
+            with build_lock(self.vector_index_path):
+                # Another worker may have built it while this one waited.
+                index = IVFIndex.load(
+                    self.vector_index_path,
+                    collection_fingerprint,
+                    quantization=self.vector_index_quantization,
+                )
+                if index is None:
+                    index = self.build_vector_index(len(ids), batch_size)
+                    index.save(self.vector_index_path, collection_fingerprint)
+                    logger.info(
+                        f"Built vector index with {len(index)} vectors "
+                        f"in {index.n_lists} clusters."
+                    )
+        else:
+            logger.info(f"Loaded vector index with {len(index)} vectors.")
+
+        self.ann_index = index
+        self.ann_index_version = version
+
+    def build_vector_index(self, count: int, batch_size: int = 5000) -> IVFIndex:
+        """Builds the vector index from the embeddings stored in Chroma."""
+        ids: List[str] = []
+        embeddings: List[Any] = []
+        texts: List[str] = []
+        metadatas: List[Any] = []
+        for offset in range(0, count, batch_size):
+            batch = self.vector_store._collection.get(
+                include=["embeddings", "documents", "metadatas"],
+                limit=batch_size,
+                offset=offset,
+            )
+            ids.extend(batch["ids"])
+            if batch["embeddings"] is not None:
+                embeddings.extend(batch["embeddings"])
+            texts.extend(text or "" for text in batch["documents"] or [])
+            metadatas.extend(batch["metadatas"] or [])
+
+        return IVFIndex.build(
+            ids,
+            embeddings,
+            texts,
+            metadatas,
+            space=self.collection_space(),
+            quantization=self.vector_index_quantization,
+        )
+
+    def bm25_search(self, query: str, k: int = 5) -> List[Tuple[Document, float]]:
+        """
+        Lexical search over the BM25 index.
+
+        Args:
+            query (str): The search query.
+            k (int): Number of results to return.
+
+        Returns:
+            List[Tuple[Document, float]]: Documents and their BM25 scores.
+        """
+        if self.bm25 is None:
+            return []
+
+        hits = self.bm25.search(query, k)
+        if not hits:
+            return []
+
+        found = self.vector_store.get(ids=[doc_id for doc_id, _ in hits])
+        docs = {
+            doc_id: Document(page_content=text, metadata=metadata or {}, id=doc_id)
+            for doc_id, text, metadata in zip(
+                found["ids"], found["documents"], found["metadatas"]
+            )
+            if text is not None
+        }
+        return [(docs[doc_id], score) for doc_id, score in hits if doc_id in docs]
+
+    def vector_search_by_embedding(
+        self, embedding: List[float], k: int = 5
+    ) -> List[Tuple[Document, float]]:
+        """
+        Vector search for an already computed query embedding.
+
+        Scores are converted to relevance scores and filtered by `score_threshold`,
+        matching `similarity_search_with_relevance_scores`. The in-process vector
+        index is used when it is enabled and reflects the current collection;
+        otherwise the query goes to Chroma.
+
+        Args:
+            embedding (List[float]): The query embedding.
+            k (int): Number of results to return.
+
+        Returns:
+            List[Tuple[Document, float]]: Documents and their relevance scores.
+        """
+        relevance_fn = self.vector_store._select_relevance_score_fn()
+        index = self.ann_index
+        if index is not None and self.ann_index_version == self.collection_version:
+            results = [
+                (index.document(row), distance)
+                for row, distance in index.search(
+                    embedding,
+                    k,
+                    nprobe=self.vector_index_nprobe,
+                    rescore=self.vector_index_rescore,
+                )
+            ]
+        else:
+            results = (
+                self.vector_store.similarity_search_by_vector_with_relevance_scores(
+                    embedding, k=k
+                )
+            )
+        scored = [(doc, relevance_fn(distance)) for doc, distance in results]
+        return [(doc, score) for doc, score in scored if score >= self.score_threshold]
+
+    def generation_options(self) -> Dict[str, Any]:
+        """Returns the sampling options passed to every chat generation."""
+        return {
+            "temperature": self.temperature,
+            "seed": self.seed,
+            "top_k": self.top_k,
+            "num_predict": self.num_predict,
+            "num_ctx": self.num_ctx,
+        }
 
     @trace(tracer="opik", tags=["qa"])
     def ollama_llm_call(self, msgs: List[Dict[str, str]]) -> Dict[str, Any]:
@@ -269,20 +1079,34 @@ class OllamaRag:
             Dict[str, Any]: The complete response from the Ollama LLM,
                 including model output, token usage, and timing metadata.
         """
-        logger.debug("Sending messages to Ollama:")
+        logger.debug("Sending messages to the LLM backend:")
         for msg in msgs:
             logger.debug(msg)
 
-        response = ollama.chat(
-            model=self.model_name,
-            keep_alive=-1,
-            messages=msgs,
-            options={
-                "temperature": self.temperature,
-                "seed": self.seed,
-                "top_k": self.top_k,
-                "num_predict": self.num_predict,
-            },
+        response = self.backend.chat(
+            self.model_name, msgs, options=self.generation_options()
         )
+        metrics.observe_llm_response(response)
+        return response
+
+    @trace(tracer="opik", tags=["qa"])
+    def ollama_llm_stream(self, msgs: List[Dict[str, str]]) -> Iterator[Dict[str, Any]]:
+        """
+        Streams a chat completion from the Ollama model frame by frame.
+
+        The last frame carries the token usage and timing metadata, which the
+        tracing decorator records once the stream is exhausted.
 
-        return response.model_dump()
+        Args:
+            msgs (List[Dict[str, str]]): List of messages to send to the LLM
+                (in OpenAI-compatible chat format).
+
+        Yields:
+            Dict[str, Any]: Response frames; `message.content` holds the new text.
+        """
+        for frame in self.backend.stream(
+            self.model_name, msgs, options=self.generation_options()
+        ):
+            if frame.get("done"):
+                metrics.observe_llm_response(frame)
+            yield frame
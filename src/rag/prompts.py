@@ -1,4 +1,5 @@
 import re
+from functools import lru_cache
 from typing import Dict, List
 
 # Pre-compile regex to identify question lines
@@ -34,6 +35,33 @@ If the answer is not found in the context or previous interactions, respond with
 "Sorry, I cannot answer that based on the available information."
 """
 
+PROMPT_INSTRUCTIONS = "Given the context next and previous messages, reply to the user question or input. Be consice."
+
+
+@lru_cache(maxsize=4096)
+def format_qa_chunk(block: str) -> str:
+    """
+    Format a single Q&A chunk as a "Q: ...\nA: ..." entry.
+
+    Chunks recur across queries, so the result is cached.
+
+    Args:
+        block: A chunk with the question on its first line.
+
+    Returns:
+        The formatted entry, or an empty string if the chunk has no answer.
+    """
+    lines = [ln.strip() for ln in block.splitlines() if ln.strip()]
+    if len(lines) < 2:
+        return ""
+
+    question = lines[0]
+    answers = [ln for ln in lines[1:] if not QUESTION_PATTERN.match(ln)]
+    if not answers:
+        return ""
+
+    return f"Q: {question}\nA: {' '.join(answers)}"
+
 
 def clean_qa_context(raw: str) -> str:
     """
@@ -46,39 +74,54 @@ def clean_qa_context(raw: str) -> str:
         A formatted string of "Q: ...\nA: ..." entries.
     """
     blocks = [blk.strip() for blk in raw.split("---") if blk.strip()]
-    formatted: List[str] = []
+    formatted = [format_qa_chunk(block) for block in blocks]
+    return "\n".join(entry for entry in formatted if entry)
 
-    for block in blocks:
-        lines = [ln.strip() for ln in block.splitlines() if ln.strip()]
-        if len(lines) < 2:
-            continue
 
-        question = lines[0]
-        answers = [ln for ln in lines[1:] if not QUESTION_PATTERN.match(ln)]
-        if not answers:
-            continue
+def with_instructions(system_prompt: str) -> str:
+    """
+    Append the per-question instructions to a system prompt.
+
+    Used by the prefix-cache friendly layout, where the instructions are part of
+    the stable system prompt instead of every user message. Idempotent.
 
-        formatted.append(f"Q: {question}\nA: {' '.join(answers)}")
+    Args:
+        system_prompt: The system prompt.
 
-    return "\n".join(formatted)
+    Returns:
+        The system prompt followed by `PROMPT_INSTRUCTIONS`.
+    """
+    if system_prompt.endswith(PROMPT_INSTRUCTIONS):
+        return system_prompt
+    return f"{system_prompt.rstrip()}\n\n{PROMPT_INSTRUCTIONS}"
 
 
-def format_prompt(question: str, context: str = "") -> str:
+def format_prompt(
+    question: str,
+    context: str = "",
+    preformatted: bool = False,
+    instructions: bool = True,
+) -> str:
     """
     Create the final prompt for the LLM, injecting cleaned context if available.
 
     Args:
         question: The user's question.
         context: Raw context string from RAG retrieval.
+        preformatted: The context is already made of "Q: ...\nA: ..." entries,
+            e.g. from `rag.context.ContextPacker`, and is used as is.
+        instructions: Start with `PROMPT_INSTRUCTIONS`; disable when they are in
+            the system prompt (see `with_instructions`).
 
     Returns:
         A single string prompt for the model.
     """
-    context_section = f"{clean_qa_context(context)}" if context else ""
+    if preformatted:
+        context_section = context
+    else:
+        context_section = f"{clean_qa_context(context)}" if context else ""
 
-    prompt_sections: List[str] = [
-        "Given the context next and previous messages, reply to the user question or input. Be consice."
-    ]
+    prompt_sections: List[str] = [PROMPT_INSTRUCTIONS] if instructions else []
     prompt_sections.append("Context:")
     prompt_sections.append("---")
     if context_section:
@@ -89,6 +132,72 @@ def format_prompt(question: str, context: str = "") -> str:
     return "\n".join(prompt_sections)
 
 
+def rewrite_window(
+    messages: List[Dict[str, str]], window: int = 4
+) -> List[Dict[str, str]]:
+    """
+    Select the recent chat turns the query rewrite is conditioned on.
+
+    Args:
+        messages: The chat history (OpenAI-style chat format).
+        window: Number of most recent messages to consider.
+
+    Returns:
+        The user and assistant messages among the last `window` messages.
+    """
+    return [
+        {"role": m["role"], "content": m["content"]}
+        for m in messages[-window:]
+        if m["role"] in ("user", "assistant")
+    ]
+
+
+def format_rewrite_prompt(
+    messages: List[Dict[str, str]], new_user_input: str, window: int = 4
+) -> str:
+    """
+    Create the prompt asking the LLM to make an ambiguous user input self-contained.
+
+    Args:
+        messages: The chat history (OpenAI-style chat format).
+        new_user_input: The ambiguous user input.
+        window: Number of most recent messages used as context.
+
+    Returns:
+        A single string prompt for the model.
+    """
+    prompt = "You are a helpful assistant that rewrites ambiguous user questions based on chat history.\n"
+    prompt += "Do not answer the question. Reply with only the rewritten question, on one line.\n\n"
+    prompt += "Chat history:\n"
+    for m in rewrite_window(messages, window):
+        prompt += f"{m['role'].capitalize()}: {m['content']}\n"
+    prompt += f"\nAmbiguous user input: {new_user_input}\n"
+    prompt += "Rewritten version:"
+    return prompt
+
+
+def format_summary_prompt(summary: str, messages: List[Dict[str, str]]) -> str:
+    """
+    Create the prompt asking the LLM to fold older chat turns into a summary.
+
+    Args:
+        summary: The summary of the conversation so far, possibly empty.
+        messages: The turns to add to the summary (OpenAI-style chat format).
+
+    Returns:
+        A single string prompt for the model.
+    """
+    prompt = "You maintain a short summary of a customer support conversation.\n"
+    prompt += "Update the summary with the new messages. Keep the products, facts and "
+    prompt += "open questions the customer mentioned. Reply with only the summary.\n\n"
+    prompt += f"Current summary:\n{summary or '(empty)'}\n\n"
+    prompt += "New messages:\n"
+    for m in messages:
+        prompt += f"{m['role'].capitalize()}: {m['content']}\n"
+    prompt += "\nUpdated summary:"
+    return prompt
+
+
 def get_initial_chat_state() -> List[Dict[str, str]]:
     """
     Initialize the conversation with the system prompt.
@@ -0,0 +1,160 @@
+import threading
+from typing import Any, Dict, NamedTuple, Set
+
+from loguru import logger
+
+from rag.ollama_rag import OllamaRag
+
+DEFAULT_COLLECTION = "qas"
+DEFAULT_DB_PATH = "/tmp/ch_db"
+DEFAULT_MODEL = "llama3:8b-instruct-q4_0"
+DEFAULT_EMBEDDING_MODEL = "BGE-M3"
+
+
+class PipelineKey(NamedTuple):
+    """Identifies a shared RAG pipeline instance."""
+
+    collection_name: str
+    db_path: str
+    model_name: str
+    embedding_model: str
+
+
+_pipelines: Dict[PipelineKey, OllamaRag] = {}
+_warmed: Set[PipelineKey] = set()
+# Guards the dicts above; building and warming up, which load models and call
+# the model server, hold only the lock of their key.
+_lock = threading.RLock()
+_key_locks: Dict[PipelineKey, threading.Lock] = {}
+
+
+def _make_key(
+    collection_name: str, db_path: str, model_name: str, embedding_model: str
+) -> PipelineKey:
+    return PipelineKey(collection_name, db_path, model_name, embedding_model)
+
+
+def _key_lock(key: PipelineKey) -> threading.Lock:
+    with _lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+
+def _build(key: PipelineKey, **kwargs: Any) -> OllamaRag:
+    logger.info(f"Building RAG pipeline for {key}")
+    return OllamaRag(
+        collection_name=key.collection_name,
+        db_path=key.db_path,
+        model_name=key.model_name,
+        embedding_model=key.embedding_model,
+        **kwargs,
+    )
+
+
+def get_pipeline(
+    collection_name: str = DEFAULT_COLLECTION,
+    db_path: str = DEFAULT_DB_PATH,
+    model_name: str = DEFAULT_MODEL,
+    embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+    **kwargs: Any,
+) -> OllamaRag:
+    """
+    Returns the process-wide pipeline for the given key, building it on first use.
+
+    Extra keyword arguments are forwarded to `OllamaRag` only when the pipeline
+    is built; later calls with the same key return the existing instance.
+
+    Args:
+        collection_name (str): Name of the Chroma vector store collection.
+        db_path (str): Path to the vector DB on disk.
+        model_name (str): LLM model identifier used for chat generation.
+        embedding_model (str): Embedding model name for document encoding.
+
+    Returns:
+        OllamaRag: The shared pipeline instance.
+    """
+    key = _make_key(collection_name, db_path, model_name, embedding_model)
+    pipeline = _pipelines.get(key)
+    if pipeline is not None:
+        return pipeline
+
+    with _key_lock(key):
+        pipeline = _pipelines.get(key)
+        if pipeline is None:
+            pipeline = _build(key, **kwargs)
+            with _lock:
+                _pipelines[key] = pipeline
+        return pipeline
+
+
+def warm_pipeline(
+    collection_name: str = DEFAULT_COLLECTION,
+    db_path: str = DEFAULT_DB_PATH,
+    model_name: str = DEFAULT_MODEL,
+    embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+    **kwargs: Any,
+) -> OllamaRag:
+    """
+    Builds (if needed) and warms up the pipeline once per process.
+
+    Warming loads the embedding model and the lexical index so the first user
+    message does not pay for it. Subsequent calls are no-ops.
+
+    Returns:
+        OllamaRag: The shared, warmed pipeline instance.
+    """
+    key = _make_key(collection_name, db_path, model_name, embedding_model)
+    pipeline = get_pipeline(*key, **kwargs)
+    if key in _warmed:
+        return pipeline
+
+    with _key_lock(key):
+        if key not in _warmed:
+            pipeline.warm_up()
+            with _lock:
+                _warmed.add(key)
+    return pipeline
+
+
+def reload_pipeline(
+    collection_name: str = DEFAULT_COLLECTION,
+    db_path: str = DEFAULT_DB_PATH,
+    model_name: str = DEFAULT_MODEL,
+    embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+    close_previous: bool = False,
+    **kwargs: Any,
+) -> OllamaRag:
+    """
+    Rebuilds the pipeline for the given key, e.g. after the collection changed.
+
+    The new instance is built and warmed up before it replaces the old one, so
+    concurrent callers keep being served by the previous pipeline in the
+    meantime. The previous pipeline is left open, since requests may still be
+    using it; its owner closes it once they finished.
+
+    Args:
+        close_previous (bool): Close the previous pipeline right away; only safe
+            when no request can still be using it.
+
+    Returns:
+        OllamaRag: The freshly built, warmed pipeline instance.
+    """
+    key = _make_key(collection_name, db_path, model_name, embedding_model)
+    pipeline = _build(key, **kwargs)
+    pipeline.warm_up()
+    with _lock:
+        previous = _pipelines.get(key)
+        _pipelines[key] = pipeline
+        _warmed.add(key)
+    if close_previous and previous is not None:
+        previous.close()
+    return pipeline
+
+
+def clear_pipelines() -> None:
+    """Drops and closes all cached pipelines."""
+    with _lock:
+        pipelines = list(_pipelines.values())
+        _pipelines.clear()
+        _warmed.clear()
+    for pipeline in pipelines:
+        pipeline.close()
@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import httpx
+from loguru import logger
+
+from observability import metrics, trace
+from rag.backends import ChatBackend
+from rag.prompts import format_rewrite_prompt, rewrite_window
+
+
+class QueryRewriter:
+    """
+    Rewrites ambiguous follow-up questions into self-contained ones.
+
+    The rewrite is a short, bounded generation: it can use a smaller model than
+    the answer generation, its output is capped at `num_predict` tokens and it
+    must finish within `timeout` seconds, otherwise the original input is used.
+    Results are cached by the history window the prompt is built from plus the
+    input, so repeated turns do not call the model again.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        backend: ChatBackend,
+        num_predict: int = 64,
+        timeout: float = 2.0,
+        cache_size: int = 512,
+        window: int = 4,
+    ):
+        """
+        Args:
+            model_name (str): Model used for rewriting.
+            backend (ChatBackend): Chat backend serving the model.
+            num_predict (int): Max number of tokens of a rewrite.
+            timeout (float): Latency budget in seconds for a rewrite.
+            cache_size (int): Rewrites kept in memory; 0 disables caching.
+            window (int): Number of most recent messages used as context.
+        """
+        self.model_name = model_name
+        self.backend = backend
+        self.num_predict = num_predict
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.window = window
+
+        self.hits = 0
+        self.misses = 0
+        self.timeouts = 0
+        self.seconds = 0.0
+
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache and timeout counters and the total time spent rewriting."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "timeouts": self.timeouts,
+            "seconds": self.seconds,
+            "cache_entries": len(self._cache),
+        }
+
+    def cache_key(self, messages: List[Dict[str, str]], new_user_input: str) -> str:
+        """Hash of the history window the rewrite depends on and of the input."""
+        payload = json.dumps(
+            [self.model_name, rewrite_window(messages, self.window), new_user_input],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _cached(self, key: str) -> Optional[str]:
+        with self._lock:
+            rewritten = self._cache.get(key)
+            if rewritten is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            metrics.REWRITES.labels("cached").inc()
+            return rewritten
+
+    def _remember(self, key: str, rewritten: str) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[key] = rewritten
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _messages(
+        self, messages: List[Dict[str, str]], new_user_input: str
+    ) -> List[Dict[str, str]]:
+        prompt = format_rewrite_prompt(messages, new_user_input, window=self.window)
+        return [{"role": "user", "content": prompt}]
+
+    def _options(self) -> Dict[str, Any]:
+        return {"temperature": 0.0, "num_predict": self.num_predict}
+
+    @staticmethod
+    def _clean(content: str, new_user_input: str) -> str:
+        """Keeps the first line of the answer; falls back to the input if empty."""
+        lines = content.strip().splitlines()
+        rewritten = lines[0].strip().strip('"') if lines else ""
+        return rewritten or new_user_input
+
+    def _finish(
+        self,
+        key: str,
+        new_user_input: str,
+        response: Optional[Dict[str, Any]],
+        start: float,
+    ) -> str:
+        elapsed = time.perf_counter() - start
+        self.seconds += elapsed
+        if response is None:
+            self.timeouts += 1
+            metrics.REWRITES.labels("timeout").inc()
+            logger.warning(
+                f"Query rewrite exceeded {self.timeout:.1f}s, using the original input."
+            )
+            return new_user_input
+
+        metrics.REWRITES.labels("rewritten").inc()
+        metrics.observe_llm_response(response, call="rewrite")
+        rewritten = self._clean(response["message"]["content"], new_user_input)
+        logger.debug(f"Rewrote {new_user_input!r} to {rewritten!r} in {elapsed:.2f}s")
+        self._remember(key, rewritten)
+        return rewritten
+
+    @trace(tracer="opik", tags=["rewrite"])
+    def _chat(self, msgs: List[Dict[str, str]]) -> Dict[str, Any]:
+        return self.backend.chat(
+            self.model_name, msgs, options=self._options(), timeout=self.timeout
+        )
+
+    @trace(tracer="opik", tags=["rewrite"])
+    async def _achat(self, msgs: List[Dict[str, str]]) -> Dict[str, Any]:
+        return await self.backend.achat(
+            self.model_name, msgs, options=self._options(), timeout=self.timeout
+        )
+
+    def rewrite(self, messages: List[Dict[str, str]], new_user_input: str) -> str:
+        """
+        Rewrites user input using chat history to resolve ambiguity.
+
+        Args:
+            messages (List[Dict[str, str]]): Message history (OpenAI-style chat format).
+            new_user_input (str): The ambiguous user input.
+
+        Returns:
+            str: The self-contained question, or the input if the budget ran out.
+        """
+        key = self.cache_key(messages, new_user_input)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        start = time.perf_counter()
+        response: Optional[Dict[str, Any]] = None
+        try:
+            response = self._chat(self._messages(messages, new_user_input))
+        except httpx.TimeoutException:
+            pass
+        return self._finish(key, new_user_input, response, start)
+
+    async def arewrite(
+        self, messages: List[Dict[str, str]], new_user_input: str
+    ) -> str:
+        """Async version of `rewrite`."""
+        key = self.cache_key(messages, new_user_input)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        start = time.perf_counter()
+        response: Optional[Dict[str, Any]] = None
+        try:
+            response = await asyncio.wait_for(
+                self._achat(self._messages(messages, new_user_input)), self.timeout
+            )
+        except asyncio.TimeoutError:
+            pass
+        return self._finish(key, new_user_input, response, start)
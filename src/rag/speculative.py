@@ -0,0 +1,225 @@
+import contextvars
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from langchain_core.documents import Document
+from loguru import logger
+
+from observability import metrics, stage
+from rag.fusion import fuse_documents
+
+if TYPE_CHECKING:
+    from rag.ollama_rag import OllamaRag
+
+Results = List[Tuple[Document, float]]
+
+
+class Prepared(NamedTuple):
+    """The outcome of the stages before generation."""
+
+    # Question embedding for the answer cache; None if the turn is not cacheable.
+    embedding: Optional[List[float]]
+    # A cached (answer, chunks); when set, the fields below are empty.
+    cached: Optional[Tuple[str, List[str]]] = None
+    conversation: List[Dict[str, str]] = []
+    chunks: List[str] = []
+
+
+class RawRetrieval(NamedTuple):
+    embedding: Optional[List[float]]
+    cached: Optional[Tuple[str, List[str]]]
+    empty: bool
+    results: Results
+    fused_results: Results
+
+
+class Speculator:
+    """
+    Overlaps the stages before generation instead of running them in sequence.
+
+    Three branches start together on a thread pool:
+
+    - input validation,
+    - the answer cache lookup and retrieval on the raw input, and
+    - for ambiguous follow-ups, the query rewrite followed by retrieval on the
+      rewritten query.
+
+    A rejected input raises as soon as validation fails, and the other branches
+    are discarded. The raw results are always used. The rewritten question and
+    its results are merged in only if they arrive within `deadline` seconds of
+    the rewrite branch starting, so time spent queued for a thread does not
+    count against it; a late rewrite still finishes in the background and fills
+    the rewrite cache. The critical path is the slowest branch, not their sum.
+
+    Args:
+        rag (OllamaRag): The pipeline whose stages are run.
+        deadline (float): Seconds to wait for the rewritten query's results.
+        max_workers (int): Threads for the branches; three per request in flight,
+            so size it from the number of requests served at once.
+        rewrite_weight (float): Weight of the rewritten query's results relative
+            to the raw ones in the merge.
+    """
+
+    def __init__(
+        self,
+        rag: "OllamaRag",
+        deadline: float = 2.0,
+        max_workers: int = 12,
+        rewrite_weight: float = 2.0,
+    ):
+        self.rag = rag
+        self.deadline = deadline
+        self.rewrite_weight = rewrite_weight
+        self.executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="speculative"
+        )
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        # Each branch runs in a copy of the caller's context, so its stages are
+        # recorded in the caller's trace.
+        return self.executor.submit(contextvars.copy_context().run, fn, *args)
+
+    def validate(self, validate: Callable[[str], Any], text: str) -> None:
+        with stage("validation"):
+            validate(text)
+
+    def raw_retrieval(self, text: str) -> RawRetrieval:
+        with stage("answer_cache"):
+            embedding, cached = self.rag.cached_answer(text)
+        if cached is not None:
+            return RawRetrieval(embedding, cached, False, [], [])
+
+        with stage("collection_check"):
+            empty = self.rag.is_collection_empty()
+        if empty:
+            return RawRetrieval(embedding, None, True, [], [])
+        results, fused_results = self.rag.retrieve(text)
+        return RawRetrieval(embedding, None, False, results, fused_results)
+
+    def rewrite_and_retrieve(
+        self, msgs: List[Dict[str, str]], text: str, started: "Future[float]"
+    ) -> Tuple[str, Optional[Tuple[Results, Results]]]:
+        started.set_result(time.perf_counter())
+        with stage("rewrite"):
+            rewritten = self.rag.rewrite_ambiguous_prompt(msgs, text)
+        if rewritten == text:
+            return rewritten, None
+        return rewritten, self.rag.retrieve(rewritten)
+
+    def merge(self, rewritten: Results, raw: Results, top_k: int) -> Results:
+        """Rank-fuses the two result lists, favouring the rewritten query's."""
+        return fuse_documents(
+            [rewritten, raw],
+            strategy="rrf",
+            weights=[self.rewrite_weight, 1.0],
+            top_k=top_k,
+        )
+
+    def prepare(
+        self,
+        text: str,
+        msgs: List[Dict[str, str]],
+        validate: Optional[Callable[[str], Any]] = None,
+    ) -> Prepared:
+        """
+        Speculative version of `OllamaRag.prepare`.
+
+        Args:
+            text (str): The user's question or prompt.
+            msgs (List[Dict[str, str]]): Message history (OpenAI-style chat format).
+            validate (Optional[Callable[[str], Any]]): Input check that raises to
+                reject the input.
+
+        Returns:
+            Prepared: A cached answer, or the messages to send to the LLM.
+        """
+        guard = self.submit(self.validate, validate, text) if validate else None
+        raw = self.submit(self.raw_retrieval, text)
+        rewrite = None
+        rewrite_started: "Future[float]" = Future()
+        if self.rag.needs_rewrite(text):
+            rewrite = self.submit(
+                self.rewrite_and_retrieve, msgs, text, rewrite_started
+            )
+
+        if guard is not None:
+            try:
+                guard.result()
+            except Exception:
+                # Not-yet-started branches are cancelled, running ones discarded.
+                raw.cancel()
+                if rewrite is not None:
+                    rewrite.cancel()
+                raise
+
+        retrieval = raw.result()
+        if retrieval.cached is not None:
+            return Prepared(retrieval.embedding, retrieval.cached)
+
+        question = text
+        results, fused_results = retrieval.results, retrieval.fused_results
+        if rewrite is not None:
+            try:
+                question, rewritten = self.rewrite_result(rewrite, rewrite_started)
+            except FutureTimeout:
+                metrics.REWRITES.labels("late").inc()
+                logger.debug(
+                    f"Rewrite missed the {self.deadline:.1f}s deadline, "
+                    "answering with the raw input's results."
+                )
+            except Exception as e:
+                metrics.REWRITES.labels("error").inc()
+                logger.warning(
+                    f"Rewrite failed, answering with the raw input's results: {e}"
+                )
+            else:
+                if rewritten is not None and not retrieval.empty:
+                    with stage("merge"):
+                        results = self.merge(
+                            rewritten[0], results, self.rag.retrieval_k
+                        )
+                        fused_results = self.merge(
+                            rewritten[1], fused_results, self.rag.context_k
+                        )
+
+        if retrieval.empty:
+            logger.warning("Collection is empty!")
+            metrics.EMPTY_COLLECTION.inc()
+        with stage("prompt"):
+            conversation, chunks = self.rag.assemble_conversation(
+                question, msgs, results, fused_results
+            )
+        return Prepared(retrieval.embedding, None, conversation, chunks)
+
+    def rewrite_result(
+        self, rewrite: Future, started: "Future[float]"
+    ) -> Tuple[str, Optional[Tuple[Results, Results]]]:
+        """
+        Waits for the rewrite branch, up to `deadline` from when it started.
+
+        A branch still queued for a thread after `deadline` is cancelled.
+
+        Raises:
+            TimeoutError: If the branch did not start or finish in time.
+        """
+        wait([started, rewrite], timeout=self.deadline, return_when=FIRST_COMPLETED)
+        if not started.done():
+            # Still queued, e.g. behind other requests' branches.
+            rewrite.cancel()
+            raise FutureTimeout()
+        remaining = self.deadline - (time.perf_counter() - started.result())
+        return rewrite.result(timeout=max(0.0, remaining))
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,481 @@
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from loguru import logger
+
+INDEX_FILES = ("ids", "centroids", "list_offsets", "docs", "doc_offsets")
+VECTOR_FILES = ("vectors", "codes", "scales", "norms")
+CURRENT_FILE = "CURRENT"
+SPACES = ("l2", "cosine", "ip")
+QUANTIZATIONS = ("none", "float16", "int8")
+
+
+def kmeans(
+    vectors: np.ndarray,
+    n_clusters: int,
+    iterations: int = 10,
+    seed: int = 1234,
+    max_train_per_cluster: int = 256,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Lloyd's k-means, trained on a sample of at most `max_train_per_cluster`
+    vectors per cluster.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The centroids and the cluster of each vector.
+    """
+    rng = np.random.default_rng(seed)
+    train = vectors
+    if len(vectors) > n_clusters * max_train_per_cluster:
+        size = n_clusters * max_train_per_cluster
+        train = vectors[np.sort(rng.choice(len(vectors), size, replace=False))]
+
+    centroids = train[rng.choice(len(train), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = nearest_centroids(train, centroids)
+        counts = np.bincount(assignment, minlength=n_clusters)
+        filled = counts > 0
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        grouped = train[np.argsort(assignment, kind="stable")]
+        centroids[filled] = (
+            np.add.reduceat(grouped, starts[filled], axis=0) / counts[filled, None]
+        )
+        # Re-seed empty clusters with random vectors.
+        centroids[~filled] = train[rng.choice(len(train), int((~filled).sum()))]
+    return centroids, nearest_centroids(vectors, centroids)
+
+
+def nearest_centroids(
+    vectors: np.ndarray, centroids: np.ndarray, block: int = 4096
+) -> np.ndarray:
+    """Index of the closest centroid (squared L2) of every vector."""
+    centroid_norms = np.einsum("ij,ij->i", centroids, centroids)
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block):
+        part = vectors[start : start + block]
+        distances = centroid_norms[None, :] - 2.0 * part @ centroids.T
+        assignment[start : start + block] = np.argmin(distances, axis=1)
+    return assignment
+
+
+def quantize(
+    vectors: np.ndarray, method: str
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Compresses float32 vectors.
+
+    "float16" halves the size. "int8" quarters it, using symmetric quantization
+    with one scale per vector: `vector ~= codes * scale`.
+
+    Returns:
+        Tuple[np.ndarray, Optional[np.ndarray]]: The codes and, for int8, the
+            per-vector scales.
+    """
+    if method == "float16":
+        return vectors.astype(np.float16), None
+    if method == "int8":
+        peaks = np.abs(vectors).max(axis=1) if len(vectors) else np.zeros(0)
+        scales = np.where(peaks > 0, peaks / 127.0, 1.0).astype(np.float32)
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127)
+        return codes.astype(np.int8), scales
+    raise ValueError(f"Unknown quantization: {method}")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def _smallest(values: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` smallest values in ascending order."""
+    if k < len(values):
+        candidates = np.argpartition(values, k - 1)[:k]
+    else:
+        candidates = np.arange(len(values))
+    return candidates[np.argsort(values[candidates], kind="stable")]
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest neighbour index.
+
+    Vectors are clustered with k-means and stored grouped by cluster, so the
+    vectors of cluster `c` are `vectors[list_offsets[c]:list_offsets[c + 1]]`. A
+    query scans only the `nprobe` clusters whose centroids are closest to it.
+    Small collections use a single cluster, i.e. an exact scan.
+
+    Distances follow Chroma's conventions for the collection's space (squared L2,
+    1 - cosine similarity or 1 - inner product), so the vector store's relevance
+    function applies unchanged. Document texts and metadata are stored alongside
+    the vectors, making the index a complete read path.
+
+    Vectors can be stored quantized to float16 or int8. The scan then runs on the
+    compact codes, and a shortlist of `rescore` times `k` candidates is re-ranked
+    with the full-precision vectors, which are kept on disk and only paged in for
+    the shortlist.
+
+    All arrays are saved as `.npy` files and memory-mapped on load, so worker
+    processes share one copy of the index through the page cache.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        centroids: np.ndarray,
+        list_offsets: np.ndarray,
+        docs: np.ndarray,
+        doc_offsets: np.ndarray,
+        space: str = "l2",
+        vectors: Optional[np.ndarray] = None,
+        codes: Optional[np.ndarray] = None,
+        scales: Optional[np.ndarray] = None,
+        norms: Optional[np.ndarray] = None,
+        quantization: str = "none",
+    ):
+        """
+        Args:
+            ids (np.ndarray): Document IDs, grouped by cluster.
+            centroids (np.ndarray): (clusters x dim) cluster centroids.
+            list_offsets (np.ndarray): Start of each cluster, plus the total count.
+            docs (np.ndarray): UTF-8 JSON records {"text", "metadata"} as bytes.
+            doc_offsets (np.ndarray): Start of each record in `docs`, plus the end.
+            space (str): Distance space of the collection: "l2", "cosine" or "ip".
+            vectors (Optional[np.ndarray]): (n x dim) float32 vectors, aligned with
+                `ids`; optional for quantized indexes, which then cannot rescore.
+            codes (Optional[np.ndarray]): Quantized vectors.
+            scales (Optional[np.ndarray]): Per-vector scales of int8 codes.
+            norms (Optional[np.ndarray]): Squared norms of the vectors, used for L2
+                distances on codes.
+            quantization (str): "none", "float16" or "int8".
+        """
+        if space not in SPACES:
+            raise ValueError(f"Unsupported space: {space}")
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization: {quantization}")
+        if (vectors if quantization == "none" else codes) is None:
+            raise ValueError("Missing vectors for the index.")
+
+        self.ids = ids
+        self.vectors = vectors
+        self.codes = codes
+        self.scales = scales
+        self.norms = norms
+        self.quantization = quantization
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.docs = docs
+        self.doc_offsets = doc_offsets
+        self.space = space
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Bytes of the arrays a query scans, and of the full-precision vectors that
+        are only read for rescoring (0 for unquantized indexes, which scan them).
+        """
+        if self.quantization == "none":
+            assert self.vectors is not None
+            scanned = self.vectors.nbytes
+            rescoring = 0
+        else:
+            assert self.codes is not None
+            scanned = self.codes.nbytes + sum(
+                array.nbytes for array in (self.scales, self.norms) if array is not None
+            )
+            rescoring = self.vectors.nbytes if self.vectors is not None else 0
+        return {
+            "scanned": scanned + self.centroids.nbytes,
+            "rescoring": rescoring,
+            "documents": self.docs.nbytes,
+        }
+
+    @classmethod
+    def build(
+        cls,
+        ids: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        texts: Sequence[str],
+        metadatas: Sequence[Optional[Dict[str, Any]]],
+        space: str = "l2",
+        n_lists: Optional[int] = None,
+        min_list_size: int = 64,
+        seed: int = 1234,
+        quantization: str = "none",
+        keep_full_precision: bool = True,
+    ) -> "IVFIndex":
+        """
+        Clusters the embeddings and builds the index.
+
+        Args:
+            ids (Sequence[str]): Document IDs.
+            embeddings (Sequence[Sequence[float]]): Their embeddings.
+            texts (Sequence[str]): Their contents.
+            metadatas (Sequence[Optional[Dict[str, Any]]]): Their metadata.
+            space (str): Distance space of the collection.
+            n_lists (Optional[int]): Number of clusters; defaults to about
+                sqrt(n), with at least `min_list_size` vectors per cluster.
+            min_list_size (int): Minimum average cluster size.
+            seed (int): Seed for the k-means initialisation.
+            quantization (str): Storage of the scanned vectors: "none",
+                "float16" or "int8".
+            keep_full_precision (bool): Keep float32 vectors next to quantized
+                ones for rescoring.
+
+        Returns:
+            IVFIndex: The index.
+        """
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        if space == "cosine":
+            vectors = _normalize(vectors)
+
+        n = len(vectors)
+        if n_lists is None:
+            n_lists = min(int(np.sqrt(n)), n // min_list_size)
+        n_lists = max(1, min(n_lists, n))
+
+        if n_lists == 1:
+            centroids = vectors.mean(axis=0, keepdims=True)
+            assignment = np.zeros(n, dtype=np.int64)
+        else:
+            centroids, assignment = kmeans(vectors, n_lists, seed=seed)
+
+        order = np.argsort(assignment, kind="stable")
+        list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=n_lists), out=list_offsets[1:])
+
+        records = [
+            json.dumps(
+                {"text": texts[int(i)], "metadata": metadatas[int(i)] or {}}
+            ).encode("utf-8")
+            for i in order
+        ]
+        doc_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(record) for record in records], out=doc_offsets[1:])
+
+        vectors = np.ascontiguousarray(vectors[order])
+        arrays: Dict[str, Optional[np.ndarray]] = {"vectors": vectors}
+        if quantization != "none":
+            codes, scales = quantize(vectors, quantization)
+            arrays = {
+                "vectors": vectors if keep_full_precision else None,
+                "codes": codes,
+                "scales": scales,
+                "norms": np.einsum("ij,ij->i", vectors, vectors),
+            }
+
+        return cls(
+            ids=np.asarray(ids, dtype=str)[order],
+            centroids=centroids.astype(np.float32),
+            list_offsets=list_offsets,
+            docs=np.frombuffer(b"".join(records), dtype=np.uint8),
+            doc_offsets=doc_offsets,
+            space=space,
+            quantization=quantization,
+            **arrays,
+        )
+
+    def distances(self, query: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+        """Distances from `query` to `vectors`, in Chroma's convention for the space."""
+        if self.space == "l2":
+            diff = vectors - query
+            return np.einsum("ij,ij->i", diff, diff)
+        return 1.0 - vectors @ query
+
+    def _scan(
+        self, query: np.ndarray, rows: Optional[np.ndarray], block: int = 16384
+    ) -> np.ndarray:
+        """
+        Distances from `query` to the given rows (all rows if None), computed on the
+        quantized codes when there are any. Rows are decoded in blocks to bound the
+        temporary float32 memory.
+        """
+        if self.quantization == "none":
+            assert self.vectors is not None
+            vectors = np.asarray(self.vectors) if rows is None else self.vectors[rows]
+            return self.distances(query, vectors)
+
+        assert self.codes is not None
+        count = len(self.ids) if rows is None else len(rows)
+        dots = np.empty(count, dtype=np.float32)
+        for start in range(0, count, block):
+            part = slice(start, start + block)
+            selected = part if rows is None else rows[part]
+            dots[part] = self.codes[selected].astype(np.float32) @ query
+            if self.scales is not None:
+                dots[part] *= self.scales[selected]
+
+        if self.space == "l2":
+            assert self.norms is not None
+            norms = self.norms if rows is None else self.norms[rows]
+            return norms - 2.0 * dots + float(query @ query)
+        return 1.0 - dots
+
+    def _probe(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Rows of the clusters closest to the query."""
+        if nprobe >= self.n_lists:
+            return np.arange(len(self.ids))
+
+        diff = self.centroids - query
+        centroid_distances = np.einsum("ij,ij->i", diff, diff)
+        closest = np.argpartition(centroid_distances, nprobe - 1)[:nprobe]
+        starts = self.list_offsets[closest]
+        sizes = self.list_offsets[closest + 1] - starts
+        # Concatenated row ranges of the probed clusters.
+        shifts = np.repeat(starts - np.cumsum(sizes) + sizes, sizes)
+        return shifts + np.arange(sizes.sum())
+
+    def search(
+        self,
+        embedding: Sequence[float],
+        k: int = 5,
+        nprobe: int = 8,
+        rescore: int = 4,
+    ) -> List[Tuple[int, float]]:
+        """
+        Finds the approximate `k` nearest neighbours of a query embedding.
+
+        Args:
+            embedding (Sequence[float]): The query embedding.
+            k (int): Number of results to return.
+            nprobe (int): Number of clusters to scan.
+            rescore (int): For quantized indexes, re-rank the best `rescore * k`
+                candidates with full-precision vectors; 0 disables rescoring.
+
+        Returns:
+            List[Tuple[int, float]]: Rows of the nearest documents and their
+                distances, closest first.
+        """
+        if len(self.ids) == 0 or k <= 0:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        if self.space == "cosine":
+            query = _normalize(query)
+
+        rows = self._probe(query, nprobe)
+        distances = self._scan(query, None if len(rows) == len(self.ids) else rows)
+
+        if self.quantization != "none" and rescore > 0 and self.vectors is not None:
+            # Sorted rows read the memory-mapped vectors sequentially.
+            rows = np.sort(rows[_smallest(distances, k * rescore)])
+            distances = self.distances(query, self.vectors[rows])
+
+        best = _smallest(distances, k)
+        return [(int(rows[i]), float(distances[i])) for i in best]
+
+    def document(self, row: int) -> Document:
+        """The document stored at `row`."""
+        start, end = self.doc_offsets[row], self.doc_offsets[row + 1]
+        record = json.loads(bytes(self.docs[start:end]).decode("utf-8"))
+        return Document(
+            page_content=record["text"],
+            metadata=record["metadata"],
+            id=str(self.ids[row]),
+        )
+
+    def save(self, path: str, collection_fingerprint: Optional[str] = None) -> None:
+        """
+        Persists the index as `.npy` arrays.
+
+        Every build is written to a fresh subdirectory and published by atomically
+        replacing the `CURRENT` pointer, so a process loading the index never sees
+        a mix of two builds. Processes that memory-mapped a previous build keep
+        their view until they reload.
+
+        Args:
+            path (str): Directory to write the index to.
+            collection_fingerprint (Optional[str]): Fingerprint of the collection
+                the index was built from, checked by `load`.
+        """
+        directory = Path(path)
+        build = f"build-{uuid.uuid4().hex}"
+        (directory / build).mkdir(parents=True)
+        arrays = [
+            name
+            for name in INDEX_FILES + VECTOR_FILES
+            if getattr(self, name) is not None
+        ]
+        for name in arrays:
+            np.save(directory / build / f"{name}.npy", np.asarray(getattr(self, name)))
+
+        current = {
+            "build": build,
+            "space": self.space,
+            "quantization": self.quantization,
+            "arrays": arrays,
+            "fingerprint": collection_fingerprint,
+        }
+        tmp = directory / f"{CURRENT_FILE}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(current, f)
+        os.replace(tmp, directory / CURRENT_FILE)
+
+        for old in directory.glob("build-*"):
+            if old.name != build:
+                shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        collection_fingerprint: Optional[str] = None,
+        quantization: Optional[str] = None,
+    ) -> Optional["IVFIndex"]:
+        """
+        Memory-maps the current build of a persisted index.
+
+        Args:
+            path (str): Directory the index was saved to.
+            collection_fingerprint (Optional[str]): If given, the index is only
+                returned when it was saved with the same fingerprint.
+            quantization (Optional[str]): If given, the index is only returned
+                when it was built with this quantization.
+
+        Returns:
+            Optional[IVFIndex]: The index, or None if it is missing or stale.
+        """
+        current_path = Path(path) / CURRENT_FILE
+        if not current_path.exists():
+            return None
+
+        with open(current_path, "r", encoding="utf-8") as f:
+            current = json.load(f)
+
+        if (
+            collection_fingerprint
+            and current.get("fingerprint") != collection_fingerprint
+        ):
+            logger.info(f"Vector index at {path} is stale, ignoring it.")
+            return None
+        if quantization and current.get("quantization", "none") != quantization:
+            logger.info(
+                f"Vector index at {path} is quantized differently, ignoring it."
+            )
+            return None
+
+        directory = Path(path) / current["build"]
+        try:
+            arrays = {
+                name: np.load(directory / f"{name}.npy", mmap_mode="r")
+                for name in current.get("arrays", INDEX_FILES + ("vectors",))
+            }
+        except FileNotFoundError:
+            # Replaced by a concurrent rebuild.
+            return None
+        return cls(
+            space=current["space"],
+            quantization=current.get("quantization", "none"),
+            **arrays,
+        )
@@ -0,0 +1,6 @@
+# The app and the service are imported from their modules, so that the client
+# and the settings do not pull in the server's dependencies.
+from .client import APIError, QAClient
+from .config import ServerConfig
+
+__all__ = ["ServerConfig", "QAClient", "APIError"]
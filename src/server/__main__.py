@@ -0,0 +1,66 @@
+import argparse
+import os
+import shutil
+import tempfile
+
+import uvicorn
+
+from config.app_config import get_settings
+from server.dispatcher import Dispatcher, create_dispatcher_app
+from server.pool import WorkerPool, worker_env, worker_threads
+
+
+def main() -> None:
+    server = get_settings().server
+    parser = argparse.ArgumentParser(description="Serve the QA bot HTTP API.")
+    parser.add_argument("--host", default=server.host)
+    parser.add_argument("--port", type=int, default=server.port)
+    parser.add_argument("--workers", type=int, default=server.workers)
+    parser.add_argument("--db-path", default=server.db_path)
+    parser.add_argument("--collection", default=server.collection)
+    parser.add_argument(
+        "--dispatch",
+        action="store_true",
+        default=server.dispatch,
+        help="Run the workers on their own ports behind a dispatcher that keeps "
+        "each conversation on one worker.",
+    )
+    args = parser.parse_args()
+
+    # The workers read their settings from the environment.
+    os.environ["QA_APP_SERVER__DB_PATH"] = args.db_path
+    os.environ["QA_APP_SERVER__COLLECTION"] = args.collection
+    if args.dispatch:
+        os.environ["QA_APP_SERVER__DISPATCH"] = "true"
+    if args.workers > 1 and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        # Lets /metrics aggregate the metrics of all workers.
+        metrics_dir = os.path.join(tempfile.gettempdir(), "qa-bot-metrics")
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir)
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
+    if args.dispatch:
+        pool = WorkerPool(
+            [args.port + 1 + i for i in range(args.workers)], server.worker_threads
+        ).start()
+        try:
+            app = create_dispatcher_app(Dispatcher(pool.urls))
+            uvicorn.run(app, host=args.host, port=args.port)
+        finally:
+            pool.stop()
+        return
+
+    # Before the app imports the math libraries; uvicorn's worker processes
+    # inherit the limits.
+    os.environ.update(worker_env(worker_threads(args.workers, server.worker_threads)))
+    uvicorn.run(
+        "server.app:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+    )
+
+
+if __name__ == "__main__":
+    main()
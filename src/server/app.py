@@ -0,0 +1,173 @@
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from loguru import logger
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    generate_latest,
+)
+from pydantic import BaseModel
+
+from config.app_config import get_settings
+from guards import GuardRejected, get_engine
+from observability import setup_tracing
+from observability.metrics import enable_stage_metrics
+from server.service import ConversationNotFound, QAService
+
+
+class ChatRequest(BaseModel):
+    message: str
+    # A new conversation is started if omitted.
+    conversation_id: Optional[str] = None
+    stream: bool = False
+
+
+class ChatResponse(BaseModel):
+    conversation_id: str
+    answer: str
+    chunks: List[str]
+
+
+class IngestRequest(BaseModel):
+    # A `.txt` file or a directory of them, on the server.
+    path: str
+    bulk: bool = False
+
+
+def sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Formats a server-sent event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+def rejected(e: ValueError) -> HTTPException:
+    reason = e.reason if isinstance(e, GuardRejected) else None
+    return HTTPException(400, detail={"message": str(e), "reason": reason})
+
+
+def metrics_payload() -> bytes:
+    """All workers' metrics in multiprocess mode, this process's otherwise."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def create_app(service: Optional[QAService] = None) -> FastAPI:
+    """
+    Builds the QA API.
+
+    Endpoints:
+        POST /v1/chat: Answers a message, as JSON or, with `stream`, as
+            server-sent events: a `start` event with the conversation ID and
+            the retrieved chunks, one event per token and an `end` event.
+        POST /v1/conversations, GET/DELETE /v1/conversations/{id}: Conversations.
+        POST /v1/ingest, POST /v1/reload: Update the knowledge base.
+        GET /health, GET /ready, GET /metrics: Liveness, readiness and metrics.
+
+    Args:
+        service (Optional[QAService]): The pipeline behind the API; built from
+            the `QA_APP_` settings by default.
+    """
+    if service is None:
+        settings = get_settings()
+        setup_tracing()
+        enable_stage_metrics()
+        # Builds the worker's guard engine from the QA_APP_GUARDS__* settings and
+        # loads its models before the first request rather than during it.
+        get_engine(settings.guards).warm_up()
+        service = QAService(settings.server, settings.model)
+
+    app = FastAPI(title="QA bot")
+    app.state.service = service
+    app.router.add_event_handler("shutdown", service.close)
+
+    @app.get("/health")
+    def health() -> Dict[str, str]:
+        return {"status": "ok"}
+
+    @app.get("/ready")
+    def ready() -> Dict[str, Any]:
+        try:
+            return service.ready()
+        except Exception as e:
+            logger.warning(f"Pipeline not ready: {e}")
+            raise HTTPException(503, detail=str(e))
+
+    @app.get("/metrics")
+    def metrics() -> Response:
+        return Response(metrics_payload(), media_type=CONTENT_TYPE_LATEST)
+
+    @app.post("/v1/conversations", status_code=201)
+    def create_conversation() -> Dict[str, str]:
+        return {"conversation_id": service.store.create()}
+
+    @app.get("/v1/conversations/{conversation_id}")
+    def get_conversation(conversation_id: str) -> Dict[str, Any]:
+        try:
+            return service.messages(conversation_id)
+        except ConversationNotFound:
+            raise HTTPException(404, detail="Unknown conversation")
+
+    @app.delete("/v1/conversations/{conversation_id}", status_code=204)
+    def delete_conversation(conversation_id: str) -> Response:
+        if not service.store.delete(conversation_id):
+            raise HTTPException(404, detail="Unknown conversation")
+        return Response(status_code=204)
+
+    @app.post("/v1/chat", response_model=ChatResponse)
+    def chat(request: ChatRequest) -> Any:
+        # Sync handlers run on the server's thread pool, so blocking pipeline
+        # calls do not stall the event loop.
+        conversation_id = request.conversation_id or service.store.create()
+        try:
+            if not request.stream:
+                answer, chunks = service.chat(conversation_id, request.message)
+                return ChatResponse(
+                    conversation_id=conversation_id, answer=answer, chunks=chunks
+                )
+            tokens, chunks = service.chat_stream(conversation_id, request.message)
+        except ConversationNotFound:
+            raise HTTPException(404, detail="Unknown conversation")
+        except ValueError as e:
+            raise rejected(e)
+
+        def events() -> Iterator[str]:
+            yield sse({"conversation_id": conversation_id, "chunks": chunks}, "start")
+            answer = []
+            try:
+                for token in tokens:
+                    answer.append(token)
+                    yield sse({"token": token})
+            except Exception as e:
+                logger.error(f"Streaming failed: {e}")
+                yield sse({"message": str(e)}, "error")
+                return
+            yield sse({"answer": "".join(answer).strip()}, "end")
+
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.post("/v1/ingest")
+    def ingest(request: IngestRequest) -> Dict[str, Any]:
+        if not os.path.exists(request.path):
+            raise HTTPException(404, detail=f"No such path: {request.path}")
+        version = service.ingest(request.path, bulk=request.bulk)
+        return {"status": "ok", "knowledge_version": version}
+
+    @app.post("/v1/reload")
+    def reload() -> Dict[str, Any]:
+        return {"status": "ok", "knowledge_version": service.reload()}
+
+    return app
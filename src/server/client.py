@@ -0,0 +1,92 @@
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+
+class APIError(Exception):
+    """An error response from the QA API; `message` is meant for the user."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+def _raise_for_status(response: httpx.Response) -> None:
+    if response.is_success:
+        return
+    response.read()
+    try:
+        detail = response.json().get("detail")
+    except ValueError:
+        detail = response.text
+    if isinstance(detail, dict):
+        detail = detail.get("message")
+    raise APIError(response.status_code, str(detail))
+
+
+class QAClient:
+    """
+    Client of the QA API in `server.app`, used by the Streamlit app.
+
+    Args:
+        base_url (str): The API's URL.
+        timeout (float): Request timeout in seconds.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 300.0):
+        self.client = httpx.Client(base_url=base_url, timeout=timeout)
+
+    def create_conversation(self) -> str:
+        response = self.client.post("/v1/conversations")
+        _raise_for_status(response)
+        return str(response.json()["conversation_id"])
+
+    def chat(self, conversation_id: str, message: str) -> Tuple[str, List[str]]:
+        response = self.client.post(
+            "/v1/chat", json={"conversation_id": conversation_id, "message": message}
+        )
+        _raise_for_status(response)
+        body = response.json()
+        return body["answer"], body["chunks"]
+
+    def chat_stream(self, conversation_id: str, message: str) -> Iterator[str]:
+        """
+        Yields the answer's tokens as they arrive.
+
+        Raises:
+            APIError: If the message is rejected or the stream fails.
+        """
+        payload = {
+            "conversation_id": conversation_id,
+            "message": message,
+            "stream": True,
+        }
+        with self.client.stream("POST", "/v1/chat", json=payload) as response:
+            _raise_for_status(response)
+            for event, data in self.events(response.iter_lines()):
+                if event == "error":
+                    raise APIError(500, data.get("message", "Streaming failed"))
+                if event == "message":
+                    yield data["token"]
+
+    @staticmethod
+    def events(lines: Iterator[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Parses server-sent events into (event, data) pairs."""
+        event: Optional[str] = None
+        for line in lines:
+            if line.startswith("event:"):
+                event = line[len("event:") :].strip()
+            elif line.startswith("data:"):
+                yield event or "message", json.loads(line[len("data:") :])
+            elif not line:
+                event = None
+
+    def reload(self) -> int:
+        response = self.client.post("/v1/reload")
+        _raise_for_status(response)
+        return int(response.json()["knowledge_version"])
+
+    def close(self) -> None:
+        self.client.close()
@@ -0,0 +1,28 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ServerConfig(BaseModel):
+    host: str = "0.0.0.0"
+    port: int = 8088
+    # Worker processes; each loads its own pipeline.
+    workers: int = 1
+    # Run the workers behind a dispatcher that keeps each conversation on one
+    # worker, instead of letting them share the listening socket.
+    dispatch: bool = False
+    # Math library threads per worker (torch, BLAS); cores / workers by default.
+    worker_threads: Optional[int] = None
+    db_path: str = "/tmp/ch_db"
+    collection: str = "qas"
+    # SQLite file with the conversations, shared by the workers.
+    # Defaults to a file in `db_path`.
+    state_path: Optional[str] = None
+    # Overlap validation, retrieval and the query rewrite.
+    speculative: bool = True
+    # Requests a worker answers at once; sizes the speculation thread pool.
+    concurrency: int = 4
+    # Search the memory-mapped IVF index, shared by the workers through the page
+    # cache, instead of each worker's copy of the Chroma HNSW index. On by
+    # default with `dispatch`.
+    vector_index: Optional[bool] = None
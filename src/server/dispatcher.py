@@ -0,0 +1,208 @@
+import hashlib
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import anyio
+import httpx
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from loguru import logger
+
+# Hop-by-hop and length headers are set again by each side of the proxy.
+SKIPPED_HEADERS = {"host", "content-length", "transfer-encoding", "connection"}
+
+
+def rendezvous_order(key: str, workers: int) -> List[int]:
+    """
+    Workers ordered by their highest-random-weight score for `key`.
+
+    The first worker owns the key. When it is down the key goes to the next
+    one, and no other key changes owner.
+    """
+    scores = [
+        hashlib.blake2b(f"{worker}:{key}".encode("utf-8"), digest_size=8).digest()
+        for worker in range(workers)
+    ]
+    return sorted(range(workers), key=scores.__getitem__, reverse=True)
+
+
+class Dispatcher:
+    """
+    Routes API requests to the worker processes of a `WorkerPool`.
+
+    Every turn of a conversation goes to the same worker, picked by rendezvous
+    hashing of the conversation ID. Follow-up questions then hit the rewrite,
+    embedding and answer caches of the process that answered the earlier turns.
+    Routing is only an optimization; summaries stay consistent through the
+    store whichever worker serves a turn. Requests outside a conversation go to
+    the worker with the fewest requests in flight. A worker that refuses
+    connections, e.g. while it is restarted, is skipped.
+
+    Args:
+        urls (List[str]): Base URLs of the workers.
+        timeout (float): Read timeout in seconds for worker responses.
+    """
+
+    def __init__(self, urls: List[str], timeout: float = 300.0):
+        self.clients = [
+            httpx.AsyncClient(base_url=url, timeout=httpx.Timeout(timeout, connect=5.0))
+            for url in urls
+        ]
+        self.in_flight = [0] * len(urls)
+
+    def order(self, conversation_id: Optional[str]) -> List[int]:
+        """The workers to try for a request, preferred first."""
+        if conversation_id:
+            return rendezvous_order(conversation_id, len(self.clients))
+        return sorted(range(len(self.clients)), key=self.in_flight.__getitem__)
+
+    async def forward(
+        self,
+        method: str,
+        path: str,
+        conversation_id: Optional[str] = None,
+        content: bytes = b"",
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Tuple[int, httpx.Response]:
+        """
+        Sends a request to the preferred live worker.
+
+        Returns:
+            Tuple[int, httpx.Response]: The worker and its streamed response,
+                to be passed to `done` once read.
+
+        Raises:
+            HTTPException: 503 if no worker accepts the connection.
+        """
+        for worker in self.order(conversation_id):
+            client = self.clients[worker]
+            request = client.build_request(
+                method, path, content=content, headers=headers
+            )
+            try:
+                response = await client.send(request, stream=True)
+            except httpx.ConnectError:
+                logger.warning(f"Worker {worker} is unreachable, trying the next one")
+                continue
+            self.in_flight[worker] += 1
+            return worker, response
+        raise HTTPException(503, detail="No worker is available")
+
+    async def relay(
+        self, worker: int, response: httpx.Response
+    ) -> AsyncIterator[bytes]:
+        """
+        The response body, after which the response is passed to `done`.
+
+        A client that disconnects mid-stream closes the iterator, which also
+        ends in `done`, so the upstream connection is released either way.
+        """
+        try:
+            async for chunk in response.aiter_raw():
+                yield chunk
+        finally:
+            await self.done(worker, response)
+
+    async def done(self, worker: int, response: httpx.Response) -> None:
+        self.in_flight[worker] -= 1
+        # Still closed when called from a request cancelled by a disconnect.
+        with anyio.CancelScope(shield=True):
+            await response.aclose()
+
+    async def close(self) -> None:
+        for client in self.clients:
+            await client.aclose()
+
+
+def create_dispatcher_app(dispatcher: Dispatcher) -> FastAPI:
+    """
+    Builds the app in front of the worker pool, with the same API as a worker.
+
+    Chat requests without a conversation ID get a new conversation first, so
+    even the first turn lands on the conversation's worker.
+    """
+    app = FastAPI(title="QA bot dispatcher")
+    app.state.dispatcher = dispatcher
+    app.router.add_event_handler("shutdown", dispatcher.close)
+
+    async def proxy(
+        request: Request,
+        path: str,
+        conversation_id: Optional[str] = None,
+        content: Optional[bytes] = None,
+    ) -> Response:
+        headers = {
+            name: value
+            for name, value in request.headers.items()
+            if name.lower() not in SKIPPED_HEADERS
+        }
+        if request.url.query:
+            path = f"{path}?{request.url.query}"
+        worker, response = await dispatcher.forward(
+            request.method,
+            path,
+            conversation_id,
+            await request.body() if content is None else content,
+            headers,
+        )
+        return StreamingResponse(
+            dispatcher.relay(worker, response),
+            status_code=response.status_code,
+            headers={
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() not in SKIPPED_HEADERS
+            },
+        )
+
+    @app.get("/health")
+    async def health() -> Dict[str, str]:
+        return {"status": "ok"}
+
+    @app.get("/ready")
+    async def ready() -> Dict[str, Any]:
+        workers = []
+        for client in dispatcher.clients:
+            try:
+                response = await client.get("/ready")
+                workers.append(response.json() if response.is_success else None)
+            except httpx.HTTPError:
+                workers.append(None)
+        if not any(workers):
+            raise HTTPException(503, detail="No worker is ready")
+        return {"status": "ready", "workers": workers}
+
+    @app.post("/v1/chat")
+    async def chat(request: Request) -> Response:
+        body = await request.body()
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = None
+        if not isinstance(payload, dict):
+            # Let a worker report the validation error.
+            return await proxy(request, "/v1/chat")
+
+        conversation_id = payload.get("conversation_id")
+        if not conversation_id and isinstance(payload.get("message"), str):
+            worker, created = await dispatcher.forward("POST", "/v1/conversations")
+            try:
+                await created.aread()
+                conversation_id = created.json()["conversation_id"]
+            finally:
+                await dispatcher.done(worker, created)
+            payload["conversation_id"] = conversation_id
+            body = json.dumps(payload).encode("utf-8")
+        return await proxy(request, "/v1/chat", conversation_id, body)
+
+    @app.api_route("/v1/conversations/{conversation_id}", methods=["GET", "DELETE"])
+    async def conversation(request: Request, conversation_id: str) -> Response:
+        return await proxy(request, request.url.path, conversation_id)
+
+    @app.api_route("/{path:path}", methods=["GET", "POST", "DELETE"])
+    async def other(request: Request, path: str) -> Response:
+        # Conversations, ingestion and reloads share state through the
+        # store, and /metrics aggregates every worker, so any worker will do.
+        return await proxy(request, request.url.path)
+
+    return app
@@ -0,0 +1,120 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+THREAD_VARIABLES = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+
+def worker_threads(workers: int, threads: Optional[int] = None) -> int:
+    """Math library threads per worker: `threads`, or the cores divided evenly."""
+    return threads or max(1, (os.cpu_count() or 1) // workers)
+
+
+def worker_env(threads: int) -> Dict[str, str]:
+    """
+    The environment of a worker process.
+
+    Math libraries default to one thread per core in every process, so N
+    workers would oversubscribe the cores N times over; each worker gets its
+    share instead. Explicitly set limits are kept.
+    """
+    env = dict(os.environ)
+    for name in THREAD_VARIABLES:
+        env.setdefault(name, str(threads))
+    env["TOKENIZERS_PARALLELISM"] = "false"
+    return env
+
+
+class WorkerPool:
+    """
+    Runs API worker processes, one per port on the loopback interface.
+
+    The workers are independent processes, so the guard models, BM25 scoring
+    and fusion run on separate cores instead of contending for one GIL. They
+    memory-map the same BM25 and vector index files, which the page cache holds
+    once, however many workers there are. A monitor thread restarts workers
+    that exit.
+
+    Args:
+        ports (List[int]): One port per worker.
+        threads (Optional[int]): Math library threads per worker; cores divided
+            by the number of workers by default.
+        app (str): The uvicorn app factory each worker serves.
+    """
+
+    def __init__(
+        self,
+        ports: List[int],
+        threads: Optional[int] = None,
+        app: str = "server.app:create_app",
+    ):
+        self.ports = ports
+        self.threads = worker_threads(len(ports), threads)
+        self.app = app
+        self.processes: List[Optional[subprocess.Popen]] = [None] * len(ports)
+        self._stopping = threading.Event()
+        self._monitor: Optional[threading.Thread] = None
+
+    @property
+    def urls(self) -> List[str]:
+        return [f"http://127.0.0.1:{port}" for port in self.ports]
+
+    def spawn(self, i: int) -> subprocess.Popen:
+        command = [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            self.app,
+            "--factory",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(self.ports[i]),
+        ]
+        process = subprocess.Popen(command, env=worker_env(self.threads))
+        logger.info(f"Started worker {i} (pid {process.pid}) on port {self.ports[i]}")
+        return process
+
+    def start(self) -> "WorkerPool":
+        for i in range(len(self.ports)):
+            self.processes[i] = self.spawn(i)
+        self._monitor = threading.Thread(
+            target=self._watch, name="worker-pool", daemon=True
+        )
+        self._monitor.start()
+        return self
+
+    def _watch(self, interval: float = 1.0) -> None:
+        while not self._stopping.wait(interval):
+            for i, process in enumerate(self.processes):
+                if process is not None and process.poll() is not None:
+                    logger.warning(
+                        f"Worker {i} exited with code {process.returncode}, "
+                        "restarting it"
+                    )
+                    self.processes[i] = self.spawn(i)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stops the workers, killing those that do not exit within `timeout`."""
+        self._stopping.set()
+        for process in self.processes:
+            if process is not None and process.poll() is None:
+                process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in self.processes:
+            if process is None:
+                continue
+            try:
+                process.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                process.kill()
@@ -0,0 +1,335 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Callable,
+    Counter,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from loguru import logger
+
+from guards import validate_input
+from rag import ModelConfig, OllamaRag, reload_pipeline
+from rag.bulk_ingest import BulkIngestor
+from rag.history import ConversationHistory
+from server.config import ServerConfig
+from server.store import ConversationStore
+
+
+class ConversationNotFound(KeyError):
+    pass
+
+
+class LoadedConversation(NamedTuple):
+    """A conversation's history as loaded for one turn."""
+
+    history: ConversationHistory
+    # Turns the new turn pushes out of the history window.
+    evicted: List[Dict[str, str]]
+    # Version of the stored turns the history was restored from.
+    version: int
+
+
+class QAService:
+    """
+    The QA pipeline behind the HTTP API, for one worker process.
+
+    Conversations live in the shared `ConversationStore`, so consecutive turns
+    may be served by different workers. Each turn restores the conversation's
+    history, answers with the pipeline and saves the new turn. Turns that leave
+    the history window are saved as pending and folded into the stored summary
+    in the background. When another worker ingested documents, the pipeline is
+    rebuilt before the next request, and the old one is closed once the requests
+    still using it are done.
+
+    Args:
+        config (ServerConfig): Where the vector store and the state live.
+        model (Optional[ModelConfig]): The chat backend.
+        pipeline_factory (Optional[Callable[[], OllamaRag]]): Builds a fresh
+            pipeline; by default a warmed `OllamaRag` for `config` and `model`.
+        validate (Optional[Callable[[str], Any]]): Input check that raises to
+            reject a message.
+    """
+
+    def __init__(
+        self,
+        config: ServerConfig,
+        model: Optional[ModelConfig] = None,
+        pipeline_factory: Optional[Callable[[], OllamaRag]] = None,
+        validate: Optional[Callable[[str], Any]] = validate_input,
+    ):
+        self.config = config
+        self.model = model or ModelConfig()
+        self.pipeline_factory = pipeline_factory or self.build_pipeline
+        self.validate = validate
+        self.store = ConversationStore(
+            config.state_path or os.path.join(config.db_path, "server_state.sqlite3")
+        )
+        self._pipeline: Optional[OllamaRag] = None
+        self._version = -1
+        self._lock = threading.Lock()
+        # Held while a new pipeline is built, outside `_lock`.
+        self._build_lock = threading.Lock()
+        # Requests using each pipeline, so a replaced one is closed when idle.
+        self._in_flight: Counter[OllamaRag] = Counter()
+        self.summaries = ThreadPoolExecutor(2, thread_name_prefix="summaries")
+
+    def build_pipeline(self) -> OllamaRag:
+        # The replaced pipeline is closed by `_release` once it is idle.
+        return reload_pipeline(
+            collection_name=self.config.collection,
+            db_path=self.config.db_path,
+            model_name=self.model.name,
+            backend_config=self.model,
+            speculative=self.config.speculative,
+            speculative_concurrency=self.config.concurrency,
+            vector_index=(
+                self.config.dispatch
+                if self.config.vector_index is None
+                else self.config.vector_index
+            ),
+        )
+
+    @contextmanager
+    def serving(self) -> Iterator[OllamaRag]:
+        """
+        The current pipeline, rebuilt if the knowledge base changed.
+
+        The pipeline is not closed while the block runs, even if a reload
+        replaces it meanwhile.
+        """
+        rag = self._acquire()
+        try:
+            yield rag
+        finally:
+            self._release(rag)
+
+    def _acquire(self) -> OllamaRag:
+        version = self.store.knowledge_version()
+        if version > self._version:
+            self._rebuild(version)
+        with self._lock:
+            rag = self._pipeline
+            if rag is None:
+                raise RuntimeError("The pipeline failed to load")
+            self._in_flight[rag] += 1
+        return rag
+
+    def _rebuild(self, version: int) -> None:
+        """
+        Builds and publishes the pipeline for knowledge version `version`.
+
+        The build runs outside `_lock`, so requests keep acquiring and releasing
+        the current pipeline meanwhile. Only the first request for a new version
+        builds; the others are served by the current pipeline unless there is
+        none yet, in which case they wait for the build.
+        """
+        if not self._build_lock.acquire(blocking=self._pipeline is None):
+            return
+        try:
+            if version <= self._version:
+                return
+            logger.info(f"Loading the pipeline for knowledge version {version}")
+            rag = self.pipeline_factory()
+            with self._lock:
+                previous, self._pipeline = self._pipeline, rag
+                self._version = version
+                if previous is not None:
+                    if self._in_flight[previous] > 0:
+                        # Closed by the last request that releases it.
+                        previous = None
+                    else:
+                        self._in_flight.pop(previous, None)
+        finally:
+            self._build_lock.release()
+        if previous is not None:
+            previous.close()
+
+    def _release(self, rag: OllamaRag) -> None:
+        with self._lock:
+            self._in_flight[rag] -= 1
+            if self._in_flight[rag] > 0 or rag is self._pipeline:
+                return
+            del self._in_flight[rag]
+        logger.info("Closing the replaced pipeline")
+        rag.close()
+
+    def history(self, rag: OllamaRag, conversation_id: str) -> LoadedConversation:
+        """The conversation's history, with the list its evicted turns go to."""
+        state = self.store.load(conversation_id)
+        if state is None:
+            raise ConversationNotFound(conversation_id)
+
+        summary, turns, version = state
+        evicted: List[Dict[str, str]] = []
+        history = rag.new_history(on_evict=evicted.extend)
+        history.restore(summary, turns)
+        return LoadedConversation(history, evicted, version)
+
+    def messages(self, conversation_id: str) -> Dict[str, Any]:
+        state = self.store.load(conversation_id)
+        if state is None:
+            raise ConversationNotFound(conversation_id)
+        summary, turns, _ = state
+        return {
+            "conversation_id": conversation_id,
+            "summary": summary,
+            "messages": turns,
+        }
+
+    def save_turn(
+        self,
+        rag: OllamaRag,
+        loaded: LoadedConversation,
+        conversation_id: str,
+        text: str,
+        answer: str,
+    ) -> None:
+        """
+        Adds a turn to the history and saves it.
+
+        If another turn of the conversation was saved since the history was
+        loaded, e.g. by another worker, the turn is added to the newer turns
+        and saved again instead of overwriting them.
+        """
+        while True:
+            loaded.history.add_turn(text, answer)
+            if self.store.save_turns(
+                conversation_id,
+                loaded.history.state()[1],
+                loaded.version,
+                loaded.evicted,
+            ):
+                break
+            try:
+                loaded = self.history(rag, conversation_id)
+            except ConversationNotFound:
+                # Deleted while the turn was answered.
+                return
+            logger.debug(f"Turns of {conversation_id} changed, saving again")
+        if loaded.evicted:
+            self.summaries.submit(self.fold_summary, conversation_id)
+
+    def fold_summary(self, conversation_id: str) -> None:
+        """
+        Folds the conversation's pending turns into its stored summary.
+
+        Another fold, on this or another worker, may save a summary while this
+        one runs. The save then fails the version check, and the turns still
+        pending are folded again into the newer summary, so no evicted turn is
+        lost whichever fold finishes last.
+        """
+        with self.serving() as rag:
+            self._fold_summary(rag, conversation_id)
+
+    def _fold_summary(self, rag: OllamaRag, conversation_id: str) -> None:
+        while True:
+            state = self.store.pending(conversation_id)
+            if state is None or not state[1]:
+                return
+            summary, pending, version = state
+            try:
+                summary = rag.summarize_history(summary, pending)
+            except Exception as e:
+                # The turns stay pending and are folded after the next eviction.
+                logger.warning(f"History summary failed: {e}")
+                return
+            if not self.store.save_summary(
+                conversation_id, summary.strip(), version, len(pending)
+            ):
+                logger.debug(f"Summary of {conversation_id} changed, folding again")
+
+    def chat(self, conversation_id: str, text: str) -> Tuple[str, List[str]]:
+        """
+        Answers a message in a conversation.
+
+        Raises:
+            ConversationNotFound: For an unknown conversation.
+            ValueError: If the guards reject the message.
+        """
+        with self.serving() as rag:
+            loaded = self.history(rag, conversation_id)
+            answer, chunks = rag.get_response(
+                text, loaded.history.messages(), validate=self.validate
+            )
+            self.save_turn(rag, loaded, conversation_id, text, answer)
+        return answer, chunks
+
+    def chat_stream(
+        self, conversation_id: str, text: str
+    ) -> Tuple[Iterator[str], List[str]]:
+        """
+        Streaming version of `chat`; validation and retrieval run before it returns.
+
+        The turn is saved once the returned iterator is exhausted.
+        """
+        rag = self._acquire()
+        try:
+            loaded = self.history(rag, conversation_id)
+            tokens, chunks = rag.get_response_stream(
+                text, loaded.history.messages(), validate=self.validate
+            )
+        except BaseException:
+            self._release(rag)
+            raise
+
+        def stream() -> Iterator[str]:
+            # Closing the stream, e.g. when the client disconnects, releases too.
+            try:
+                answer = []
+                for token in tokens:
+                    answer.append(token)
+                    yield token
+                self.save_turn(
+                    rag, loaded, conversation_id, text, "".join(answer).strip()
+                )
+            finally:
+                self._release(rag)
+
+        return stream(), chunks
+
+    def ingest(self, path: str, bulk: bool = False) -> int:
+        """
+        Ingests a file or directory on the server and reloads every worker.
+
+        Returns:
+            int: The new knowledge base version.
+        """
+        with self.serving() as rag:
+            if bulk:
+                BulkIngestor(rag).run(path)
+            else:
+                rag.ingest_docs(path, self.config.db_path)
+        return self.reload()
+
+    def reload(self) -> int:
+        """Makes every worker rebuild its pipeline before its next request."""
+        version = self.store.bump_knowledge_version()
+        logger.info(f"Knowledge base version is now {version}")
+        return version
+
+    def ready(self) -> Dict[str, Any]:
+        with self.serving() as rag:
+            return {
+                "status": "ready",
+                "collection": rag.collection_name,
+                "documents": rag.vector_store._collection.count(),
+                "knowledge_version": self._version,
+            }
+
+    def close(self) -> None:
+        """Waits for the background summaries and closes the pipeline."""
+        self.summaries.shutdown()
+        with self._lock:
+            rag, self._pipeline = self._pipeline, None
+        if rag is not None:
+            rag.close()
+        self.store.close()
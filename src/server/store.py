@@ -0,0 +1,204 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+Message = Dict[str, str]
+
+
+class ConversationStore:
+    """
+    Conversation state shared by the API worker processes.
+
+    Each conversation keeps the summary of its older turns and the recent turns
+    verbatim, in a SQLite database in WAL mode, so any worker can serve the next
+    turn. Turns that left the window but are not summarized yet are kept as
+    `pending` in the same row. They are saved together with the turns that
+    evicted them, so they are never in both lists or in neither.
+
+    Turns and summaries are versioned separately. `save_turns` is a
+    compare-and-set on the turns version, so of two turns of a conversation
+    answered at once, the one saved second is rejected and must be added to the
+    turns saved first. Summaries are written by background folds, possibly on
+    several workers at once, and `save_summary` is the same check on the
+    summary version, so a fold based on an outdated summary is rejected instead
+    of overwriting newer folded turns.
+
+    The store also holds the knowledge base version, bumped after ingestion so
+    every worker reloads its pipeline.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): The SQLite file; created if missing.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS conversations ("
+                "id TEXT PRIMARY KEY, summary TEXT NOT NULL, turns TEXT NOT NULL, "
+                "updated REAL NOT NULL, pending TEXT NOT NULL DEFAULT '[]', "
+                "summary_version INTEGER NOT NULL DEFAULT 0, "
+                "turns_version INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """A write transaction that locks the database for other processes too."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.rollback()
+                raise
+            self._db.commit()
+
+    def create(self) -> str:
+        """Starts an empty conversation and returns its ID."""
+        conversation_id = uuid.uuid4().hex
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO conversations (id, summary, turns, updated) "
+                "VALUES (?, '', '[]', ?)",
+                (conversation_id, time.time()),
+            )
+        return conversation_id
+
+    def load(self, conversation_id: str) -> Optional[Tuple[str, List[Message], int]]:
+        """
+        The summary, the recent turns and their version, or None for an unknown
+        conversation.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT summary, turns, turns_version FROM conversations "
+                "WHERE id = ?",
+                (conversation_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), row[2]
+
+    def save_turns(
+        self,
+        conversation_id: str,
+        turns: List[Message],
+        version: int,
+        evicted: Sequence[Message] = (),
+    ) -> bool:
+        """
+        Saves the recent turns, loaded at `version`, and queues the turns they
+        evicted for folding.
+
+        Returns:
+            bool: False, saving nothing, if the turns changed since `version` or
+                the conversation was deleted.
+        """
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT pending, turns_version FROM conversations WHERE id = ?",
+                (conversation_id,),
+            ).fetchone()
+            if row is None or row[1] != version:
+                return False
+            pending = json.loads(row[0]) + list(evicted)
+            db.execute(
+                "UPDATE conversations SET turns = ?, pending = ?, "
+                "turns_version = ?, updated = ? WHERE id = ?",
+                (
+                    json.dumps(turns),
+                    json.dumps(pending),
+                    version + 1,
+                    time.time(),
+                    conversation_id,
+                ),
+            )
+        return True
+
+    def pending(self, conversation_id: str) -> Optional[Tuple[str, List[Message], int]]:
+        """
+        The summary, the turns waiting to be folded into it and the summary
+        version, or None for an unknown conversation.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT summary, pending, summary_version FROM conversations "
+                "WHERE id = ?",
+                (conversation_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), row[2]
+
+    def save_summary(
+        self, conversation_id: str, summary: str, version: int, folded: int
+    ) -> bool:
+        """
+        Saves a summary that folds the first `folded` pending turns into the
+        summary of `version`.
+
+        Returns:
+            bool: False, saving nothing, if the summary changed since `version`.
+        """
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT pending, summary_version FROM conversations WHERE id = ?",
+                (conversation_id,),
+            ).fetchone()
+            if row is None or row[1] != version:
+                return False
+            db.execute(
+                "UPDATE conversations SET summary = ?, pending = ?, "
+                "summary_version = ?, updated = ? WHERE id = ?",
+                (
+                    summary,
+                    json.dumps(json.loads(row[0])[folded:]),
+                    version + 1,
+                    time.time(),
+                    conversation_id,
+                ),
+            )
+        return True
+
+    def delete(self, conversation_id: str) -> bool:
+        """Deletes a conversation; returns False if it did not exist."""
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "DELETE FROM conversations WHERE id = ?", (conversation_id,)
+            )
+        return cursor.rowcount > 0
+
+    def knowledge_version(self) -> int:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM meta WHERE key = 'knowledge_version'"
+            ).fetchone()
+        return int(row[0]) if row else 0
+
+    def bump_knowledge_version(self) -> int:
+        """Marks the knowledge base as changed; returns the new version."""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO meta VALUES ('knowledge_version', '1') "
+                "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+            )
+            row = self._db.execute(
+                "SELECT value FROM meta WHERE key = 'knowledge_version'"
+            ).fetchone()
+        return int(row[0])
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
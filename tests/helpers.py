@@ -0,0 +1,169 @@
+"""
+Offline stand-ins for the model server and the corpus, shared by the tests and
+the benchmarks: a deterministic hashing embedder, an in-process chat backend
+and synthetic corpora built from `data/products`.
+"""
+
+import hashlib
+import re
+import shutil
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag.backends import ChatBackend
+from rag.ingest import split_chunks
+
+PRODUCTS_DIR = Path(__file__).resolve().parent.parent / "data" / "products"
+CHUNKS_PER_FILE = 1000
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embeddings: hashed word and word-pair counts,
+    L2-normalized. Texts sharing words get similar vectors, which is enough to
+    exercise vector search without an embedding model.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        words = WORD_PATTERN.findall(text.lower())
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dim] += 1.0 if value >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class MockBackend(ChatBackend):
+    """
+    In-process chat backend with a fixed generation time.
+
+    Rewrite prompts are answered with the ambiguous input itself, so retrieval
+    still sees a question; everything else gets a fixed answer.
+    """
+
+    def __init__(self, generation_ms: float = 0.0, answer: str = "Mock answer."):
+        super().__init__("http://mock.invalid")
+        self.generation_ms = generation_ms
+        self.answer = answer
+
+    def _reply(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        time.sleep(self.generation_ms / 1e3)
+        prompt = messages[-1]["content"] if messages else ""
+        content = self.answer
+        match = re.search(r"Ambiguous user input: (.*)", prompt)
+        if match:
+            content = match.group(1)
+        words = sum(len(m["content"].split()) for m in messages)
+        return {
+            "model": "mock",
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": words,
+            "eval_count": len(content.split()),
+        }
+
+    def chat(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        return self._reply(messages)
+
+    def stream(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        yield self._reply(messages)
+
+    async def achat(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        return self._reply(messages)
+
+    async def astream(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        options: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        yield self._reply(messages)
+
+
+def product_chunks() -> List[Tuple[str, List[str]]]:
+    """The product name (from "What is X?") and the chunks of each product file."""
+    products = []
+    for path in sorted(PRODUCTS_DIR.glob("*.txt")):
+        chunks = split_chunks(path.read_text(encoding="utf-8"))
+        match = re.match(r"What is (.+?)\?", chunks[0])
+        products.append((match.group(1) if match else path.stem, chunks))
+    return products
+
+
+def variant_chunk(chunk: str, name: str, copy: int) -> str:
+    """
+    A chunk about copy `copy` of a product. Questions that do not name the
+    product ("Who is it for?") get it appended, since they repeat across files.
+    """
+    variant = f"{name} {copy}" if copy else name
+    question, _, answer = chunk.partition("\n")
+    if name in question:
+        question = question.replace(name, variant)
+    else:
+        question = f"{question.rstrip('?')} ({variant})?"
+    return f"{question}\n{answer.replace(name, variant)}"
+
+
+def write_corpus(directory: Path, size: int) -> List[str]:
+    """
+    Writes `size` chunks as .txt files; returns the chunk questions.
+
+    The product files are repeated as numbered variants ("EchoPod Mini 17"),
+    so every chunk is unique and the vocabulary grows with the corpus.
+    """
+    shutil.rmtree(directory, ignore_errors=True)
+    directory.mkdir(parents=True)
+    products = product_chunks()
+    questions: List[str] = []
+    written = 0
+    copy = 0
+    while written < size:
+        for name, chunks in products:
+            batch = [variant_chunk(chunk, name, copy) for chunk in chunks]
+            batch = batch[: size - written]
+            if not batch:
+                break
+            part = copy * len(chunks) // CHUNKS_PER_FILE
+            path = directory / f"{name.lower().replace(' ', '_')}_{part:05d}.txt"
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n---\n".join(batch) + "\n---\n")
+            questions.extend(chunk.split("\n", 1)[0] for chunk in batch)
+            written += len(batch)
+        copy += 1
+    return questions
@@ -0,0 +1,192 @@
+"""
+Stand-in LLM server for benchmarks and tests.
+
+Serves Ollama's `/api/chat` and the OpenAI-compatible `/v1/chat/completions`
+(as vLLM and the llama.cpp server do), streaming and not, with a fixed time to
+first token and a fixed delay per generated token. Reported token counts are
+exact: prompts count one token per word and the answer is `--tokens` tokens.
+
+    python tests/mock_llm_server.py --port 11435 --ttft 0.05 --token-delay 0.01
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "MockLLMServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path == "/api/chat":
+            self.ollama_chat(request)
+        elif self.path == "/v1/chat/completions":
+            self.openai_chat(request)
+        else:
+            self.send_error(404)
+
+    def generate(self, request: Dict[str, Any]) -> Iterator[str]:
+        """Yields the answer tokens at the configured pace."""
+        options = request.get("options") or {}
+        limit = options.get("num_predict") or request.get("max_tokens")
+        tokens = min(self.server.tokens, limit or self.server.tokens)
+        time.sleep(self.server.ttft)
+        for i in range(tokens):
+            if i:
+                time.sleep(self.server.token_delay)
+            yield f"token{i} "
+
+    def prompt_tokens(self, request: Dict[str, Any]) -> int:
+        messages: List[Dict[str, str]] = request.get("messages") or []
+        return sum(len(message.get("content", "").split()) for message in messages)
+
+    def send_json(self, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def start_chunked(self, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def send_chunk(self, data: str) -> None:
+        encoded = data.encode("utf-8")
+        self.wfile.write(f"{len(encoded):x}\r\n".encode() + encoded + b"\r\n")
+        self.wfile.flush()
+
+    def end_chunked(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def ollama_chat(self, request: Dict[str, Any]) -> None:
+        start = time.perf_counter()
+        prompt_tokens = self.prompt_tokens(request)
+
+        def final(content: str, count: int) -> Dict[str, Any]:
+            return {
+                "model": request.get("model"),
+                "message": {"role": "assistant", "content": content},
+                "done": True,
+                "done_reason": "stop",
+                "prompt_eval_count": prompt_tokens,
+                "eval_count": count,
+                "total_duration": int((time.perf_counter() - start) * 1e9),
+            }
+
+        if not request.get("stream", True):
+            tokens = list(self.generate(request))
+            self.send_json(final("".join(tokens), len(tokens)))
+            return
+
+        self.start_chunked("application/x-ndjson")
+        count = 0
+        for token in self.generate(request):
+            count += 1
+            frame = {"message": {"role": "assistant", "content": token}, "done": False}
+            self.send_chunk(json.dumps(frame) + "\n")
+        self.send_chunk(json.dumps(final("", count)) + "\n")
+        self.end_chunked()
+
+    def openai_chat(self, request: Dict[str, Any]) -> None:
+        prompt_tokens = self.prompt_tokens(request)
+
+        def usage(count: int) -> Dict[str, int]:
+            return {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": count,
+                "total_tokens": prompt_tokens + count,
+            }
+
+        if not request.get("stream"):
+            tokens = list(self.generate(request))
+            message = {"role": "assistant", "content": "".join(tokens)}
+            self.send_json(
+                {
+                    "model": request.get("model"),
+                    "choices": [{"message": message, "finish_reason": "stop"}],
+                    "usage": usage(len(tokens)),
+                }
+            )
+            return
+
+        self.start_chunked("text/event-stream")
+        count = 0
+        for token in self.generate(request):
+            count += 1
+            chunk = {"choices": [{"delta": {"content": token}, "finish_reason": None}]}
+            self.send_chunk(f"data: {json.dumps(chunk)}\n\n")
+        chunk = {"choices": [{"delta": {}, "finish_reason": "stop"}]}
+        self.send_chunk(f"data: {json.dumps(chunk)}\n\n")
+        if (request.get("stream_options") or {}).get("include_usage"):
+            chunk = {"choices": [], "usage": usage(count)}
+            self.send_chunk(f"data: {json.dumps(chunk)}\n\n")
+        self.send_chunk("data: [DONE]\n\n")
+        self.end_chunked()
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        ttft: float = 0.05,
+        token_delay: float = 0.01,
+        tokens: int = 32,
+    ):
+        super().__init__(address, MockLLMHandler)
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.tokens = tokens
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def serve(
+    host: str = "127.0.0.1", port: int = 0, **kwargs: Any
+) -> Tuple[MockLLMServer, threading.Thread]:
+    """Starts a server on a background thread; port 0 picks a free port."""
+    server = MockLLMServer((host, port), **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, thread
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--ttft", type=float, default=0.05)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--tokens", type=int, default=32)
+    parsed = parser.parse_args(args)
+
+    server = MockLLMServer(
+        (parsed.host, parsed.port),
+        ttft=parsed.ttft,
+        token_delay=parsed.token_delay,
+        tokens=parsed.tokens,
+    )
+    print(f"Serving a mock LLM at {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
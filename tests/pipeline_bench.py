@@ -0,0 +1,287 @@
+"""
+Offline end-to-end benchmark of the RAG pipeline with a per-stage breakdown.
+
+Runs the real `OllamaRag` (Chroma, BM25, fusion, context packing, prompt
+assembly) on synthetic corpora built from `data/products`, with a deterministic
+hashing embedder and an in-process chat backend, so it needs no GPU, model
+server or network. For each corpus size it ingests the corpus with
+`BulkIngestor`, answers `--queries` questions through `get_response` and prints
+count, mean, p50 and p99 per stage plus memory and disk usage.
+
+    python tests/pipeline_bench.py --sizes 1000,10000,100000 --queries 200 \\
+        --output pipeline.json
+
+Stages: answer_cache, rewrite, collection_check, embed_query, vector_search,
+bm25, fusion, prompt and generation (the mock backend's `--generation-ms`), plus
+validation with `--validate`, which runs the input guards and needs their models.
+`--processes N` then replays the queries across N worker processes that open the
+same DB and memory-map its indexes, and reports their aggregate throughput and
+proportional memory (PSS), which counts shared index pages once.
+`--speculative` overlaps validation, retrieval and the rewrite (see
+`rag.speculative`); the per-stage times then add up to more than the total.
+The embedder is not a semantic model; compare runs with each other, not with
+production retrieval quality.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from loguru import logger
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from helpers import HashingEmbeddings, MockBackend, write_corpus  # noqa: E402
+
+from observability import StageTimer  # noqa: E402
+from rag.bulk_ingest import BulkIngestor  # noqa: E402
+from rag.ollama_rag import OllamaRag  # noqa: E402
+
+
+def pss_mb() -> float:
+    """Proportional set size in MB: pages shared with other processes are split."""
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def memory_mb() -> Dict[str, float]:
+    """Current and peak resident memory of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    if sys.platform == "darwin":
+        peak /= 1024
+    current = peak
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        pass
+    return {"rss_mb": current, "peak_rss_mb": peak}
+
+
+def disk_mb(path: Path) -> float:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) / 2**20
+
+
+def make_queries(questions: List[str], count: int, seed: int) -> List[str]:
+    """Corpus questions plus a few follow-ups that go through the rewriter."""
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(questions), size=count, replace=len(questions) < count)
+    queries = [questions[i] for i in picks]
+    for i in range(4, count, 5):
+        queries[i] = "And what about its warranty?"
+    return queries
+
+
+def open_pipeline(args: argparse.Namespace, db_path: Path) -> OllamaRag:
+    return OllamaRag(
+        db_path=str(db_path),
+        embeddings=HashingEmbeddings(args.dim),
+        backend=MockBackend(args.generation_ms),
+        embedding_cache_size=0,
+        answer_cache_size=args.answer_cache_size,
+        score_threshold=0.0,
+        vector_index=args.vector_index,
+        speculative=args.speculative,
+    )
+
+
+def serve_queries(
+    args: argparse.Namespace, db_path: Path, queries: List[str]
+) -> Dict[str, float]:
+    """Answers `queries` in a worker process; returns its timings and memory."""
+    logger.remove()
+    rag = open_pipeline(args, db_path)
+    history: List[Dict[str, str]] = [{"role": "system", "content": "system"}]
+    start = time.time()
+    for question in queries:
+        answer, _ = rag.get_response(question, history)
+        history = history[:1] + [
+            {"role": "user", "content": question},
+            {"role": "assistant", "content": answer},
+        ]
+    end = time.time()
+    return {"start": start, "end": end, "pss_mb": pss_mb(), **memory_mb()}
+
+
+def run_processes(
+    args: argparse.Namespace, db_path: Path, queries: List[str]
+) -> Dict[str, Any]:
+    """
+    Replays `queries` split across `args.processes` worker processes.
+
+    Throughput is measured from the first worker starting its queries to the
+    last one finishing, so pipeline loading is not counted.
+    """
+    shares = [queries[i :: args.processes] for i in range(args.processes)]
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(args.processes) as pool:
+        workers = pool.starmap(
+            serve_queries, [(args, db_path, share) for share in shares]
+        )
+    seconds = max(w["end"] for w in workers) - min(w["start"] for w in workers)
+    return {
+        "processes": args.processes,
+        "queries_per_sec": len(queries) / seconds if seconds else 0.0,
+        "rss_mb": [w["rss_mb"] for w in workers],
+        "pss_mb": [w["pss_mb"] for w in workers],
+    }
+
+
+def run_size(args: argparse.Namespace, size: int, workdir: Path) -> Dict[str, Any]:
+    corpus = workdir / f"corpus-{size}"
+    db_path = workdir / f"db-{size}"
+    questions = write_corpus(corpus, size)
+
+    rag = open_pipeline(args, db_path)
+    before = memory_mb()
+    start = time.perf_counter()
+    stats = BulkIngestor(rag, batch_size=256).run(str(corpus))
+    ingest_seconds = time.perf_counter() - start
+    after_ingest = memory_mb()
+
+    validate = None
+    if args.validate:
+        from guards import validate_input
+
+        validate = validate_input
+
+    history: List[Dict[str, str]] = [{"role": "system", "content": "system"}]
+    queries = make_queries(questions, args.queries, args.seed)
+    latencies = []
+    with StageTimer() as timer:
+        for question in queries:
+            start = time.perf_counter()
+            answer, _ = rag.get_response(question, history, validate=validate)
+            latencies.append(time.perf_counter() - start)
+            history = history[:1] + [
+                {"role": "user", "content": question},
+                {"role": "assistant", "content": answer},
+            ]
+
+    stages = timer.summary()
+    total = np.asarray(latencies) * 1e3
+    stages["total"] = {
+        "count": len(latencies),
+        "total_ms": float(total.sum()),
+        "mean_ms": float(total.mean()),
+        "p50_ms": float(np.percentile(total, 50)),
+        "p99_ms": float(np.percentile(total, 99)),
+    }
+    result = {
+        "size": size,
+        "chunks": stats.chunks,
+        "ingest_seconds": ingest_seconds,
+        "ingest_chunks_per_sec": stats.chunks / ingest_seconds if ingest_seconds else 0,
+        "queries_per_sec": len(latencies) / float(np.sum(latencies)),
+        "stages": stages,
+        "memory": {
+            "before_ingest": before,
+            "after_ingest": after_ingest,
+            "after_queries": memory_mb(),
+            "db_disk_mb": disk_mb(db_path),
+        },
+    }
+    if rag.ann_index is not None:
+        result["memory"]["vector_index"] = rag.ann_index.memory_usage()
+    if args.processes > 1:
+        result["parallel"] = run_processes(args, db_path, queries)
+    return result
+
+
+def print_result(result: Dict[str, Any]) -> None:
+    memory = result["memory"]
+    print(
+        f"\n{result['size']} chunks: ingested in {result['ingest_seconds']:.1f}s "
+        f"({result['ingest_chunks_per_sec']:.0f} chunks/s), "
+        f"RSS {memory['after_queries']['rss_mb']:.0f} MB "
+        f"(peak {memory['after_queries']['peak_rss_mb']:.0f} MB), "
+        f"DB {memory['db_disk_mb']:.1f} MB on disk"
+    )
+    print(f"  {'stage':<18}{'count':>7}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, values in result["stages"].items():
+        print(
+            f"  {name:<18}{values['count']:>7}{values['mean_ms']:>10.2f}"
+            f"{values['p50_ms']:>10.2f}{values['p99_ms']:>10.2f}"
+        )
+    print(f"  1 process: {result['queries_per_sec']:.0f} queries/s")
+    if "parallel" in result:
+        parallel = result["parallel"]
+        print(
+            f"  {parallel['processes']} processes: "
+            f"{parallel['queries_per_sec']:.0f} queries/s, "
+            f"RSS {max(parallel['rss_mb']):.0f} MB and "
+            f"PSS {max(parallel['pss_mb']):.0f} MB per process"
+        )
+
+
+def main(args: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n")[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=[1000, 10000],
+        help="Corpus sizes in chunks.",
+    )
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--generation-ms", type=float, default=0.0)
+    parser.add_argument("--answer-cache-size", type=int, default=0)
+    parser.add_argument("--vector-index", action="store_true")
+    parser.add_argument("--validate", action="store_true")
+    parser.add_argument(
+        "--speculative",
+        action="store_true",
+        help="Overlap validation, retrieval and the rewrite.",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Also replay the queries across this many worker processes.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Kept after the run if given.")
+    parser.add_argument("--output", help="Write the results as JSON.")
+    parsed = parser.parse_args(args)
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    workdir = Path(parsed.workdir or tempfile.mkdtemp(prefix="pipeline-bench-"))
+    results = []
+    try:
+        for size in parsed.sizes:
+            result = run_size(parsed, size, workdir)
+            print_result(result)
+            results.append(result)
+    finally:
+        if not parsed.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if parsed.output:
+        with open(parsed.output, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(parsed), "results": results}, f, indent=2)
+        print(f"\nResults written to {parsed.output}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
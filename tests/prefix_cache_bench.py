@@ -0,0 +1,105 @@
+"""
+Prompt prefix reuse per turn for the "inline" and "prefix_cache" prompt layouts.
+
+Runs the same scripted conversation through OllamaRag with each layout and
+prints, per turn, the tokens Ollama evaluated (`prompt_eval_count`), the time it
+took (`prompt_eval_duration`) and the estimated share of the prompt that was
+served from the KV cache, i.e. 1 - evaluated / estimated prompt tokens.
+
+    python tests/prefix_cache_bench.py --db-path /tmp/ch_db --model llama3.2:3b
+
+Needs a running Ollama server and an ingested collection. Set `--sessions 2` to
+also see reuse across conversations that share the system prompt. Any other
+request to the same model in between, e.g. a history summary, may take over the
+cached slot unless OLLAMA_NUM_PARALLEL is above 1.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rag.history import MESSAGE_OVERHEAD_TOKENS  # noqa: E402
+from rag.ollama_rag import OllamaRag  # noqa: E402
+
+# Self-contained questions, so no rewrite request runs between the turns.
+QUESTIONS = [
+    "Please describe the FantasticCharge Pro charger",
+    "What is the price of the FantasticCharge Pro charger?",
+    "Which charging ports does the FantasticCharge Pro offer?",
+    "Does the FantasticCharge Pro need an internet connection?",
+    "What is the warranty period of the FantasticCharge Pro?",
+    "Is the FantasticCharge Pro charger waterproof?",
+    "Which colors does the FantasticCharge Pro come in?",
+    "How fast does the FantasticCharge Pro charge a phone?",
+]
+
+
+def prompt_tokens(rag: OllamaRag, msgs: List[Dict[str, str]]) -> int:
+    counter = rag.context_packer.counter
+    return sum(counter.count(msg["content"]) + MESSAGE_OVERHEAD_TOKENS for msg in msgs)
+
+
+def run(rag: OllamaRag, questions: List[str], sessions: int) -> List[float]:
+    print(f"\nLayout: {rag.prompt_layout}, num_ctx: {rag.num_ctx}")
+    print(
+        f"{'session':>7} {'turn':>4} {'prompt':>7} {'evaluated':>9} "
+        f"{'eval ms':>8} {'reuse':>6}"
+    )
+    reuse: List[float] = []
+    for session in range(sessions):
+        history = rag.new_history()
+        for turn, question in enumerate(questions):
+            msgs, _ = rag.build_conversation(question, history.messages())
+            response = rag.ollama_llm_call(msgs)
+            history.add_turn(question, response["message"]["content"])
+            history.wait(timeout=30)
+
+            estimated = prompt_tokens(rag, msgs)
+            evaluated = response.get("prompt_eval_count") or 0
+            duration = (response.get("prompt_eval_duration") or 0) / 1e6
+            reuse.append(max(0.0, 1 - evaluated / max(estimated, 1)))
+            print(
+                f"{session:>7} {turn:>4} {estimated:>7} {evaluated:>9} "
+                f"{duration:>8.1f} {reuse[-1]:>6.0%}"
+            )
+    return reuse
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--db-path", default="/tmp/ch_db")
+    parser.add_argument("--collection", default="qas")
+    parser.add_argument("--model", default="llama3:8b-instruct-q4_0")
+    parser.add_argument("--num-predict", type=int, default=128)
+    parser.add_argument("--history-tokens", type=int, default=512)
+    parser.add_argument("--sessions", type=int, default=1)
+    parser.add_argument("--turns", type=int, default=len(QUESTIONS))
+    parsed = parser.parse_args(args)
+
+    summary = {}
+    for layout in ("inline", "prefix_cache"):
+        rag = OllamaRag(
+            collection_name=parsed.collection,
+            db_path=parsed.db_path,
+            model_name=parsed.model,
+            num_predict=parsed.num_predict,
+            history_tokens=parsed.history_tokens,
+            answer_cache_size=0,
+            prompt_layout=layout,
+        )
+        summary[layout] = run(rag, QUESTIONS[: parsed.turns], parsed.sessions)
+
+    print()
+    for layout, reuse in summary.items():
+        # The first turn of the first session is always cold.
+        warm = reuse[1:] or reuse
+        mean = statistics.mean(warm)
+        print(f"{layout:<12} mean reuse after the first turn: {mean:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+LLM serving benchmark for Ollama, the llama.cpp server and OpenAI-compatible
+servers such as vLLM.
+
+Every request is streamed, so besides the end-to-end latency it measures the
+time to first token (TTFT), the inter-token latency (ITL, the gap between
+streamed frames) and the time per output token after the first (TPOT). Token
+counts are the ones the server reports. Load is generated in two ways:
+
+- closed loop: `--concurrency 1,4,8` keeps that many requests in flight, and
+- open loop: `--rate 0.5,1,2` sends requests at Poisson arrivals of that many
+  requests per second, whether or not earlier ones have finished.
+
+Each level reports p50/p95/p99 and throughput, and `--output` writes everything
+as JSON; `--compare` prints the change against an earlier JSON file.
+
+    python tests/serving_bench.py --api ollama --model llama3.2:3b --concurrency 1,4
+    python tests/serving_bench.py --api openai --url http://localhost:8000 \\
+        --model /model --rate 1,2,4 --output vllm.json --compare previous.json
+
+`tests/mock_llm_server.py` is a stand-in server for trying it without a GPU.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rag.backends import ChatBackend, create_backend  # noqa: E402
+from rag.config import ModelConfig  # noqa: E402
+
+DEFAULT_URLS = {
+    "ollama": "http://localhost:11434",
+    "llamacpp": "http://localhost:8080",
+    "openai": "http://localhost:8000",
+}
+
+PROMPT = """Explain the concept of vector embeddings in natural language processing.
+Use simple language and provide a real-world example."""
+
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass
+class RequestResult:
+    """Timings in seconds from when the request was sent."""
+
+    ok: bool = False
+    error: Optional[str] = None
+    latency: float = 0.0
+    ttft: Optional[float] = None
+    itl: List[float] = field(default_factory=list)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    output: str = ""
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """Mean and percentiles in milliseconds; None without samples."""
+    if not values:
+        return {"mean": None, **{f"p{p}": None for p in PERCENTILES}}
+    array = np.asarray(values) * 1e3
+    summary = {"mean": float(array.mean())}
+    for p in PERCENTILES:
+        summary[f"p{p}"] = float(np.percentile(array, p))
+    return summary
+
+
+async def send(
+    backend: ChatBackend,
+    model: str,
+    messages: List[Dict[str, str]],
+    options: Dict[str, Any],
+) -> RequestResult:
+    result = RequestResult()
+    start = time.perf_counter()
+    previous = start
+    pieces = []
+    try:
+        async for frame in backend.astream(model, messages, options=options):
+            now = time.perf_counter()
+            content = frame.get("message", {}).get("content", "")
+            if content:
+                if result.ttft is None:
+                    result.ttft = now - start
+                else:
+                    result.itl.append(now - previous)
+                previous = now
+                pieces.append(content)
+            if frame.get("done"):
+                result.prompt_tokens = frame.get("prompt_eval_count") or 0
+                result.completion_tokens = frame.get("eval_count") or 0
+        result.ok = True
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.latency = time.perf_counter() - start
+    result.output = "".join(pieces)
+    return result
+
+
+async def closed_loop(
+    backend: ChatBackend, args: argparse.Namespace, concurrency: int
+) -> List[RequestResult]:
+    """Keeps `concurrency` requests in flight until `args.requests` were sent."""
+    results: List[RequestResult] = []
+    remaining = iter(range(args.requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            results.append(await send(backend, args.model, args.messages, args.options))
+
+    async with asyncio.TaskGroup() as group:
+        for _ in range(concurrency):
+            group.create_task(worker())
+    return results
+
+
+async def open_loop(
+    backend: ChatBackend, args: argparse.Namespace, rate: float
+) -> List[RequestResult]:
+    """Sends `args.requests` requests at Poisson arrivals of `rate` per second."""
+    rng = np.random.default_rng(args.seed)
+    arrivals = np.cumsum(rng.exponential(1.0 / rate, args.requests))
+    start = time.perf_counter()
+    tasks = []
+    async with asyncio.TaskGroup() as group:
+        for arrival in arrivals:
+            await asyncio.sleep(max(0.0, start + arrival - time.perf_counter()))
+            request = send(backend, args.model, args.messages, args.options)
+            tasks.append(group.create_task(request))
+    return [task.result() for task in tasks]
+
+
+def summarize(
+    mode: str, level: float, results: List[RequestResult], duration: float
+) -> Dict[str, Any]:
+    ok = [r for r in results if r.ok]
+    completion_tokens = sum(r.completion_tokens for r in ok)
+    tpot = [
+        (r.latency - r.ttft) / (r.completion_tokens - 1)
+        for r in ok
+        if r.ttft is not None and r.completion_tokens > 1
+    ]
+    errors = [r.error for r in results if not r.ok]
+    return {
+        "mode": mode,
+        "level": level,
+        "requests": len(results),
+        "errors": len(errors),
+        "duration_s": duration,
+        "request_throughput": len(ok) / duration if duration else 0.0,
+        "output_tokens_per_s": completion_tokens / duration if duration else 0.0,
+        "prompt_tokens": sum(r.prompt_tokens for r in ok),
+        "completion_tokens": completion_tokens,
+        "distinct_outputs": len({r.output for r in ok}),
+        "ttft_ms": percentiles([r.ttft for r in ok if r.ttft is not None]),
+        "itl_ms": percentiles([gap for r in ok for gap in r.itl]),
+        "tpot_ms": percentiles(tpot),
+        "latency_ms": percentiles([r.latency for r in ok]),
+        "error_samples": errors[:5],
+    }
+
+
+def print_summary(summary: Dict[str, Any]) -> None:
+    unit = "in flight" if summary["mode"] == "concurrency" else "req/s"
+    print(
+        f"\n{summary['mode']} {summary['level']:g} {unit}: "
+        f"{summary['requests'] - summary['errors']}/{summary['requests']} ok in "
+        f"{summary['duration_s']:.2f}s, {summary['request_throughput']:.2f} req/s, "
+        f"{summary['output_tokens_per_s']:.1f} output tokens/s, "
+        f"{summary['distinct_outputs']} distinct outputs"
+    )
+    stats = ("mean", "p50", "p95", "p99")
+    print(f"  {'ms':<8}" + "".join(f"{name:>10}" for name in stats))
+    for metric in ("ttft_ms", "itl_ms", "tpot_ms", "latency_ms"):
+        values = summary[metric]
+        cells = "".join(
+            f"{values[name]:>10.1f}" if values[name] is not None else f"{'-':>10}"
+            for name in stats
+        )
+        print(f"  {metric[:-3]:<8}{cells}")
+    for error in summary["error_samples"]:
+        print(f"  error: {error}")
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Prints the relative change of the main metrics per matching level."""
+    previous = {(run["mode"], run["level"]): run for run in baseline["runs"]}
+    print("\nChange against the baseline (negative latency is better):")
+    for run in report["runs"]:
+        old = previous.get((run["mode"], run["level"]))
+        if old is None:
+            continue
+        changes = []
+        for metric, stat in (
+            ("ttft_ms", "p50"),
+            ("ttft_ms", "p99"),
+            ("latency_ms", "p50"),
+            ("latency_ms", "p99"),
+        ):
+            new_value, old_value = run[metric][stat], old[metric][stat]
+            if new_value is not None and old_value:
+                changes.append(f"{metric[:-3]} {stat} {new_value / old_value - 1:+.1%}")
+        if old["output_tokens_per_s"]:
+            ratio = run["output_tokens_per_s"] / old["output_tokens_per_s"] - 1
+            changes.append(f"tokens/s {ratio:+.1%}")
+        print(f"  {run['mode']} {run['level']:g}: " + ", ".join(changes))
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    config = ModelConfig(
+        name=args.model,
+        backend="ollama" if args.api == "ollama" else "openai",
+        base_url=args.url or DEFAULT_URLS[args.api],
+        api_key=args.api_key,
+        timeout=args.timeout,
+        max_connections=args.max_connections,
+    )
+    backend = create_backend(config, keep_alive=-1)
+    report: Dict[str, Any] = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "target": {
+            "api": args.api,
+            "url": config.base_url,
+            "model": args.model,
+            "max_tokens": args.max_tokens,
+            "prompt": args.prompt,
+        },
+        "runs": [],
+    }
+    try:
+        for _ in range(args.warmup):
+            await send(backend, args.model, args.messages, args.options)
+
+        levels = [("concurrency", float(c)) for c in args.concurrency] + [
+            ("rate", rate) for rate in args.rate
+        ]
+        for mode, level in levels:
+            start = time.perf_counter()
+            if mode == "concurrency":
+                results = await closed_loop(backend, args, int(level))
+            else:
+                results = await open_loop(backend, args, level)
+            summary = summarize(mode, level, results, time.perf_counter() - start)
+            report["runs"].append(summary)
+            print_summary(summary)
+    finally:
+        await backend.aclose()
+        backend.close()
+    return report
+
+
+def parse_list(value: str) -> List[float]:
+    return [float(item) for item in value.split(",") if item.strip()]
+
+
+def main(args: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n")[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--api", choices=sorted(DEFAULT_URLS), default="ollama")
+    parser.add_argument("--url", help="Server URL; the usual local port by default.")
+    parser.add_argument("--api-key")
+    parser.add_argument("--model", default="llama3:8b-instruct-q4_0")
+    parser.add_argument("--prompt", default=PROMPT)
+    parser.add_argument("--prompt-file")
+    parser.add_argument("--max-tokens", type=int, default=128)
+    parser.add_argument("--temperature", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--requests", type=int, default=20, help="Requests per level.")
+    parser.add_argument("--concurrency", type=parse_list, default=[])
+    parser.add_argument("--rate", type=parse_list, default=[])
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=256,
+        help="Client connection limit; keep it above the load so it does not throttle.",
+    )
+    parser.add_argument("--output", help="Write the results as JSON.")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against.")
+    parsed = parser.parse_args(args)
+
+    if parsed.prompt_file:
+        with open(parsed.prompt_file, encoding="utf-8") as f:
+            parsed.prompt = f.read()
+    if not parsed.concurrency and not parsed.rate:
+        parsed.concurrency = [1.0]
+    parsed.messages = [{"role": "user", "content": parsed.prompt}]
+    parsed.options = {
+        "temperature": parsed.temperature,
+        "seed": parsed.seed,
+        "num_predict": parsed.max_tokens,
+    }
+
+    report = asyncio.run(run(parsed))
+
+    if parsed.output:
+        with open(parsed.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {parsed.output}")
+    if parsed.compare:
+        with open(parsed.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+from unittest import mock
+
+from rag.answer_cache import SemanticAnswerCache
+
+
+def test_hit_above_threshold_only():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store([1.0, 0.0], "q", "answer", ["chunk"], version=0)
+
+    assert cache.lookup([0.99, 0.05], version=0) == ("answer", ["chunk"])
+    assert cache.lookup([0.5, 0.5], version=0) is None
+
+
+def test_collection_change_and_ttl_invalidate():
+    cache = SemanticAnswerCache(threshold=0.9, ttl=10)
+    cache.store([1.0, 0.0], "q", "answer", [], version=0)
+    assert cache.lookup([1.0, 0.0], version=1) is None
+    assert len(cache) == 0
+
+    with mock.patch("rag.answer_cache.time.monotonic", return_value=100.0):
+        cache.store([1.0, 0.0], "q", "answer", [], version=1)
+    with mock.patch("rag.answer_cache.time.monotonic", return_value=111.0):
+        assert cache.lookup([1.0, 0.0], version=1) is None
+
+
+def test_evicts_least_recently_used():
+    cache = SemanticAnswerCache(threshold=0.9, max_entries=2)
+    cache.store([1.0, 0.0, 0.0], "a", "A", [], version=0)
+    cache.store([0.0, 1.0, 0.0], "b", "B", [], version=0)
+    cache.lookup([1.0, 0.0, 0.0], version=0)
+    cache.store([0.0, 0.0, 1.0], "c", "C", [], version=0)
+
+    assert cache.lookup([1.0, 0.0, 0.0], version=0) == ("A", [])
+    assert cache.lookup([0.0, 1.0, 0.0], version=0) is None
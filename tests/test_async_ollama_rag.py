@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+from helpers import HashingEmbeddings, MockBackend, write_corpus
+
+from observability.exporter import SpanExporter, set_exporter
+from rag.async_ollama_rag import AsyncOllamaRag
+from rag.bulk_ingest import BulkIngestor
+
+
+class StreamingBackend(MockBackend):
+    """Streams the answer word by word and records when the stream is closed."""
+
+    def __init__(self, answer: str):
+        super().__init__(answer=answer)
+        self.closed = 0
+
+    async def astream(self, model, messages, options=None, timeout=None):
+        reply = self._reply(messages)
+        words = reply["message"]["content"].split(" ")
+        try:
+            for i, word in enumerate(words):
+                await asyncio.sleep(0.01)
+                last = i == len(words) - 1
+                yield {
+                    **reply,
+                    "message": {"role": "assistant", "content": f" {word}"},
+                    "done": last,
+                }
+        finally:
+            self.closed += 1
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    questions = write_corpus(tmp_path / "corpus", 40)
+    return tmp_path / "corpus", questions
+
+
+def make_rag(tmp_path, corpus, backend):
+    rag = AsyncOllamaRag(
+        db_path=str(tmp_path / "db"),
+        embeddings=HashingEmbeddings(),
+        backend=backend,
+        score_threshold=0.0,
+    )
+    BulkIngestor(rag).run(str(corpus[0]))
+    return rag
+
+
+def test_concurrent_responses(tmp_path, corpus):
+    rag = make_rag(tmp_path, corpus, MockBackend(answer="Charge it over USB-C."))
+    questions = corpus[1][:6]
+    cache = rag.embeddings
+    misses = cache.misses
+
+    async def ask_all():
+        return await asyncio.gather(
+            *(rag.aget_response(question, []) for question in questions)
+        )
+
+    async def ask_twice():
+        try:
+            first = await ask_all()
+            hits = cache.hits
+            return first, await ask_all(), hits
+        finally:
+            await rag.aclose()
+
+    first, second, hits = asyncio.run(ask_twice())
+    assert first == second
+    assert [answer for answer, _ in first] == ["Charge it over USB-C."] * 6
+    for question, (_, chunks) in zip(questions, first):
+        assert any(chunk.startswith(question) for chunk in chunks)
+    assert cache.misses == misses + 6
+    assert cache.hits == hits + 6
+
+
+def test_stream_yields_the_answer_and_caches_it(tmp_path, corpus):
+    backend = StreamingBackend("Charge it over USB-C.")
+    rag = make_rag(tmp_path, corpus, backend)
+    question = "Which materials is the EchoPod Mini made from?"
+
+    async def stream():
+        try:
+            tokens, chunks = await rag.aget_response_stream(question, [])
+            return [token async for token in tokens], chunks
+        finally:
+            await rag.aclose()
+
+    received, chunks = asyncio.run(stream())
+    assert received == ["Charge", " it", " over", " USB-C."]
+    assert any("EchoPod Mini" in chunk for chunk in chunks)
+    assert backend.closed == 1
+    assert len(rag.answer_cache) == 1
+
+
+def test_cancelled_stream_finishes_its_trace_and_is_not_cached(tmp_path, corpus):
+    backend = StreamingBackend("Charge it over USB-C.")
+    rag = make_rag(tmp_path, corpus, backend)
+    exporter = SpanExporter(lambda batch: None, sample_rate=1.0)
+    received = []
+
+    async def cancel_mid_stream():
+        tokens, _ = await rag.aget_response_stream(
+            "Which materials is the EchoPod Mini made from?", []
+        )
+        first = asyncio.Event()
+
+        async def consume():
+            async for token in tokens:
+                received.append(token)
+                first.set()
+
+        task = asyncio.create_task(consume())
+        await first.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await rag.aclose()
+
+    set_exporter(exporter)
+    try:
+        asyncio.run(cancel_mid_stream())
+    finally:
+        set_exporter(None)
+
+    assert received == ["Charge"]
+    assert backend.closed == 1
+    trace = exporter.queue.get_nowait()
+    assert trace.end is not None
+    assert trace.output == {"answer": "Charge"}
+    assert len(rag.answer_cache) == 0
@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from rag.backends import OllamaBackend, OpenAIBackend, create_backend
+from rag.config import ModelConfig
+
+MESSAGES = [{"role": "user", "content": "What is the refund policy?"}]
+
+
+def mock(backend, handler):
+    options = {
+        "base_url": backend.base_url,
+        "headers": backend.headers,
+        "transport": httpx.MockTransport(handler),
+    }
+    backend.client = httpx.Client(**options)
+    backend._async_client = httpx.AsyncClient(**options)
+    return backend
+
+
+def test_ollama_backend_sends_native_requests():
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(
+            200, json={"message": {"role": "assistant", "content": "30 days."}}
+        )
+
+    backend = mock(OllamaBackend("127.0.0.1:11434", keep_alive=300), handler)
+    assert backend.base_url == "http://127.0.0.1:11434"
+
+    response = backend.chat("llama3", MESSAGES, options={"num_predict": 8})
+    assert response["message"]["content"] == "30 days."
+    assert requests[0]["keep_alive"] == 300
+    assert requests[0]["options"] == {"num_predict": 8}
+    assert requests[0]["stream"] is False
+
+
+def test_openai_backend_maps_options_and_usage():
+    requests = []
+
+    def handler(request):
+        assert request.url.path == "/v1/chat/completions"
+        assert request.headers["Authorization"] == "Bearer secret"
+        requests.append(json.loads(request.content))
+        return httpx.Response(
+            200,
+            json={
+                "choices": [
+                    {"message": {"content": "30 days."}, "finish_reason": "stop"}
+                ],
+                "usage": {"prompt_tokens": 12, "completion_tokens": 3},
+            },
+        )
+
+    backend = mock(OpenAIBackend("http://vllm:8000", api_key="secret"), handler)
+    options = {"temperature": 0.0, "num_predict": 8, "num_ctx": 4096}
+    response = backend.chat("/model", MESSAGES, options=options)
+
+    assert requests[0]["max_tokens"] == 8
+    assert "num_ctx" not in requests[0]
+    assert response["message"]["content"] == "30 days."
+    assert response["prompt_eval_count"] == 12
+    assert response["eval_count"] == 3
+    assert response["done_reason"] == "stop"
+
+
+def test_openai_backend_streams_server_sent_events():
+    events = [
+        {"choices": [{"delta": {"role": "assistant"}}]},
+        {"choices": [{"delta": {"content": "30 "}}]},
+        {"choices": [{"delta": {"content": "days."}, "finish_reason": "stop"}]},
+        {"choices": [], "usage": {"prompt_tokens": 12, "completion_tokens": 2}},
+    ]
+    body = "".join(f"data: {json.dumps(event)}\n\n" for event in events)
+    body += "data: [DONE]\n\n"
+
+    def handler(request):
+        assert json.loads(request.content)["stream_options"]["include_usage"]
+        return httpx.Response(200, text=body)
+
+    backend = mock(OpenAIBackend("http://vllm:8000"), handler)
+    frames = list(backend.stream("/model", MESSAGES))
+    assert "".join(frame["message"]["content"] for frame in frames) == "30 days."
+    assert frames[-1]["done"] and frames[-1]["eval_count"] == 2
+
+    async def collect():
+        return [frame async for frame in backend.astream("/model", MESSAGES)]
+
+    assert asyncio.run(collect())[-1]["prompt_eval_count"] == 12
+
+
+def test_create_backend_from_config():
+    backend = create_backend(ModelConfig(), default_url="ollama:11434", keep_alive=60)
+    assert isinstance(backend, OllamaBackend)
+    assert backend.base_url == "http://ollama:11434" and backend.keep_alive == 60
+
+    config = ModelConfig(backend="openai", base_url="http://vllm:8000", timeout=5)
+    backend = create_backend(config)
+    assert isinstance(backend, OpenAIBackend) and backend.timeout == 5
+
+    with pytest.raises(ValueError):
+        create_backend(ModelConfig(backend="tgi"))
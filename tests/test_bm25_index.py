@@ -0,0 +1,124 @@
+import json
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from rag.bm25_index import INDEX_FILES, BM25Index, fingerprint, tokenize
+
+CORPUS = {
+    "a": "FantasticCharge Pro is a compact, portable power bank.",
+    "b": "Is FantasticCharge Pro safe to use? Yes, it has overcharge protection.",
+    "c": "EchoPod Mini is a compact pair of wireless earbuds.",
+    "d": "LumaKey is a smart bulb you can control from your phone.",
+}
+
+
+def reference_scores(query: str, k1: float = 1.5, b: float = 0.75) -> dict:
+    docs = {doc_id: tokenize(text) for doc_id, text in CORPUS.items()}
+    avgdl = sum(len(toks) for toks in docs.values()) / len(docs)
+    scores = {}
+    for doc_id, toks in docs.items():
+        tf = Counter(toks)
+        score = 0.0
+        for term in tokenize(query):
+            df = sum(1 for t in docs.values() if term in t)
+            if df == 0 or term not in tf:
+                continue
+            idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            norm = k1 * (1 - b + b * len(toks) / avgdl)
+            score += idf * tf[term] * (k1 + 1) / (tf[term] + norm)
+        if score > 0:
+            scores[doc_id] = score
+    return scores
+
+
+@pytest.fixture
+def index() -> BM25Index:
+    return BM25Index.build(list(CORPUS), list(CORPUS.values()))
+
+
+def test_scores_match_reference(index):
+    query = "is fantasticcharge pro compact"
+    expected = reference_scores(query)
+    results = index.search(query, k=10)
+
+    assert [doc_id for doc_id, _ in results] == sorted(
+        expected, key=expected.get, reverse=True
+    )
+    for doc_id, score in results:
+        assert score == pytest.approx(expected[doc_id])
+
+
+def test_top_k_and_unknown_terms(index):
+    assert len(index.search("compact", k=1)) == 1
+    assert index.search("nonexistent words only") == []
+
+
+def test_save_and_load_round_trip(index, tmp_path):
+    index.save(str(tmp_path))
+
+    loaded = BM25Index.load(str(tmp_path), fingerprint(CORPUS))
+    assert loaded is not None
+    assert loaded.search("smart bulb") == index.search("smart bulb")
+
+    assert BM25Index.load(str(tmp_path), fingerprint(["a"])) is None
+
+
+def test_index_missing_collection_documents_is_stale(index, tmp_path):
+    # Saved by a process that did not see another process adding "e".
+    index.save(str(tmp_path))
+    assert BM25Index.load(str(tmp_path), fingerprint([*CORPUS, "e"])) is None
+
+
+def test_unknown_format_is_ignored(tmp_path):
+    (tmp_path / "CURRENT").write_text(json.dumps({"k1": 1.5, "b": 0.75}))
+    assert BM25Index.load(str(tmp_path)) is None
+
+
+def test_vocabulary_is_memory_mapped(index, tmp_path):
+    index.save(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path))
+    assert isinstance(loaded.vocab.hashes, np.memmap)
+    assert len(loaded.vocab) == len(index.vocab)
+
+
+def test_save_publishes_whole_builds(index, tmp_path):
+    index.save(str(tmp_path))
+    first = BM25Index.load(str(tmp_path))
+
+    index.add(["e"], ["A compact smart plug with energy monitoring."])
+    index.save(str(tmp_path))
+
+    # One build directory, and the new save is only visible through CURRENT.
+    assert len(list(tmp_path.glob("build-*"))) == 1
+    assert first.search("smart plug") != index.search("smart plug")
+    assert BM25Index.load(str(tmp_path)).search("smart plug") == index.search(
+        "smart plug"
+    )
+
+
+def test_incremental_updates_match_full_rebuild(index, tmp_path):
+    index.add(["e"], ["A compact smart plug with energy monitoring."])
+    index.add(["a"], ["FantasticCharge Pro charges three devices at once."])
+    index.delete(["c", "unknown"])
+
+    corpus = dict(CORPUS)
+    corpus["e"] = "A compact smart plug with energy monitoring."
+    corpus["a"] = "FantasticCharge Pro charges three devices at once."
+    del corpus["c"]
+    rebuilt = BM25Index.build(list(corpus), list(corpus.values()))
+
+    assert len(index) == len(rebuilt) == 4
+    assert index.avgdl == pytest.approx(rebuilt.avgdl)
+    for query in ("compact smart", "fantasticcharge pro", "earbuds"):
+        assert index.search(query, k=10) == pytest.approx(rebuilt.search(query, k=10))
+
+    index.save(str(tmp_path))
+    assert not index.dirty
+    loaded = BM25Index.load(str(tmp_path))
+    assert loaded is not None
+    assert loaded.search("compact smart", k=10) == pytest.approx(
+        rebuilt.search("compact smart", k=10)
+    )
@@ -0,0 +1,64 @@
+import pytest
+from helpers import HashingEmbeddings, MockBackend
+from langchain_core.documents import Document
+
+from rag.bulk_ingest import BulkIngestor
+from rag.ingest import IngestManifest, chunk_id
+from rag.ollama_rag import OllamaRag
+
+
+def make_rag(db_path):
+    return OllamaRag(
+        db_path=str(db_path),
+        embeddings=HashingEmbeddings(),
+        backend=MockBackend(),
+        embedding_cache_size=0,
+        answer_cache_size=0,
+    )
+
+
+def test_resumed_run_deletes_chunks_removed_before_the_interruption(
+    tmp_path, monkeypatch
+):
+    corpus, db_path = tmp_path / "corpus", tmp_path / "db"
+    corpus.mkdir()
+    (corpus / "a.txt").write_text("alpha chunk one\n---\nbeta chunk two\n")
+    rag = make_rag(db_path)
+    BulkIngestor(rag).run(str(corpus))
+
+    (corpus / "a.txt").write_text("alpha chunk one\n")
+    (corpus / "b.txt").write_text("gamma chunk three\n")
+
+    def interrupted(ids, persist=True):
+        raise KeyboardInterrupt
+
+    # The checkpoint after b.txt's batch records the new a.txt, then the run
+    # stops before deleting the chunk removed from it.
+    monkeypatch.setattr(rag, "delete_documents", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        BulkIngestor(rag, checkpoint_interval=0).run(str(corpus))
+    monkeypatch.undo()
+    assert IngestManifest.load(rag.manifest_path).stale == [chunk_id("beta chunk two")]
+
+    rag = make_rag(db_path)
+    stats = BulkIngestor(rag).run(str(corpus))
+
+    assert stats.skipped_files == 2
+    assert stats.deleted == 1
+    stored = rag.vector_store._collection.get(include=["documents"])["documents"]
+    assert sorted(stored) == ["alpha chunk one", "gamma chunk three"]
+    assert all(
+        doc.page_content != "beta chunk two" for doc, _ in rag.bm25_search("beta two")
+    )
+    assert IngestManifest.load(rag.manifest_path).stale == []
+
+
+def test_bm25_saved_by_a_concurrent_ingest_is_rebuilt(tmp_path):
+    first, second = make_rag(tmp_path), make_rag(tmp_path)
+    first.add_documents([Document(page_content="alpha chunk one")], ["a"])
+    # The second worker's in-memory index does not have "a" when it saves.
+    second.add_documents([Document(page_content="beta chunk two")], ["b"])
+
+    rag = make_rag(tmp_path)
+    assert sorted(str(doc_id) for doc_id in rag.bm25.ids) == ["a", "b"]
+    assert rag.bm25_search("alpha")[0][0].page_content == "alpha chunk one"
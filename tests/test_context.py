@@ -0,0 +1,62 @@
+import sys
+from types import SimpleNamespace
+
+from langchain_core.documents import Document
+
+from rag.config import ModelConfig
+from rag.context import ContextPacker, TokenCounter
+
+
+def _doc(text: str) -> Document:
+    return Document(page_content=text)
+
+
+def test_packer_drops_duplicates_and_respects_budget():
+    counter = TokenCounter()
+    results = [
+        (_doc("What is X?\nX is a compact power bank."), 0.9),
+        (_doc("What is X?\nX is a compact  power bank!"), 0.8),
+        (_doc("How long is the warranty?\n" + "It lasts two years. " * 40), 0.7),
+        (_doc("Is it waterproof?\nNo, keep it dry."), 0.6),
+    ]
+    first = counter.count("Q: What is X?\nA: X is a compact power bank.")
+
+    packed = ContextPacker(counter, max_tokens=first + 20).pack(results)
+
+    assert [doc.page_content.split("\n")[0] for doc in packed.documents] == [
+        "What is X?",
+        "Is it waterproof?",
+    ]
+    assert packed.duplicates == 1
+    assert packed.over_budget == 1
+    assert counter.count(packed.text) <= packed.tokens <= first + 20
+    assert packed.text.startswith("Q: What is X?\nA: X is a compact power bank.\nQ: ")
+
+
+def test_token_counter_calibration():
+    counter = TokenCounter()
+    counter.calibrate([("one two three four", 8)])
+    assert counter.tokens_per_piece == 2
+    assert counter.count("five six") == 4
+
+
+def test_token_counter_uses_the_configured_tokenizer(monkeypatch):
+    class CharTokenizer:
+        def encode(self, text, add_special_tokens=True):
+            return list(text) + (["<s>"] if add_special_tokens else [])
+
+    loaded = []
+
+    def from_pretrained(name):
+        loaded.append(name)
+        return CharTokenizer()
+
+    transformers = SimpleNamespace(
+        AutoTokenizer=SimpleNamespace(from_pretrained=from_pretrained)
+    )
+    monkeypatch.setitem(sys.modules, "transformers", transformers)
+
+    assert TokenCounter.from_config(ModelConfig()).tokenizer is None
+    counter = TokenCounter.from_config(ModelConfig(tokenizer="org/model"))
+    assert loaded == ["org/model"]
+    assert counter.count("five six") == 8
@@ -0,0 +1,110 @@
+import asyncio
+
+import httpx
+import numpy as np
+from fastapi.testclient import TestClient
+from helpers import HashingEmbeddings, MockBackend, write_corpus
+
+from rag.bulk_ingest import BulkIngestor
+from rag.ollama_rag import OllamaRag
+from server.app import create_app
+from server.config import ServerConfig
+from server.dispatcher import Dispatcher, create_dispatcher_app, rendezvous_order
+from server.service import QAService
+
+
+def test_rendezvous_order_is_stable_when_workers_are_added():
+    owners = {key: rendezvous_order(key, 4)[0] for key in map(str, range(200))}
+    assert set(owners.values()) == {0, 1, 2, 3}
+
+    moved = [key for key in owners if rendezvous_order(key, 5)[0] != owners[key]]
+    # Only the keys taken over by the new worker move.
+    assert all(rendezvous_order(key, 5)[0] == 4 for key in moved)
+    assert len(moved) < 80
+
+
+def test_conversations_stay_on_one_worker(tmp_path):
+    corpus, db_path = tmp_path / "corpus", tmp_path / "db"
+    write_corpus(corpus, 30)
+
+    def factory(worker):
+        def build():
+            rag = OllamaRag(
+                db_path=str(db_path),
+                embeddings=HashingEmbeddings(),
+                backend=MockBackend(answer=f"Answer from worker {worker}."),
+                embedding_cache_size=0,
+                answer_cache_size=0,
+                score_threshold=0.0,
+            )
+            if worker == 0:
+                BulkIngestor(rag).run(str(corpus))
+            return rag
+
+        return build
+
+    config = ServerConfig(db_path=str(db_path))
+    services = [
+        QAService(config, pipeline_factory=factory(i), validate=None) for i in range(2)
+    ]
+    # The first worker builds the indexes, the second memory-maps them.
+    for service in services:
+        with service.serving() as rag:
+            postings = rag.bm25.postings
+    assert isinstance(postings, np.memmap)
+
+    dispatcher = Dispatcher([f"http://worker-{i}" for i in range(2)])
+    dispatcher.clients = [
+        httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=create_app(service)),
+            base_url=f"http://worker-{i}",
+        )
+        for i, service in enumerate(services)
+    ]
+
+    with TestClient(create_dispatcher_app(dispatcher)) as client:
+        for _ in range(6):
+            first = client.post("/v1/chat", json={"message": "How do I charge it?"})
+            conversation_id = first.json()["conversation_id"]
+            owner = rendezvous_order(conversation_id, 2)[0]
+            assert first.json()["answer"] == f"Answer from worker {owner}."
+
+            payload = {
+                "message": "And how long?",
+                "conversation_id": conversation_id,
+                "stream": True,
+            }
+            with client.stream("POST", "/v1/chat", json=payload) as response:
+                body = "".join(response.iter_text())
+            assert f"Answer from worker {owner}." in body
+
+        messages = client.get(f"/v1/conversations/{conversation_id}").json()
+        assert len(messages["messages"]) == 4
+        assert client.get("/ready").json()["status"] == "ready"
+        assert dispatcher.in_flight == [0, 0]
+
+
+def test_disconnected_stream_releases_the_worker():
+    async def events(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for _ in range(3):
+            await send({"type": "http.response.body", "body": b"x", "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def run():
+        dispatcher = Dispatcher(["http://worker-0"])
+        dispatcher.clients = [
+            httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=events), base_url="http://worker-0"
+            )
+        ]
+        worker, response = await dispatcher.forward("GET", "/stream")
+        body = dispatcher.relay(worker, response)
+        assert await anext(body)
+        assert dispatcher.in_flight == [1]
+        # What the server does when the client goes away mid-stream.
+        await body.aclose()
+        assert dispatcher.in_flight == [0]
+        assert response.is_closed
+
+    asyncio.run(run())
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag.embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self) -> None:
+        self.calls: List[List[str]] = []
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def test_only_misses_reach_the_model():
+    inner = CountingEmbeddings()
+    cache = CachedEmbeddings(inner, model="m")
+
+    first = cache.embed_documents(["a b", "c", "a b"])
+    second = cache.embed_documents(["a  b ", "c", "dd"])
+
+    assert first == [[3.0, 1.0], [1.0, 1.0], [3.0, 1.0]]
+    assert second == [[3.0, 1.0], [1.0, 1.0], [2.0, 1.0]]
+    assert inner.calls == [["a b", "c"], ["dd"]]
+    assert cache.stats()["misses"] == 3
+
+
+def test_disk_store_is_shared_and_bounded(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = CachedEmbeddings(CountingEmbeddings(), model="m", path=path, disk_size=2)
+    writer.embed_documents(["one", "two", "three"])
+
+    inner = CountingEmbeddings()
+    reader = CachedEmbeddings(inner, model="m", path=path)
+    assert reader.stats()["disk_entries"] == 2
+    assert reader.embed_query("three") == [5.0, 1.0]
+    assert inner.calls == []
+
+    other_model = CachedEmbeddings(inner, model="other", path=path)
+    other_model.embed_query("three")
+    assert inner.calls == [["three"]]
+
+
+def test_async_lookups_run_off_the_event_loop(tmp_path, monkeypatch):
+    cache = CachedEmbeddings(
+        CountingEmbeddings(), model="m", path=str(tmp_path / "cache.sqlite3")
+    )
+    threads = []
+    split = cache._split
+
+    def recording_split(texts):
+        threads.append(threading.get_ident())
+        return split(texts)
+
+    monkeypatch.setattr(cache, "_split", recording_split)
+
+    async def embed():
+        return (
+            threading.get_ident(),
+            await cache.aembed_query("a b"),
+            await cache.aembed_documents(["a b", "c"]),
+        )
+
+    loop_thread, query, documents = asyncio.run(embed())
+    assert query == [3.0, 1.0]
+    assert documents == [[3.0, 1.0], [1.0, 1.0]]
+    assert threads and loop_thread not in threads
+
+
+def test_vectors_are_kept_as_float32_and_returned_as_lists():
+    cache = CachedEmbeddings(CountingEmbeddings(), model="m")
+    first = cache.embed_query("a b")
+    second = cache.embed_documents(["a b"])
+
+    assert first == [3.0, 1.0] and second == [[3.0, 1.0]]
+    assert type(first) is list and type(first[0]) is float
+    (vector,) = cache._memory.values()
+    assert isinstance(vector, np.ndarray) and vector.dtype == np.float32
+
+
+def test_counters_are_exact_under_concurrent_lookups():
+    cache = CachedEmbeddings(CountingEmbeddings(), model="m")
+    texts = [str(i) for i in range(50)]
+    cache.embed_documents(texts)
+
+    def lookups():
+        for _ in range(20):
+            cache.embed_documents(texts)
+
+    threads = [threading.Thread(target=lookups) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats()["hits"] == 4 * 20 * 50
+    assert cache.stats()["misses"] == 50
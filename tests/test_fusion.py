@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from rag.fusion import fuse, score_matrix
+
+
+def test_score_matrix_handles_duplicates_and_missing_scores():
+    ids, matrix = score_matrix(
+        [["b", "a", "b"], ["c", "a"]], [[0.2, 0.5, 0.9], [1.0, float("nan")]]
+    )
+
+    assert list(ids) == ["b", "a", "c"]
+    np.testing.assert_array_equal(matrix[0], [0.9, 0.5, np.nan])
+    np.testing.assert_array_equal(matrix[1], [np.nan, np.nan, 1.0])
+
+
+def test_linear_fusion_with_weights_and_top_k():
+    ids, scores = fuse(
+        [["a", "b", "c"], ["c", "d"]],
+        [[0.9, 0.6, 0.3], [8.0, 4.0]],
+        weights=[1.0, 0.5],
+        normalization=["none", "max"],
+        top_k=2,
+    )
+
+    assert list(ids) == ["a", "c"]
+    np.testing.assert_allclose(scores, [0.9, 0.8])
+
+
+def test_rrf_and_combmnz_reward_agreement():
+    id_lists = [["a", "b", "c"], ["b", "c", "d"]]
+    score_lists = [[3.0, 2.0, 1.0], [3.0, 2.0, 1.0]]
+
+    ids, scores = fuse(id_lists, score_lists, strategy="rrf", k=60)
+    assert list(ids[:2]) == ["b", "c"]
+    assert scores[0] == pytest.approx(1 / 62 + 1 / 61)
+
+    ids, scores = fuse(id_lists, score_lists, strategy="combmnz")
+    assert ids[0] == "b"
+    assert scores[0] == pytest.approx(2 * (0.5 + 1.0))
+
+    ids, _ = fuse(id_lists, score_lists, strategy="rrf", intersection_only=True)
+    assert sorted(ids) == ["b", "c"]
@@ -0,0 +1,84 @@
+import threading
+
+from rag.history import ConversationHistory
+
+
+def test_window_stays_bounded_and_older_turns_are_summarized():
+    calls = []
+
+    def summarize(summary, messages):
+        calls.append(len(messages))
+        return (summary + " " + " ".join(m["content"] for m in messages)).strip()
+
+    history = ConversationHistory("system", summarize=summarize, max_tokens=60)
+    sizes = []
+    for i in range(20):
+        history.add_turn(f"question {i} " + "word " * 5, f"answer {i} " + "word " * 5)
+        sizes.append(len(history.messages()))
+        assert history.tokens() <= 60
+
+    assert history.wait(timeout=5)
+    messages = history.messages()
+    assert messages[0] == {"role": "system", "content": "system"}
+    assert messages[1]["content"].startswith("Summary of the earlier conversation:")
+    assert "question 0" in messages[1]["content"]
+    assert messages[-1]["content"].startswith("answer 19")
+    assert messages[2]["role"] == "user"
+    assert sum(calls) == 2 * 20 - (len(messages) - 2)
+    assert len(set(sizes[5:])) == 1
+
+
+def test_summary_runs_off_the_calling_thread():
+    release = threading.Event()
+
+    def summarize(summary, messages):
+        release.wait(timeout=5)
+        return "summary"
+
+    history = ConversationHistory("system", summarize=summarize, max_tokens=10)
+    history.add_turn("first question " * 5, "first answer " * 5)
+    history.add_turn("second question", "second answer")
+
+    # The turn was added without waiting for the summary.
+    assert not history.wait(timeout=0.05)
+    assert len(history.messages()) == 3
+    release.set()
+    assert history.wait(timeout=5)
+    assert history.messages()[1]["content"].endswith("summary")
+
+
+def test_eviction_hysteresis_keeps_the_prefix_stable():
+    history = ConversationHistory("system", max_tokens=100, evict_to=0.5)
+    prefixes = []
+    for i in range(30):
+        history.add_turn(f"question {i} " + "word " * 5, f"answer {i} " + "word " * 5)
+        prefixes.append(history.messages()[1]["content"])
+        assert history.tokens() <= 100
+
+    # Several turns are added between evictions, so the first turn changes rarely.
+    changes = sum(a != b for a, b in zip(prefixes, prefixes[1:]))
+    assert 0 < changes < len(prefixes) // 3
+
+
+def test_evicted_turns_go_to_on_evict_instead_of_the_summarizer():
+    evicted = []
+    history = ConversationHistory(
+        "system",
+        summarize=lambda summary, messages: "unused",
+        max_tokens=30,
+        on_evict=evicted.extend,
+    )
+    for i in range(5):
+        history.add_turn(f"question {i} " + "word " * 5, f"answer {i}")
+
+    assert evicted[0]["content"].startswith("question 0")
+    assert history.summary == ""
+    kept = [m for m in history.messages() if m["role"] != "system"]
+    assert evicted + kept == [
+        message
+        for i in range(5)
+        for message in (
+            {"role": "user", "content": f"question {i} " + "word " * 5},
+            {"role": "assistant", "content": f"answer {i}"},
+        )
+    ]
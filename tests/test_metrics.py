@@ -0,0 +1,40 @@
+from prometheus_client import REGISTRY
+
+from observability import metrics, stage
+from observability.stages import add_stage_hook, remove_stage_hook
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_observe_llm_response_converts_nanoseconds():
+    labels = {"model": "test-model", "call": "answer"}
+    before = sample("qa_bot_llm_eval_duration_seconds_sum", **labels)
+    metrics.observe_llm_response(
+        {
+            "model": "test-model",
+            "eval_duration": 1_500_000_000,
+            "prompt_eval_count": 42,
+            "eval_count": 7,
+        }
+    )
+
+    assert sample("qa_bot_llm_eval_duration_seconds_sum", **labels) - before == 1.5
+    assert sample("qa_bot_llm_prompt_tokens_sum", **labels) >= 42
+    assert sample("qa_bot_llm_completion_tokens_count", **labels) >= 1
+    # load_duration was not reported, so nothing was observed.
+    assert sample("qa_bot_llm_load_duration_seconds_count", **labels) == 0.0
+
+
+def test_stage_hook_records_histogram():
+    before = sample("qa_bot_stage_duration_seconds_count", stage="metrics_test")
+    add_stage_hook(metrics.observe_stage)
+    try:
+        with stage("metrics_test"):
+            pass
+    finally:
+        remove_stage_hook(metrics.observe_stage)
+
+    after = sample("qa_bot_stage_duration_seconds_count", stage="metrics_test")
+    assert after - before == 1
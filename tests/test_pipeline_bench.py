@@ -0,0 +1,40 @@
+from helpers import HashingEmbeddings, write_corpus
+from pipeline_bench import main
+
+
+def test_synthetic_corpus_scales_with_unique_chunks(tmp_path):
+    questions = write_corpus(tmp_path / "corpus", 250)
+    assert len(questions) == 250
+    chunks = [
+        chunk.strip()
+        for path in tmp_path.glob("corpus/*.txt")
+        for chunk in path.read_text().split("---")
+        if chunk.strip()
+    ]
+    assert len(chunks) == len(set(chunks)) == 250
+
+    embeddings = HashingEmbeddings(dim=64)
+    assert embeddings.embed_query(questions[0]) == embeddings.embed_query(questions[0])
+
+
+def test_pipeline_bench_reports_every_stage(tmp_path):
+    results = main(["--sizes", "120", "--queries", "10", "--workdir", str(tmp_path)])
+
+    stages = results[0]["stages"]
+    for name in ("vector_search", "bm25", "fusion", "prompt", "generation", "total"):
+        assert stages[name]["count"] > 0
+        assert 0 <= stages[name]["p50_ms"] <= stages[name]["p99_ms"]
+    assert stages["rewrite"]["count"] >= 2
+    assert results[0]["chunks"] == 120
+    assert results[0]["memory"]["after_queries"]["rss_mb"] > 0
+
+
+def test_pipeline_bench_replays_queries_across_processes(tmp_path):
+    results = main(
+        ["--sizes", "60", "--queries", "8", "--processes", "2"]
+        + ["--workdir", str(tmp_path)]
+    )
+
+    parallel = results[0]["parallel"]
+    assert parallel["queries_per_sec"] > 0
+    assert len(parallel["rss_mb"]) == 2
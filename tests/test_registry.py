@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+
+from rag import registry
+
+
+class FakePipeline:
+    def __init__(self, build_delay=0.0, warm_gate=None):
+        time.sleep(build_delay)
+        self.warm_gate = warm_gate
+        self.warm_ups = 0
+        self.closed = False
+
+    def warm_up(self):
+        if self.warm_gate is not None:
+            self.warm_gate.wait()
+        time.sleep(0.05)
+        self.warm_ups += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    built = []
+
+    def build(key, **kwargs):
+        built.append(FakePipeline(**kwargs))
+        return built[-1]
+
+    monkeypatch.setattr(registry, "_build", build)
+    registry.clear_pipelines()
+    yield built
+    registry.clear_pipelines()
+
+
+def run_together(fn, n=8):
+    results = [None] * n
+
+    def target(i):
+        results[i] = fn()
+
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_get_pipeline_builds_once_per_key(builds):
+    results = run_together(lambda: registry.get_pipeline("docs", build_delay=0.05))
+
+    assert len(builds) == 1
+    assert all(result is builds[0] for result in results)
+    assert registry.get_pipeline("other") is not builds[0]
+    assert len(builds) == 2
+
+
+def test_warm_pipeline_warms_once(builds):
+    results = run_together(lambda: registry.warm_pipeline("docs"))
+
+    assert all(result is builds[0] for result in results)
+    assert builds[0].warm_ups == 1
+    registry.warm_pipeline("docs")
+    assert builds[0].warm_ups == 1
+
+
+def test_warming_does_not_block_other_pipelines(builds):
+    gate = threading.Event()
+    warming = threading.Thread(
+        target=lambda: registry.warm_pipeline("docs", warm_gate=gate)
+    )
+    warming.start()
+    while not builds:
+        time.sleep(0.001)
+    other = threading.Thread(target=lambda: registry.warm_pipeline("other"))
+    try:
+        assert registry.get_pipeline("docs") is builds[0]
+        other.start()
+        other.join(timeout=5)
+        assert not other.is_alive()
+        assert builds[1].warm_ups == 1 and builds[0].warm_ups == 0
+    finally:
+        gate.set()
+        warming.join()
+    assert builds[0].warm_ups == 1
+
+
+def test_reload_swaps_in_a_warmed_pipeline_and_leaves_the_old_one_open(builds):
+    old = registry.warm_pipeline("docs")
+    served = []
+    reloading = threading.Thread(target=lambda: registry.reload_pipeline("docs"))
+    reloading.start()
+    while len(builds) < 2:
+        time.sleep(0.001)
+    # Served by the old pipeline until the new one is warm.
+    served.append(registry.get_pipeline("docs"))
+    reloading.join()
+
+    new = registry.get_pipeline("docs")
+    assert served == [old]
+    assert new is builds[1]
+    assert new.warm_ups == 1
+    assert not old.closed and not new.closed
+    registry.warm_pipeline("docs")
+    assert new.warm_ups == 1
+
+
+def test_reload_can_close_the_old_pipeline(builds):
+    old = registry.get_pipeline("docs")
+    new = registry.reload_pipeline("docs", close_previous=True)
+
+    assert new is not old
+    assert old.closed and not new.closed
+
+
+def test_clear_closes_the_pipelines(builds):
+    pipelines = [registry.get_pipeline("docs"), registry.get_pipeline("other")]
+    registry.clear_pipelines()
+
+    assert all(pipeline.closed for pipeline in pipelines)
+    assert registry.get_pipeline("docs") is not pipelines[0]
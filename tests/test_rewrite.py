@@ -0,0 +1,45 @@
+import httpx
+
+from rag.rewrite import QueryRewriter
+
+HISTORY = [
+    {"role": "system", "content": "You are a helpful assistant."},
+    {"role": "user", "content": "What is the refund policy?"},
+    {"role": "assistant", "content": "Refunds are possible within 30 days."},
+]
+
+
+class FakeBackend:
+    def __init__(self, content: str = "", error: Exception = None):
+        self.content = content
+        self.error = error
+        self.calls = []
+
+    def chat(self, model, messages, options=None, timeout=None):
+        self.calls.append({"model": model, "options": options, "timeout": timeout})
+        if self.error is not None:
+            raise self.error
+        return {"message": {"content": self.content}}
+
+
+def test_rewrites_are_bounded_and_cached():
+    backend = FakeBackend('"How long does a refund take?"\nExtra text')
+    rewriter = QueryRewriter("small", backend, num_predict=32, timeout=1.5)
+
+    assert rewriter.rewrite(HISTORY, "How long?") == "How long does a refund take?"
+    assert rewriter.rewrite(HISTORY, "How long?") == "How long does a refund take?"
+    assert len(backend.calls) == 1
+    assert backend.calls[0]["options"]["num_predict"] == 32
+    assert backend.calls[0]["timeout"] == 1.5
+
+    # A different history window is a different cache entry.
+    rewriter.rewrite(HISTORY + [{"role": "user", "content": "Thanks"}], "How long?")
+    assert len(backend.calls) == 2
+
+
+def test_timeout_falls_back_to_input():
+    rewriter = QueryRewriter("small", FakeBackend(error=httpx.ReadTimeout("slow")))
+
+    assert rewriter.rewrite(HISTORY, "And that?") == "And that?"
+    assert rewriter.stats()["timeouts"] == 1
+    assert rewriter.stats()["cache_entries"] == 0
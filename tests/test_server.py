@@ -0,0 +1,289 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from helpers import HashingEmbeddings, MockBackend, write_corpus
+
+from guards import engine as guard_engine
+from rag.bulk_ingest import BulkIngestor
+from rag.ollama_rag import OllamaRag
+from server import service as service_module
+from server.app import create_app
+from server.client import QAClient
+from server.config import ServerConfig
+from server.service import QAService
+
+
+def reject_bad(text):
+    if "bad" in text:
+        raise ValueError("Your input text is not appropriate")
+
+
+@pytest.fixture
+def client(tmp_path):
+    corpus = tmp_path / "corpus"
+    db_path = tmp_path / "db"
+    write_corpus(corpus, 50)
+    builds = []
+
+    def factory():
+        rag = OllamaRag(
+            db_path=str(db_path),
+            embeddings=HashingEmbeddings(),
+            backend=MockBackend(answer="Charge it over USB-C."),
+            embedding_cache_size=0,
+            answer_cache_size=0,
+            score_threshold=0.0,
+        )
+        if not builds:
+            BulkIngestor(rag).run(str(corpus))
+        builds.append(rag)
+        return rag
+
+    config = ServerConfig(db_path=str(db_path))
+    service = QAService(config, pipeline_factory=factory, validate=reject_bad)
+    with TestClient(create_app(service)) as test_client:
+        test_client.builds = builds
+        yield test_client
+
+
+def test_health_and_ready(client):
+    assert client.get("/health").json() == {"status": "ok"}
+    ready = client.get("/ready").json()
+    assert ready["status"] == "ready"
+    assert ready["documents"] == 50
+
+
+def test_chat_persists_the_conversation(client):
+    first = client.post("/v1/chat", json={"message": "How do I charge it?"}).json()
+    assert first["answer"] == "Charge it over USB-C."
+    assert first["chunks"]
+
+    conversation_id = first["conversation_id"]
+    client.post(
+        "/v1/chat",
+        json={"message": "And how long?", "conversation_id": conversation_id},
+    )
+    messages = client.get(f"/v1/conversations/{conversation_id}").json()["messages"]
+    assert [m["content"] for m in messages if m["role"] == "user"] == [
+        "How do I charge it?",
+        "And how long?",
+    ]
+
+
+def test_chat_stream(client):
+    conversation_id = client.post("/v1/conversations").json()["conversation_id"]
+    payload = {
+        "message": "How do I charge it?",
+        "conversation_id": conversation_id,
+        "stream": True,
+    }
+    with client.stream("POST", "/v1/chat", json=payload) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = list(QAClient.events(response.iter_lines()))
+
+    assert events[0][0] == "start"
+    assert events[0][1]["conversation_id"] == conversation_id
+    tokens = "".join(data["token"] for event, data in events if event == "message")
+    assert events[-1] == ("end", {"answer": tokens.strip()})
+    messages = client.get(f"/v1/conversations/{conversation_id}").json()["messages"]
+    assert messages[-1] == {"role": "assistant", "content": tokens.strip()}
+
+
+def test_rejected_input_and_unknown_conversation(client):
+    response = client.post("/v1/chat", json={"message": "something bad"})
+    assert response.status_code == 400
+    assert response.json()["detail"]["message"] == "Your input text is not appropriate"
+
+    response = client.post(
+        "/v1/chat", json={"message": "Hi", "conversation_id": "missing"}
+    )
+    assert response.status_code == 404
+    assert client.delete("/v1/conversations/missing").status_code == 404
+
+
+def test_reload_rebuilds_the_pipeline(client):
+    client.get("/ready")
+    assert len(client.builds) == 1
+    version = client.post("/v1/reload").json()["knowledge_version"]
+    assert client.get("/ready").json()["knowledge_version"] == version
+    assert len(client.builds) == 2
+    # The old pipeline is closed without breaking the new one's Chroma client.
+    assert client.builds[0].backend.client.is_closed
+    assert client.get("/ready").json()["documents"] == 50
+
+
+def test_sse_parsing():
+    lines = ["event: start", 'data: {"chunks": []}', "", 'data: {"token": "Hi"}', ""]
+    assert list(QAClient.events(iter(lines))) == [
+        ("start", {"chunks": []}),
+        ("message", {"token": "Hi"}),
+    ]
+
+
+def test_guard_settings_reach_the_engine(tmp_path, monkeypatch):
+    monkeypatch.setenv("QA_APP_SERVER__DB_PATH", str(tmp_path))
+    monkeypatch.setenv("QA_APP_GUARDS__PARALLEL", "true")
+    monkeypatch.setenv("QA_APP_GUARDS__TOXICITY_THRESHOLD", "0.3")
+    monkeypatch.setattr(guard_engine, "_engine", None)
+    warmed = []
+    monkeypatch.setattr(
+        guard_engine.GuardEngine, "warm_up", lambda self: warmed.append(self)
+    )
+
+    create_app()
+
+    engine = guard_engine.get_engine()
+    assert warmed == [engine]
+    assert engine.config.parallel
+    assert engine.config.toxicity_threshold == 0.3
+
+
+def test_concurrent_summary_folds_keep_every_evicted_turn(tmp_path):
+    service = QAService(
+        ServerConfig(db_path=str(tmp_path)),
+        pipeline_factory=lambda: rag,
+        validate=None,
+    )
+    conversation_id = service.store.create()
+    turns = [
+        [
+            {"role": "user", "content": f"Question {i}"},
+            {"role": "assistant", "content": "Ok"},
+        ]
+        for i in range(2)
+    ]
+
+    class Pipeline:
+        def summarize_history(self, summary, messages):
+            questions = [m["content"] for m in messages if m["role"] == "user"]
+            if questions == ["Question 0"]:
+                # The next turn evicts and folds its own turn meanwhile.
+                service.store.save_turns(conversation_id, [], 1, turns[1])
+                service.fold_summary(conversation_id)
+            return " ".join([summary, *questions])
+
+    rag = Pipeline()
+    service.store.save_turns(conversation_id, [], 0, turns[0])
+    service.fold_summary(conversation_id)
+
+    summary, pending, version = service.store.pending(conversation_id)
+    # The outdated fold of the first turn alone was rejected.
+    assert summary.split() == ["Question", "0", "Question", "1"]
+    assert pending == []
+    assert version == 1
+
+
+def test_concurrent_turns_of_a_conversation_are_both_saved(client):
+    service = client.app.state.service
+    conversation_id = service.store.create()
+    with service.serving() as rag:
+        first = service.history(rag, conversation_id)
+        second = service.history(rag, conversation_id)
+        # Both turns were answered from the same, empty history.
+        service.save_turn(rag, first, conversation_id, "First?", "One.")
+        service.save_turn(rag, second, conversation_id, "Second?", "Two.")
+
+    messages = client.get(f"/v1/conversations/{conversation_id}").json()["messages"]
+    assert [m["content"] for m in messages] == ["First?", "One.", "Second?", "Two."]
+
+
+def test_requests_are_served_while_a_new_pipeline_builds(tmp_path):
+    building = threading.Event()
+    release = threading.Event()
+    built = []
+
+    class Pipeline:
+        def close(self):
+            pass
+
+    def factory():
+        if built:
+            building.set()
+            release.wait(timeout=5)
+        built.append(Pipeline())
+        return built[-1]
+
+    service = QAService(
+        ServerConfig(db_path=str(tmp_path)), pipeline_factory=factory, validate=None
+    )
+    with service.serving() as first:
+        pass
+    service.reload()
+    def serve():
+        with service.serving():
+            pass
+
+    rebuild = threading.Thread(target=serve)
+    rebuild.start()
+    assert building.wait(timeout=5)
+
+    # Served by the old pipeline without waiting for the build.
+    with service.serving() as rag:
+        assert rag is first
+    release.set()
+    rebuild.join()
+    with service.serving() as rag:
+        assert rag is built[1]
+
+
+def test_replaced_pipeline_is_closed_once_idle(tmp_path):
+    built = []
+
+    class Pipeline:
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    def factory():
+        built.append(Pipeline())
+        return built[-1]
+
+    service = QAService(
+        ServerConfig(db_path=str(tmp_path)), pipeline_factory=factory, validate=None
+    )
+    with service.serving() as first:
+        service.reload()
+        with service.serving() as second:
+            assert second is not first
+        # Still answering a request started before the reload.
+        assert not first.closed
+    assert first.closed
+    assert not second.closed
+
+    service.reload()
+    with service.serving():
+        pass
+    # Idle when replaced, so closed right away.
+    assert second.closed
+    service.close()
+    assert built[-1].closed
+
+
+@pytest.mark.parametrize(
+    "settings, expected",
+    [
+        ({}, False),
+        ({"dispatch": True}, True),
+        ({"dispatch": True, "vector_index": False}, False),
+        ({"vector_index": True}, True),
+    ],
+)
+def test_vector_index_defaults_to_on_with_dispatch(
+    tmp_path, monkeypatch, settings, expected
+):
+    calls = []
+
+    class Pipeline:
+        def warm_up(self):
+            pass
+
+    def reload_pipeline(**kwargs):
+        calls.append(kwargs)
+        return Pipeline()
+
+    monkeypatch.setattr(service_module, "reload_pipeline", reload_pipeline)
+    config = ServerConfig(db_path=str(tmp_path), **settings)
+    QAService(config, validate=None).build_pipeline()
+    assert calls[0]["vector_index"] is expected
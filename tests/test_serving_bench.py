@@ -0,0 +1,37 @@
+import json
+
+import pytest
+from mock_llm_server import serve
+from serving_bench import main
+
+
+@pytest.fixture(scope="module")
+def server():
+    server, _ = serve(ttft=0.02, token_delay=0.002, tokens=8)
+    yield server
+    server.shutdown()
+
+
+@pytest.mark.parametrize("api", ["ollama", "openai"])
+def test_bench_reports_streaming_latencies_and_server_tokens(server, api, tmp_path):
+    output = tmp_path / "results.json"
+    args = ["--api", api, "--url", server.url, "--model", "mock", "--prompt", "one two"]
+    args += ["--requests", "6", "--concurrency", "1,3", "--rate", "20"]
+    main(args + ["--max-tokens", "4", "--output", str(output)])
+
+    report = json.loads(output.read_text())
+    assert [(run["mode"], run["level"]) for run in report["runs"]] == [
+        ("concurrency", 1.0),
+        ("concurrency", 3.0),
+        ("rate", 20.0),
+    ]
+    for run in report["runs"]:
+        assert run["errors"] == 0
+        assert run["completion_tokens"] == 6 * 4
+        assert run["prompt_tokens"] == 6 * 2
+        assert run["distinct_outputs"] == 1
+        assert 20 <= run["ttft_ms"]["p50"] <= run["latency_ms"]["p99"]
+        assert run["itl_ms"]["p50"] is not None
+
+    # Comparing against itself reports every level.
+    main(args + ["--max-tokens", "4", "--compare", str(output)])
@@ -0,0 +1,132 @@
+import time
+
+import pytest
+from langchain_core.documents import Document
+
+from rag.speculative import Speculator
+
+
+def doc(name):
+    return Document(page_content=name, metadata={"id": name})
+
+
+class FakeRag:
+    retrieval_k = 5
+    context_k = 5
+
+    def __init__(self, delay=0.2, rewrite_delay=0.2):
+        self.delay = delay
+        self.rewrite_delay = rewrite_delay
+        self.retrieved = []
+
+    def needs_rewrite(self, text):
+        return text.startswith("what about")
+
+    def cached_answer(self, text):
+        return None, None
+
+    def is_collection_empty(self):
+        return False
+
+    def retrieve(self, query):
+        time.sleep(self.delay)
+        self.retrieved.append(query)
+        results = [(doc(f"{query} chunk"), 1.0)]
+        return results, results
+
+    def rewrite_ambiguous_prompt(self, msgs, text):
+        time.sleep(self.rewrite_delay)
+        return "How long does the speaker battery last?"
+
+    def assemble_conversation(self, question, msgs, results, fused_results):
+        chunks = [d.page_content for d, _ in fused_results]
+        return [{"role": "user", "content": question}], chunks
+
+
+def slow_validate(text):
+    time.sleep(0.2)
+    if "bad" in text:
+        raise ValueError("rejected")
+
+
+def test_stages_overlap_and_rewrite_is_merged():
+    speculator = Speculator(FakeRag(), deadline=1.0)
+    start = time.perf_counter()
+    prepared = speculator.prepare("what about the battery?", [], slow_validate)
+    elapsed = time.perf_counter() - start
+
+    # Validation, raw retrieval and rewrite (0.2s each) run side by side; the
+    # retrieval on the rewritten query follows the rewrite.
+    assert elapsed < 0.55
+    assert prepared.conversation[-1]["content"] == (
+        "How long does the speaker battery last?"
+    )
+    assert prepared.chunks[0] == "How long does the speaker battery last? chunk"
+    assert "what about the battery? chunk" in prepared.chunks
+
+
+def test_rejected_input_raises_without_waiting_for_retrieval():
+    rag = FakeRag(delay=1.0)
+    speculator = Speculator(rag)
+    start = time.perf_counter()
+    with pytest.raises(ValueError):
+        speculator.prepare("this is bad", [], slow_validate)
+    assert time.perf_counter() - start < 0.8
+
+
+def test_late_rewrite_falls_back_to_the_raw_input():
+    speculator = Speculator(FakeRag(delay=0.05, rewrite_delay=0.5), deadline=0.1)
+    prepared = speculator.prepare("what about the battery?", [])
+
+    assert prepared.conversation[-1]["content"] == "what about the battery?"
+    assert prepared.chunks == ["what about the battery? chunk"]
+
+
+def test_deadline_excludes_time_queued_for_a_thread():
+    # One thread: the rewrite waits 0.15s for the raw retrieval, then takes 0.2s.
+    speculator = Speculator(
+        FakeRag(delay=0.15, rewrite_delay=0.05), deadline=0.25, max_workers=1
+    )
+    prepared = speculator.prepare("what about the battery?", [])
+
+    assert prepared.conversation[-1]["content"] == (
+        "How long does the speaker battery last?"
+    )
+    speculator.close()
+
+
+class FailingRewriteRag(FakeRag):
+    def rewrite_ambiguous_prompt(self, msgs, text):
+        raise ConnectionError("model server is down")
+
+
+def test_failed_rewrite_falls_back_to_the_raw_input():
+    speculator = Speculator(FailingRewriteRag(delay=0.05), deadline=1.0)
+    prepared = speculator.prepare("what about the battery?", [])
+
+    assert prepared.conversation[-1]["content"] == "what about the battery?"
+    assert prepared.chunks == ["what about the battery? chunk"]
+    speculator.close()
+
+
+class BusyPoolRag(FakeRag):
+    """Another request's work lands between the raw retrieval and the rewrite."""
+
+    def needs_rewrite(self, text):
+        self.blocker = self.speculator.submit(time.sleep, 0.5)
+        return True
+
+
+def test_rewrite_queued_past_the_deadline_is_dropped():
+    rag = BusyPoolRag(delay=0.1, rewrite_delay=0.0)
+    rag.speculator = speculator = Speculator(rag, deadline=0.2, max_workers=1)
+    start = time.perf_counter()
+    prepared = speculator.prepare("what about the battery?", [])
+
+    # Waits for the raw retrieval, but not for the rewrite to get a thread.
+    assert time.perf_counter() - start < 0.45
+    assert prepared.conversation[-1]["content"] == "what about the battery?"
+    rag.blocker.result()
+    speculator.close()
+    # The queued rewrite was cancelled rather than run late.
+    assert rag.retrieved == ["what about the battery?"]
@@ -0,0 +1,62 @@
+import threading
+
+from observability import stage
+from observability.exporter import (
+    RequestTrace,
+    SpanExporter,
+    record_stage,
+    request_trace,
+    set_exporter,
+)
+from observability.stages import add_stage_hook, remove_stage_hook
+
+
+def test_request_trace_records_stages_and_exports_in_batches():
+    batches = []
+    exporter = SpanExporter(batches.append, batch_size=10, flush_interval=0.05)
+    set_exporter(exporter.start())
+    add_stage_hook(record_stage)
+    try:
+        for i in range(3):
+            with request_trace("get_response", question=f"q{i}") as trace:
+                with stage("bm25"):
+                    pass
+                with stage("generation"):
+                    pass
+            assert trace is not None
+    finally:
+        remove_stage_hook(record_stage)
+        set_exporter(None)
+        exporter.close()
+
+    traces = [trace for batch in batches for trace in batch]
+    assert [t.input["question"] for t in traces] == ["q0", "q1", "q2"]
+    assert len(batches) < 3
+    assert [span.name for span in traces[0].spans] == ["bm25", "generation"]
+    assert traces[0].end is not None
+    assert exporter.stats()["exported"] == 3
+
+
+def test_unsampled_requests_are_not_traced():
+    exporter = SpanExporter(lambda batch: None, sample_rate=0.0)
+    set_exporter(exporter)
+    try:
+        with request_trace("get_response", question="q") as trace:
+            assert trace is None
+    finally:
+        set_exporter(None)
+    assert exporter.queue.qsize() == 0
+
+
+def test_full_queue_drops_instead_of_blocking():
+    release = threading.Event()
+    exporter = SpanExporter(
+        lambda batch: release.wait(), queue_size=2, batch_size=1, flush_interval=0.0
+    ).start()
+    try:
+        results = [exporter.submit(RequestTrace("r", {})) for _ in range(10)]
+        assert not all(results)
+        assert exporter.dropped == results.count(False)
+    finally:
+        release.set()
+        exporter.close()
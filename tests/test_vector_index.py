@@ -0,0 +1,85 @@
+import numpy as np
+
+from rag.vector_index import IVFIndex
+
+
+def _clustered(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(50, dim))
+    return centers[rng.integers(0, 50, n)] + 0.3 * rng.normal(size=(n, dim))
+
+
+def test_ivf_search_matches_exact_search():
+    vectors = _clustered(5000, 32)
+    ids = [f"doc{i}" for i in range(len(vectors))]
+    index = IVFIndex.build(ids, vectors, ids, [None] * len(ids), space="l2")
+    assert index.n_lists > 1
+
+    rng = np.random.default_rng(1)
+    recall = []
+    for query in vectors[rng.choice(len(vectors), 50)] + 0.05:
+        exact = np.argsort(((vectors - query) ** 2).sum(axis=1))[:10]
+        hits = index.search(query, k=10, nprobe=8)
+        found = {str(index.ids[row]) for row, _ in hits}
+        recall.append(len(found & {ids[i] for i in exact}) / 10)
+
+        row, distance = hits[0]
+        expected = float(((vectors[int(str(index.ids[row])[3:])] - query) ** 2).sum())
+        assert np.isclose(distance, expected, rtol=1e-4)
+
+    assert np.mean(recall) >= 0.9
+    # Scanning every cluster is exact.
+    hits = index.search(vectors[7], k=1, nprobe=index.n_lists)
+    assert str(index.ids[hits[0][0]]) == "doc7"
+
+
+def test_save_load_roundtrip_and_staleness(tmp_path):
+    vectors = _clustered(200, 8)
+    ids = [f"doc{i}" for i in range(len(vectors))]
+    texts = [f"text {i}" for i in range(len(vectors))]
+    metadatas = [{"source": f"file{i % 3}.txt"} for i in range(len(vectors))]
+    index = IVFIndex.build(ids, vectors, texts, metadatas, space="cosine")
+    index.save(str(tmp_path), "v1")
+
+    assert IVFIndex.load(str(tmp_path), "v2") is None
+    loaded = IVFIndex.load(str(tmp_path), "v1")
+    assert loaded is not None
+    assert isinstance(loaded.vectors, np.memmap)
+
+    row, distance = loaded.search(vectors[42], k=1)[0]
+    doc = loaded.document(row)
+    assert doc.id == "doc42"
+    assert doc.page_content == "text 42"
+    assert doc.metadata == {"source": "file0.txt"}
+    assert abs(distance) < 1e-5
+
+    index.save(str(tmp_path), "v2")
+    assert len(list(tmp_path.glob("build-*"))) == 1
+
+
+def test_quantized_search_with_rescoring(tmp_path):
+    vectors = _clustered(3000, 64)
+    ids = [f"doc{i}" for i in range(len(vectors))]
+    exact = IVFIndex.build(ids, vectors, ids, [None] * len(ids), n_lists=1)
+
+    for quantization, ratio in (("float16", 2), ("int8", 4)):
+        index = IVFIndex.build(
+            ids, vectors, ids, [None] * len(ids), n_lists=1, quantization=quantization
+        )
+        assert exact.vectors.nbytes / index.codes.nbytes == ratio
+
+        query = vectors[11] + 0.01
+        expected = exact.search(query, k=10)
+        hits = index.search(query, k=10, rescore=4)
+        assert [row for row, _ in hits] == [row for row, _ in expected]
+        np.testing.assert_allclose(
+            [d for _, d in hits], [d for _, d in expected], rtol=1e-5
+        )
+
+    index.save(str(tmp_path), "v1")
+    assert IVFIndex.load(str(tmp_path), "v1", quantization="float16") is None
+    loaded = IVFIndex.load(str(tmp_path), "v1", quantization="int8")
+    assert loaded is not None and loaded.codes.dtype == np.int8
+    assert loaded.search(vectors[5], k=1, rescore=0)[0][0] == index.search(
+        vectors[5], k=1, rescore=0
+    )[0][0]
@@ -0,0 +1,166 @@
+"""
+Recall vs. memory report for the quantized vector index.
+
+Compares IVFIndex searches with float32, float16 and int8 storage, with and
+without full-precision rescoring, against the top-k that Chroma returns for the
+same query embeddings.
+
+    python tests/vector_quantization_report.py --db-path /tmp/ch_db --k 5
+
+By default the queries are the questions (first line) of the stored chunks,
+embedded with the collection's embedding model through Ollama. `--self-queries`
+uses slightly perturbed stored embeddings instead and needs no model server.
+`--scale N` tiles the corpus N times with noise to estimate larger catalogs; the
+reference is then an exact float32 scan, since Chroma does not hold those vectors.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import chromadb
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rag.vector_index import IVFIndex  # noqa: E402
+
+CONFIGS: List[Tuple[str, int]] = [
+    ("none", 0),
+    ("float16", 0),
+    ("float16", 4),
+    ("int8", 0),
+    ("int8", 4),
+]
+
+
+def load_collection(db_path: str, collection_name: str) -> Dict:
+    client = chromadb.PersistentClient(path=db_path)
+    collection = client.get_collection(name=collection_name)
+    records = collection.get(include=["embeddings", "documents", "metadatas"])
+    records["space"] = (collection.metadata or {}).get("hnsw:space", "l2")
+    records["collection"] = collection
+    return records
+
+
+def embed_questions(documents: List[str], model: str, limit: int) -> np.ndarray:
+    from langchain_ollama import OllamaEmbeddings
+
+    questions = [doc.strip().splitlines()[0] for doc in documents if doc.strip()][:limit]
+    embeddings = OllamaEmbeddings(
+        model=model, base_url=os.getenv("OLLAMA_HOST", "127.0.0.1:11434")
+    )
+    return np.asarray(embeddings.embed_documents(questions), dtype=np.float32)
+
+
+def exact_top_k(
+    vectors: np.ndarray, queries: np.ndarray, k: int, space: str
+) -> List[List[int]]:
+    index = IVFIndex.build(
+        [str(i) for i in range(len(vectors))],
+        vectors,
+        [""] * len(vectors),
+        [None] * len(vectors),
+        space=space,
+        n_lists=1,
+    )
+    return [
+        [int(index.ids[row]) for row, _ in index.search(query, k)] for query in queries
+    ]
+
+
+def report(
+    ids: List[str],
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    reference: List[List[str]],
+    space: str,
+    k: int,
+    nprobe: int,
+) -> None:
+    print(f"{len(vectors)} vectors of dimension {vectors.shape[1]}, {len(queries)} queries")
+    print(
+        f"{'storage':<9} {'rescore':>7} {'recall@' + str(k):>9} {'scanned MB':>11} "
+        f"{'rescore MB':>11} {'B/vector':>9} {'p50 ms':>8}"
+    )
+    for quantization, rescore in CONFIGS:
+        index = IVFIndex.build(
+            ids,
+            vectors,
+            [""] * len(ids),
+            [None] * len(ids),
+            space=space,
+            quantization=quantization,
+            keep_full_precision=rescore > 0,
+        )
+        recalls = []
+        latencies = []
+        for query, expected in zip(queries, reference):
+            start = time.perf_counter()
+            hits = index.search(query, k, nprobe=nprobe, rescore=rescore)
+            latencies.append(time.perf_counter() - start)
+            found = {str(index.ids[row]) for row, _ in hits}
+            recalls.append(len(found & set(expected)) / max(len(expected), 1))
+
+        memory = index.memory_usage()
+        scanned = memory["scanned"] - index.centroids.nbytes
+        print(
+            f"{quantization:<9} {rescore:>7} {statistics.mean(recalls):>9.3f} "
+            f"{memory['scanned'] / 2**20:>11.2f} {memory['rescoring'] / 2**20:>11.2f} "
+            f"{scanned / len(ids):>9.0f} {statistics.median(latencies) * 1e3:>8.3f}"
+        )
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--db-path", default="/tmp/ch_db")
+    parser.add_argument("--collection", default="qas")
+    parser.add_argument("--embedding-model", default="BGE-M3")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--self-queries", action="store_true")
+    parser.add_argument("--scale", type=int, default=1)
+    parsed = parser.parse_args(args)
+
+    records = load_collection(parsed.db_path, parsed.collection)
+    ids = list(records["ids"])
+    vectors = np.asarray(records["embeddings"], dtype=np.float32)
+    space = records["space"]
+    rng = np.random.default_rng(0)
+
+    if parsed.self_queries:
+        picks = rng.choice(len(vectors), min(parsed.queries, len(vectors)), replace=False)
+        noise = rng.normal(scale=0.01, size=(len(picks), vectors.shape[1]))
+        queries = (vectors[picks] + noise).astype(np.float32)
+    else:
+        queries = embed_questions(
+            records["documents"], parsed.embedding_model, parsed.queries
+        )
+
+    if parsed.scale > 1:
+        spread = vectors.std(axis=0).mean() * 0.1
+        copies = [vectors] + [
+            vectors + rng.normal(scale=spread, size=vectors.shape).astype(np.float32)
+            for _ in range(parsed.scale - 1)
+        ]
+        vectors = np.concatenate(copies)
+        ids = [f"{doc_id}:{copy}" for copy in range(parsed.scale) for doc_id in ids]
+        reference = [
+            [ids[i] for i in hits]
+            for hits in exact_top_k(vectors, queries, parsed.k, space)
+        ]
+    else:
+        result = records["collection"].query(
+            query_embeddings=queries.tolist(), n_results=parsed.k, include=[]
+        )
+        reference = result["ids"]
+
+    report(ids, vectors, queries, reference, space, parsed.k, parsed.nprobe)
+
+
+if __name__ == "__main__":
+    main()